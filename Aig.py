@@ -0,0 +1,273 @@
+from typing import Dict, List, Tuple
+from BoolExpr import ExprNode, VAR, CONST, NOT, AND, OR, XOR, topological_nodes
+
+
+# int: Literals of the constants. A literal is twice a node index, plus 1 if negated
+FALSE_LIT = 0
+TRUE_LIT = 1
+
+
+class Aig():
+    """
+    And-Inverter Graph: every function is built of two input AND nodes and negated
+    edges (literals). Nodes are created through conj(), which handles:
+        1. Constant propagation: constant and complementary operands are folded away
+        2. Structural hashing: equal nodes over equal operands are created once, so
+           logic shared by several functions (for example the input cones of several
+           FFs) is a single sub-graph
+        3. Simple rewriting: AND of a literal with an AND node using the literal or its
+           negation (idempotence, contradiction, subsumption and substitution rules)
+    XOR is built as three AND nodes in a fixed shape, which get_xor() recognizes, so
+    it is restored when the graph is converted back to expressions (see to_exprs)
+    """
+
+    def __init__(self) -> None:
+        # List[Tuple[int, int]]: Operand literals of each AND node (None for the constant
+        # node 0 and the inputs)
+        self.fanins = [None]
+
+        self.input_names = [None]  # List[str]: Variable name of each input node (None otherwise)
+        self.inputs = {}  # Dict[str, int]: Literal of each input (by variable name)
+
+        # Dict[Tuple[int, int], int]: Literal of each AND node by its (sorted) operand literals
+        self.strash = {}
+
+    def add_input(self, name: str) -> int:
+        if name not in self.inputs:
+            self.inputs[name] = 2 * len(self.fanins)
+            self.fanins.append(None)
+            self.input_names.append(name)
+        return self.inputs[name]
+
+    def get_fanins(self, lit: int) -> Tuple[int, int]:
+        """
+        Get the operand literals of the node of a literal (None if it is not an AND node)
+        """
+
+        return self.fanins[lit >> 1]
+
+    def conj(self, lit1: int, lit2: int) -> int:
+        """
+        Get a literal equivalent to the conjunction of two literals
+        """
+
+        if lit1 == FALSE_LIT or lit2 == FALSE_LIT or lit1 == lit2 ^ 1:
+            return FALSE_LIT
+        if lit1 == TRUE_LIT or lit1 == lit2:
+            return lit2
+        if lit2 == TRUE_LIT:
+            return lit1
+
+        for and_lit, other in ((lit1, lit2), (lit2, lit1)):
+            fanins = self.get_fanins(and_lit)
+            if fanins is None:
+                continue
+            if and_lit & 1 == 0:
+                if other in fanins:
+                    # (a & b) & a = a & b
+                    return and_lit
+                if other ^ 1 in fanins:
+                    # (a & b) & !a = 0
+                    return FALSE_LIT
+            else:
+                if other ^ 1 in fanins:
+                    # !(a & b) & !a = !a
+                    return other
+                if other in fanins:
+                    # !(a & b) & a = a & !b
+                    return self.conj(other, fanins[0] ^ fanins[1] ^ other ^ 1)
+
+        fanins1 = self.get_fanins(lit1)
+        fanins2 = self.get_fanins(lit2)
+        if fanins1 is not None and fanins2 is not None and lit1 & 1 == 0 and lit2 & 1 == 0:
+            if fanins1[0] ^ 1 in fanins2 or fanins1[1] ^ 1 in fanins2:
+                # (a & b) & (!a & c) = 0
+                return FALSE_LIT
+
+        key = (lit1, lit2) if lit1 < lit2 else (lit2, lit1)
+        lit = self.strash.get(key)
+        if lit is None:
+            lit = 2 * len(self.fanins)
+            self.fanins.append(key)
+            self.input_names.append(None)
+            self.strash[key] = lit
+        return lit
+
+    def disj(self, lit1: int, lit2: int) -> int:
+        return self.conj(lit1 ^ 1, lit2 ^ 1) ^ 1
+
+    def xor(self, lit1: int, lit2: int) -> int:
+        """
+        Get a literal equivalent to the exclusive or of two literals
+        """
+
+        if lit1 >> 1 == 0:
+            return lit2 ^ lit1
+        if lit2 >> 1 == 0:
+            return lit1 ^ lit2
+        if lit1 >> 1 == lit2 >> 1:
+            return (lit1 ^ lit2) & 1
+        # Negations are moved outside, so a ^ b, !a ^ !b and !(!a ^ b) share the nodes
+        sign = (lit1 ^ lit2) & 1
+        lit1, lit2 = sorted((lit1 & ~1, lit2 & ~1))
+        both = self.conj(lit1, lit2)
+        neither = self.conj(lit1 ^ 1, lit2 ^ 1)
+        return self.conj(both ^ 1, neither ^ 1) ^ sign
+
+    def get_xor(self, lit: int) -> Tuple[int, int]:
+        """
+        Recognize the shape built by xor(): !(a & b) & !(!a & !b)
+
+        Returns:
+            Tuple[int, int]: Literals a and b whose exclusive or is the node of the literal,
+                or None if the node is not of that shape
+        """
+
+        fanins = self.get_fanins(lit)
+        if fanins is None or fanins[0] & 1 == 0 or fanins[1] & 1 == 0:
+            return None
+        both = self.get_fanins(fanins[0])
+        neither = self.get_fanins(fanins[1])
+        if both is None or neither is None:
+            return None
+        if sorted((both[0] ^ 1, both[1] ^ 1)) == list(neither):
+            return both
+        return None
+
+    def add_expr(self, root: ExprNode, leaves: Dict[str, int] = None) -> int:
+        """
+        Add an expression tree to the graph
+
+        Args:
+            root (ExprNode): Root of the expression tree
+            leaves (Dict[str, int]): Literals of variables of the expression (by name).
+                Other variables become inputs of the graph
+
+        Returns:
+            int: Literal equivalent to the expression
+        """
+
+        if leaves is None:
+            leaves = {}
+        lits = {}
+        for node in topological_nodes(root):
+            if node.op == VAR:
+                lit = leaves[node.name] if node.name in leaves else self.add_input(node.name)
+            elif node.op == CONST:
+                lit = TRUE_LIT if node.name == '1' else FALSE_LIT
+            elif node.op == NOT:
+                lit = lits[id(node.args[0])] ^ 1
+            else:
+                combine = {AND: self.conj, OR: self.disj, XOR: self.xor}[node.op]
+                lit = lits[id(node.args[0])]
+                for arg in node.args[1:]:
+                    lit = combine(lit, lits[id(arg)])
+            lits[id(node)] = lit
+        return lits[id(root)]
+
+    def get_operands(self, node: int) -> Tuple[str, Tuple[int, ...]]:
+        """
+        Get the expression form of an AND node: XOR and its two operand literals if
+        get_xor() recognizes it, otherwise AND and its two operand literals
+        """
+
+        xor_fanins = self.get_xor(2 * node)
+        if xor_fanins is not None:
+            return XOR, xor_fanins
+        return AND, self.fanins[node]
+
+    def get_cone(self, lits: List[int]) -> List[int]:
+        """
+        Get the AND nodes driving the given literals, in expression form (see
+        get_operands), operands before the nodes using them
+        """
+
+        order = []
+        visited = set()
+        stack = [(lit >> 1, False) for lit in reversed(lits)]
+        while stack:
+            node, is_expanded = stack.pop()
+            if node in visited or self.fanins[node] is None:
+                continue
+            if is_expanded:
+                visited.add(node)
+                order.append(node)
+                continue
+            stack.append((node, True))
+            for lit in reversed(self.get_operands(node)[1]):
+                if lit >> 1 not in visited:
+                    stack.append((lit >> 1, False))
+        return order
+
+    def to_exprs(self, lits: List[int]) -> List[ExprNode]:
+        """
+        Convert literals of the graph to expressions. Each node of the graph becomes a
+        single ExprNode shared by all the expressions using it, so the expressions form
+        a DAG and consumers keyed by node identity (see BoolExpr.topological_nodes)
+        handle shared logic once. Chains of AND nodes used only once are merged into a
+        single AND node, and the XOR shape is restored
+
+        Args:
+            lits (List[int]): The literals
+
+        Returns:
+            List[ExprNode]: Expression equivalent to each literal
+        """
+
+        cone = self.get_cone(lits)
+        forms = {node: self.get_operands(node) for node in cone}
+
+        # Dict[int, int]: Number of uses of each node by other nodes and by the literals
+        refs = {}
+        for lit in lits:
+            refs[lit >> 1] = refs.get(lit >> 1, 0) + 1
+        for node in cone:
+            for lit in forms[node][1]:
+                refs[lit >> 1] = refs.get(lit >> 1, 0) + 1
+
+        nodes = {0: ExprNode(CONST, name='0')}  # Dict[int, ExprNode]: Expression of each node
+        negated = {}  # Dict[int, ExprNode]: Expression of each negated node
+
+        def lit2expr(lit: int) -> ExprNode:
+            if lit == TRUE_LIT:
+                return ExprNode(CONST, name='1')
+            if lit & 1 == 0:
+                return nodes[lit >> 1]
+            if lit >> 1 not in negated:
+                negated[lit >> 1] = ExprNode(NOT, (nodes[lit >> 1],))
+            return negated[lit >> 1]
+
+        for name, lit in self.inputs.items():
+            nodes[lit >> 1] = ExprNode(VAR, name=name)
+
+        # Dict[int, List[int]]: Operand literals of each AND node after merging the
+        # operands used only by it
+        and_operands = {}
+        for node in cone:
+            op, operands = forms[node]
+            if op == AND:
+                merged = []
+                for lit in operands:
+                    if lit & 1 == 0 and lit >> 1 in and_operands and refs[lit >> 1] == 1:
+                        merged.extend(and_operands[lit >> 1])
+                    else:
+                        merged.append(lit)
+                and_operands[node] = merged
+                operands = merged
+            nodes[node] = ExprNode(op, tuple(lit2expr(lit) for lit in operands))
+        return [lit2expr(lit) for lit in lits]
+
+
+def get_shared_exprs(functions: List[ExprNode]) -> List[ExprNode]:
+    """
+    Normalize expression trees through a single shared AIG (see Aig.to_exprs)
+
+    Args:
+        functions (List[ExprNode]): The expression trees
+
+    Returns:
+        List[ExprNode]: Equivalent expressions, sharing the nodes of their common logic
+    """
+
+    aig = Aig()
+    return aig.to_exprs([aig.add_expr(function) for function in functions])
@@ -0,0 +1,283 @@
+from typing import Dict, Iterable, Iterator, List, Tuple
+import hashlib
+import json
+import os
+from BoolExpr import ExprNode, parse_function_str, evaluate_expr
+
+
+# str: Version of the cached records format. Changing it invalidates all the cache entries
+CACHE_VERSION = '2'
+
+DEFAULT_CACHE_DIR = './.fsm_cache'
+
+# int: Size of the buffer of the cached transition tables
+TRANSITIONS_BUFFER_SIZE = 1 << 20
+
+
+class CachedGate():
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def get_name(self) -> str:
+        return self.name
+
+
+class CachedEndpoint():
+    def __init__(self, gate: CachedGate, pin: str) -> None:
+        self.gate = gate
+        self.pin = pin
+
+    def get_gate(self) -> CachedGate:
+        return self.gate
+
+    def get_pin(self) -> str:
+        return self.pin
+
+
+class CachedNet():
+    """
+    Stand-in for hal_py.Net, holding what the FSM analysis uses of a net
+    """
+
+    def __init__(self, net_id: int, name: str, is_global_input: bool,
+                 source_gate: str = None, source_pin: str = None) -> None:
+        self.id = net_id
+        self.name = name
+        self.is_global_input = is_global_input
+        self.sources = []
+        if source_gate is not None:
+            self.sources.append(CachedEndpoint(CachedGate(source_gate), source_pin))
+
+    def get_id(self) -> int:
+        return self.id
+
+    def get_name(self) -> str:
+        return self.name
+
+    def is_global_input_net(self) -> bool:
+        return self.is_global_input
+
+    def get_sources(self) -> List[CachedEndpoint]:
+        return self.sources
+
+
+class CachedNetlist():
+    """
+    Stand-in for hal_py.Netlist, holding the nets which are arguments of the state functions
+    """
+
+    def __init__(self, nets: Iterable[CachedNet]) -> None:
+        self.nets = {net.get_id(): net for net in nets}
+
+    def get_net_by_id(self, net_id: int) -> CachedNet:
+        return self.nets[net_id]
+
+
+class CachedFunction():
+    """
+    Stand-in for hal_py.BooleanFunction, built from the string of the function
+    """
+
+    def __init__(self, function_str: str, variables: List[str], values: tuple,
+                 expr: ExprNode = None) -> None:
+        """
+        Args:
+            function_str (str): String of the function (str() of the hal function).
+                May be None if expr is given
+            variables (List[str]): Variables of the function (net IDs)
+            values (tuple): Values representing false and true when evaluating
+                (hal_py.BooleanFunction.Value.ZERO and ONE)
+            expr (ExprNode): Expression tree of the function. Parsed from function_str
+                if not given
+        """
+
+        self.function_str = function_str
+        self.variables = list(variables)
+        self.values = values
+        self.expr = expr if expr is not None else parse_function_str(function_str, variables)
+
+    def __str__(self) -> str:
+        if self.function_str is None:
+            self.function_str = str(self.expr)
+        return self.function_str
+
+    def get_variables(self) -> List[str]:
+        return list(self.variables)
+
+    def evaluate(self, args: dict):
+        bool_args = {name: value == self.values[1] for name, value in args.items()}
+        return self.values[int(evaluate_expr(self.expr, bool_args))]
+
+
+def hash_file(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def get_cache_key(netlist_path: str, lib_path: str, options: Dict[str, object] = None) -> str:
+    """
+    Get the key of the analysis of a netlist, which is the hash of the contents of
+    the netlist and library files and of the analysis options
+
+    Args:
+        netlist_path (str): Path to the netlist .v file
+        lib_path (str): Path to the library file
+        options (Dict[str, object]): JSON serializable options affecting the analysis
+
+    Returns:
+        str: The key
+    """
+
+    sha = hashlib.sha256()
+    sha.update(CACHE_VERSION.encode())
+    sha.update(hash_file(netlist_path).encode())
+    sha.update(hash_file(lib_path).encode())
+    sha.update(json.dumps(options or {}, sort_keys=True).encode())
+    return sha.hexdigest()
+
+
+def save_analysis(cache_dir: str, key: str, netlist, fsm_gate_names: List[str],
+                  ff_names: List[str], functions: list):
+    """
+    Save the results of an FSM analysis
+
+    Args:
+        cache_dir (str): Directory of the cache
+        key (str): Key of the analysis (see get_cache_key)
+        netlist (hal_py.Netlist): The analyzed netlist
+        fsm_gate_names (List[str]): Names of the gates of the selected FSM
+        ff_names (List[str]): Names of the FFs of the FSM (state bits order)
+        functions (List[hal_py.BooleanFunction]): Logical function of each state bit
+    """
+
+    nets = {}
+    for function in functions:
+        for net_str in function.get_variables():
+            net = netlist.get_net_by_id(int(net_str))
+            record = {'name': net.get_name(), 'is_global_input': net.is_global_input_net()}
+            sources = net.get_sources()
+            if not record['is_global_input'] and sources:
+                record['source_gate'] = sources[0].get_gate().get_name()
+                record['source_pin'] = sources[0].get_pin()
+            nets[net_str] = record
+
+    analysis = {
+        'fsm_gates': fsm_gate_names,
+        'ffs': ff_names,
+        'functions': [{'function': str(function), 'variables': list(function.get_variables())}
+                      for function in functions],
+        'nets': nets,
+    }
+    os.makedirs(cache_dir, exist_ok=True)
+    write_atomic(os.path.join(cache_dir, key + '.json'), json.dumps(analysis))
+
+
+def load_analysis(cache_dir: str, key: str, values: tuple) \
+        -> Tuple[CachedNetlist, List[str], List[str], List[CachedFunction]]:
+    """
+    Load the results of an FSM analysis saved by save_analysis
+
+    Args:
+        cache_dir (str): Directory of the cache
+        key (str): Key of the analysis (see get_cache_key)
+        values (tuple): Values representing false and true when evaluating the functions
+
+    Returns:
+        Tuple[CachedNetlist, List[str], List[str], List[CachedFunction]]: The netlist,
+            names of the FSM gates, names of the FFs and the state functions, or None
+            if the analysis is not cached
+    """
+
+    path = os.path.join(cache_dir, key + '.json')
+    if not os.path.isfile(path):
+        return None
+    with open(path) as file:
+        analysis = json.load(file)
+
+    netlist = CachedNetlist(CachedNet(int(net_str), record['name'], record['is_global_input'],
+                                      record.get('source_gate'), record.get('source_pin'))
+                            for net_str, record in analysis['nets'].items())
+    functions = [CachedFunction(record['function'], record['variables'], values)
+                 for record in analysis['functions']]
+    return netlist, analysis['fsm_gates'], analysis['ffs'], functions
+
+
+def get_transitions_path(cache_dir: str, key: str, mode: str) -> str:
+    return os.path.join(cache_dir, '{}.{}.transitions'.format(key, mode))
+
+
+def save_transitions(cache_dir: str, key: str, mode: str,
+                     transitions: Iterable[Tuple[str, str, str]]) -> Iterator[Tuple[str, str, str]]:
+    """
+    Save the transition table of an FSM analysis (a 'current next input' line per
+    transition) while it is streamed: each transition is written and passed on, so the
+    table is never held in memory. The file is replaced atomically once all the
+    transitions were consumed, so an interrupted analysis saves no partial table
+
+    Args:
+        cache_dir (str): Directory of the cache
+        key (str): Key of the analysis (see get_cache_key)
+        mode (str): Name of the enumeration mode that produced the transitions
+        transitions (Iterable[Tuple[str, str, str]]): Current state, next state and
+            input strings of each transition
+
+    Yields:
+        Tuple[str, str, str]: The transitions
+    """
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = get_transitions_path(cache_dir, key, mode)
+    tmp_path = get_tmp_path(path)
+    try:
+        with open(tmp_path, 'w', buffering=TRANSITIONS_BUFFER_SIZE) as file:
+            for transition in transitions:
+                file.write('{} {} {}\n'.format(*transition))
+                yield transition
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_transitions(cache_dir: str, key: str, mode: str) -> Iterator[Tuple[str, str, str]]:
+    """
+    Load a transition table saved by save_transitions
+
+    Returns:
+        Iterator[Tuple[str, str, str]]: The transitions, read lazily, or None if they
+            are not cached
+    """
+
+    path = get_transitions_path(cache_dir, key, mode)
+    if not os.path.isfile(path):
+        return None
+    return read_transitions(path)
+
+
+def read_transitions(path: str) -> Iterator[Tuple[str, str, str]]:
+    with open(path, buffering=TRANSITIONS_BUFFER_SIZE) as file:
+        for line in file:
+            # Empty state or input strings are kept by splitting on single spaces
+            yield tuple(line.rstrip('\n').split(' '))
+
+
+def get_tmp_path(path: str) -> str:
+    """
+    Get the path of the temporary file from which a file is replaced atomically
+    """
+
+    return '{}.{}.tmp'.format(path, os.getpid())
+
+
+def write_atomic(path: str, content: str):
+    """
+    Write a file so that readers never see it partially written
+    """
+
+    tmp_path = get_tmp_path(path)
+    with open(tmp_path, 'w') as file:
+        file.write(content)
+    os.replace(tmp_path, path)
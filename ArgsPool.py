@@ -1,24 +1,32 @@
 # Environment and HAL initialization
+from __future__ import annotations
 import sys, os
 HAL_BASE = "/usr/local/"
 os.environ["HAL_BASE_PATH"] = HAL_BASE
 sys.path.append(HAL_BASE+"lib/")
-import hal_py
-hal_py.plugin_manager.load_all_plugins()
-from typing import List, Dict
-from hal_plugins import graph_algorithm
+try:
+    import hal_py
+except ImportError:
+    # Netlists can still be analyzed with the native loader (see NativeNetlist)
+    hal_py = None
+from typing import List, Dict, Tuple
 
 
-ZERO = hal_py.BooleanFunction.Value.ZERO
-ONE =  hal_py.BooleanFunction.Value.ONE
+if hal_py is not None:
+    ZERO = hal_py.BooleanFunction.Value.ZERO
+    ONE =  hal_py.BooleanFunction.Value.ONE
+else:
+    ZERO = 0
+    ONE = 1
 
 
 class ArgsPool():
     """
     Manages all possible input variables to a given list of boolean functions
     Handles:
-        1. Incrementing arguments vector values
+        1. Incrementing arguments vector values (in binary or Gray code order)
         2. Making sure that oposite outputs of FFs will have oposite boolean values
+           (only the valid argument vectors are enumerated)
         3. When evaluating a function using ArgsPool, the relevent arguments for
            that function are selected and passed to it
         4. Printing of the arguments, FSM state and FSM inputs
@@ -34,7 +42,8 @@ class ArgsPool():
         else:
             return "1"
 
-    def __init__(self, netlist: hal_py.Netlist, functions_list: List[hal_py.BooleanFunction]) -> None:
+    def __init__(self, netlist: hal_py.Netlist, functions_list: List[hal_py.BooleanFunction],
+                 gray_code: bool = False, ff_names: List[str] = None) -> None:
         """
         Collecting all argument of the given function list and creates an ArgsPool instance
 
@@ -42,6 +51,18 @@ class ArgsPool():
             netlist (hal_py.Netlist): The netlist from which the functions are taken
             functions_list (List[hal_py.BooleanFunction]): List of functions from which to
                 collect arguments
+            gray_code (bool): If True, the valid argument vectors are enumerated in Gray
+                code order, so a single free argument (with its opposite 'Q'/'QN'
+                argument, if any) changes on each increment
+            ff_names (List[str]): Name of the FF of each function (state bit). If given,
+                the state string has a character per FF in this order, so it lines up with
+                the next state (the values of the functions): the 'Q' argument of the FF,
+                or the opposite of its 'QN' argument if only that one is used. Outputs of
+                other FFs are inputs of the FSM. Otherwise the state is made of the 'Q'
+                arguments of all the FFs, in order of appearance (the original state
+                strings, which are not aligned with the next state when the order of
+                appearance is not the FF order). So giving ff_names may reorder the state
+                bits and move outputs of FFs outside the FSM from the state to the inputs
         """
 
         # List[str]: Strings of net ids of the arguments of all the functions (no repetitions)
@@ -58,12 +79,20 @@ class ArgsPool():
         self.gate_names = []  # List[str]: Name of gates from which each net starts
         
         # List[hal_py.Net]: Nets representing the state of the FSM (nets starting at
-        # a 'Q' pin of a flip flop)
+        # a 'Q' pin of a flip flop, or at a 'QN' pin, see ff_names)
         self.state_nets = []
 
-        # List[hal_py.Net]: Nets representing the input of the FSM (global input nets)
+        # List[bool]: True for each state net which is the opposite of its state bit ('QN' pin)
+        self.state_opposite = []
+
+        # List[hal_py.Net]: Nets representing the input of the FSM (global input nets,
+        # and outputs of FFs which are not state bits if ff_names is given)
         self.input_nets = []
 
+        # Dict[str, Dict[str, hal_py.Net]]: 'Q' and 'QN' argument nets of each FSM FF
+        ff_nets = {}
+        ff_index = {} if ff_names is None else {name: ind for ind, name in enumerate(ff_names)}
+
         for function in functions_list:
             new_names = function.get_variables()
             for name in new_names:
@@ -80,20 +109,69 @@ class ArgsPool():
                         self.gate_names.append('Global')
                     else:
                         source_endpoint = netlist.get_net_by_id(int(name)).get_sources()[0]
-                        self.gate_names.append(source_endpoint.get_gate().get_name())
+                        gate_name = source_endpoint.get_gate().get_name()
+                        self.gate_names.append(gate_name)
                         pin_name = source_endpoint.get_pin()
                         self.pin_names.append(pin_name)
 
-                        # If a net starts at a 'Q' pin of a ff, consider it a state bit of the FSM
-                        if pin_name == "Q":
-                            self.state_nets.append(net)
+                        if ff_names is None:
+                            # If a net starts at a 'Q' pin of a ff, consider it a state bit of the FSM
+                            if pin_name == "Q":
+                                self.state_nets.append(net)
+                                self.state_opposite.append(False)
+                        elif gate_name in ff_index and pin_name in ('Q', 'QN'):
+                            ff_nets.setdefault(gate_name, {})[pin_name] = net
+                        elif pin_name in ('Q', 'QN'):
+                            self.input_nets.append(net)
+
+        if ff_names is not None:
+            for ff_name in ff_names:
+                nets = ff_nets.get(ff_name, {})
+                if 'Q' in nets:
+                    self.state_nets.append(nets['Q'])
+                    self.state_opposite.append(False)
+                elif 'QN' in nets:
+                    self.state_nets.append(nets['QN'])
+                    self.state_opposite.append(True)
 
         # int: Maximal number that can be represented with the arguments
         self.max_args_val = 2 ** len(self.net_ids_str) - 1
 
+        # List[Tuple[int, int]]: Indexes of the 'Q' and 'QN' arguments of the same FFs
+        self.opposite_pairs = self.get_opposite_pairs()
+
+        # Dict[int, int]: The less significant argument of each 'Q'/'QN' pair is not
+        # enumerated, but set to the opposite of the more significant one.
+        # Keys are the indexes of those arguments, values are the indexes of their opposites
+        self.opposite_of = {}
+        for q_ind, qn_ind in self.opposite_pairs:
+            self.opposite_of[min(q_ind, qn_ind)] = max(q_ind, qn_ind)
+
+        # List[int]: Indexes of the arguments that are enumerated freely. Bit i of
+        # self.valid_ind is the value of argument self.free_indexes[i]. Since the
+        # opposite of each dependent argument is more significant than it, valid
+        # vectors are enumerated in ascending order of self.args_bin
+        self.free_indexes = [ind for ind in range(len(self.net_ids_str))
+                             if ind not in self.opposite_of]
+
+        # Dict[int, List[int]]: Dependent arguments of each free argument (see opposite_of)
+        self.dependents_of = {}
+        for var_ind, opposite_ind in self.opposite_of.items():
+            self.dependents_of.setdefault(opposite_ind, []).append(var_ind)
+
+        self.gray_code = gray_code
+
+        # int: Index of the current arguments vector among all the valid vectors
+        self.valid_ind = 0
+
+        # List[str]: Net IDs of the arguments whose values changed by the last
+        # increment (all the arguments before the first one)
+        self.changed_args = list(self.net_ids_str)
+
         self.is_finished_states = False  # bool: True if thera are no more possible states
 
-        self.validate_args()
+        self.args_bin = self.valid_ind2args_bin(self.valid_ind)
+        self.update_state()
 
     def __str__(self) -> str:
         """
@@ -163,9 +241,12 @@ class ArgsPool():
         """
 
         state_vector_str = ""
-        for state_net in self.state_nets:
+        for state_net, is_opposite in zip(self.state_nets, self.state_opposite):
             net_id = str(state_net.get_id())
-            state_vector_str += ArgsPool.bool2str(self.args[net_id])
+            value = ArgsPool.bool2str(self.args[net_id])
+            if is_opposite:
+                value = "1" if value == "0" else "0"
+            state_vector_str += value
         return state_vector_str
 
     def get_input_str(self) -> str:
@@ -203,25 +284,72 @@ class ArgsPool():
 
     def is_increment_possible(self) -> bool:
         """
-        Check if maximal possible argument vector value is reached
+        Check if all the valid argument vectors were enumerated
 
         Returns:
-            bool: True if self.max_args_val is not reached
+            bool: True if there are argument vectors left
         """
 
         return not self.is_finished_states
 
+    def get_valid_args_num(self) -> int:
+        """
+        Get the number of valid argument vectors (vectors in which opposite outputs
+        of FFs have opposite values), which is the number of enumerated vectors
+
+        Returns:
+            int: Number of valid argument vectors
+        """
+
+        return 2 ** len(self.free_indexes)
+
+    def valid_ind2args_bin(self, valid_ind: int) -> int:
+        """
+        Get the arguments vector of a given index among the valid vectors
+
+        Args:
+            valid_ind (int): Index of the vector among the valid vectors
+
+        Returns:
+            int: Numeric value of the arguments vector
+        """
+
+        args_bin = 0
+        for bit, var_ind in enumerate(self.free_indexes):
+            if (valid_ind >> bit) & 1:
+                args_bin |= 1 << var_ind
+        for var_ind, opposite_ind in self.opposite_of.items():
+            if not (args_bin >> opposite_ind) & 1:
+                args_bin |= 1 << var_ind
+        return args_bin
+
     def increment_args(self):
         """
-        Increment argument vector by the smallest valid amount (keeping opposite
+        Move to the next valid arguments vector (keeping opposite
         pins of FFs with oposite values)
         """
 
-        self.args_bin += 1
-        if self.args_bin == self.max_args_val:
+        self.valid_ind += 1
+        if self.valid_ind == self.get_valid_args_num():
             self.is_finished_states = True
+            self.changed_args = []
+            return
+        if self.gray_code:
+            # Gray codes of consecutive indexes differ in the lowest set bit of the index
+            free_ind = self.free_indexes[(self.valid_ind & -self.valid_ind).bit_length() - 1]
+            changed_indexes = [free_ind] + self.dependents_of.get(free_ind, [])
+            self.changed_args = []
+            for var_ind in changed_indexes:
+                self.args_bin ^= 1 << var_ind
+                name = self.net_ids_str[var_ind]
+                self.args[name] = ONE if (self.args_bin >> var_ind) & 1 else ZERO
+                self.changed_args.append(name)
+            return
+        prev_args_bin = self.args_bin
+        self.args_bin = self.valid_ind2args_bin(self.valid_ind)
+        self.changed_args = [name for bit, name in enumerate(self.net_ids_str)
+                             if ((prev_args_bin ^ self.args_bin) >> bit) & 1]
         self.update_state()
-        self.validate_args()
 
     def update_state(self):
         """
@@ -234,19 +362,6 @@ class ArgsPool():
             else:
                 self.args[var] = ZERO
 
-    def validate_args(self):
-        """
-        Increment self.args_bin until all oposite outputs of FFs ('Q' and 'QN' pins)
-        have oposite boolean values
-        """
-
-        while not self.is_state_valid():
-            self.args_bin += 1
-            self.update_state()
-            if self.args_bin == self.max_args_val:
-                self.is_finished_states = True
-                return
-
     def is_state_valid(self) -> bool:
         """
         Check if opposite outputs of same FFs ('Q' and 'QN' pins) have opposite values
@@ -273,6 +388,24 @@ class ArgsPool():
             existing_pins[cur_gate] = Pin(cur_pin_name, cur_val)
         return True
 
+    def get_opposite_pairs(self) -> List[Tuple[int, int]]:
+        """
+        Find arguments which are opposite outputs of the same FF ('Q' and 'QN' pins)
+
+        Returns:
+            List[Tuple[int, int]]: Indexes (in self.net_ids_str) of the 'Q' and 'QN'
+                arguments of each such FF
+        """
+
+        q_indexes = {}
+        qn_indexes = {}
+        for var_index, cur_gate in enumerate(self.gate_names):
+            if self.pin_names[var_index] == 'Q':
+                q_indexes[cur_gate] = var_index
+            elif self.pin_names[var_index] == 'QN':
+                qn_indexes[cur_gate] = var_index
+        return [(q_indexes[gate], qn_indexes[gate]) for gate in q_indexes if gate in qn_indexes]
+
 class Pin():
     def __init__(self, name, value):
         self.name = name
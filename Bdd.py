@@ -0,0 +1,335 @@
+from typing import Dict, Iterator, List
+from BoolExpr import ExprNode, VAR, CONST, NOT, AND, OR, XOR, topological_nodes
+
+
+# int: The constant BDD nodes
+FALSE = 0
+TRUE = 1
+
+# int: Level of the constant nodes (below all the variables)
+TERMINAL_LEVEL = 1 << 30
+
+
+class BddManager():
+    """
+    Reduced ordered binary decision diagrams. All the BDDs of a manager share their
+    nodes (a node is an integer index) and a single variable order, where the level
+    of a variable is its position in the order. Nodes are unique (a node per level,
+    low and high children), so equal functions are equal integers.
+    All operations are built on a memoized if-then-else
+    """
+
+    def __init__(self, var_names: List[str] = ()) -> None:
+        """
+        Args:
+            var_names (List[str]): Names of the variables, in order (more can be added
+                later, below the existing ones)
+        """
+
+        self.var_names = []  # List[str]: Name of the variable of each level
+        self.var_levels = {}  # Dict[str, int]: Level of each variable
+
+        # List[int]: Level, low (variable is false) and high (variable is true) child
+        # of each node
+        self.levels = [TERMINAL_LEVEL, TERMINAL_LEVEL]
+        self.lows = [FALSE, TRUE]
+        self.highs = [FALSE, TRUE]
+
+        # Dict[Tuple[int, int, int], int]: Node of each (level, low, high) triple
+        self.unique = {}
+
+        # Dict[Tuple[int, int, int], int]: Results of ite()
+        self.ite_cache = {}
+
+        for name in var_names:
+            self.add_var(name)
+
+    def add_var(self, name: str) -> int:
+        if name not in self.var_levels:
+            self.var_levels[name] = len(self.var_names)
+            self.var_names.append(name)
+        return self.var_levels[name]
+
+    def make_node(self, level: int, low: int, high: int) -> int:
+        if low == high:
+            return low
+        key = (level, low, high)
+        node = self.unique.get(key)
+        if node is None:
+            node = len(self.levels)
+            self.levels.append(level)
+            self.lows.append(low)
+            self.highs.append(high)
+            self.unique[key] = node
+        return node
+
+    def var(self, name: str) -> int:
+        """
+        Get the BDD of a variable
+        """
+
+        return self.make_node(self.var_levels[name], FALSE, TRUE)
+
+    def cofactors(self, node: int, level: int):
+        if self.levels[node] != level:
+            return node, node
+        return self.lows[node], self.highs[node]
+
+    def ite(self, f: int, g: int, h: int) -> int:
+        """
+        If f then g else h
+        """
+
+        if f == TRUE:
+            return g
+        if f == FALSE:
+            return h
+        if g == h:
+            return g
+        if g == TRUE and h == FALSE:
+            return f
+        key = (f, g, h)
+        result = self.ite_cache.get(key)
+        if result is None:
+            level = min(self.levels[f], self.levels[g], self.levels[h])
+            f0, f1 = self.cofactors(f, level)
+            g0, g1 = self.cofactors(g, level)
+            h0, h1 = self.cofactors(h, level)
+            result = self.make_node(level, self.ite(f0, g0, h0), self.ite(f1, g1, h1))
+            self.ite_cache[key] = result
+        return result
+
+    def neg(self, f: int) -> int:
+        return self.ite(f, FALSE, TRUE)
+
+    def conj(self, f: int, g: int) -> int:
+        return self.ite(f, g, FALSE)
+
+    def disj(self, f: int, g: int) -> int:
+        return self.ite(f, TRUE, g)
+
+    def xor(self, f: int, g: int) -> int:
+        return self.ite(f, self.neg(g), g)
+
+    def equiv(self, f: int, g: int) -> int:
+        return self.ite(f, g, self.neg(g))
+
+    def cube(self, values: Dict[str, bool]) -> int:
+        """
+        Get the conjunction of the given variables or their negations
+        """
+
+        node = TRUE
+        for name, value in sorted(values.items(), key=lambda item: -self.var_levels[item[0]]):
+            level = self.var_levels[name]
+            node = self.make_node(level, node, FALSE) if not value else self.make_node(level, FALSE, node)
+        return node
+
+    def restrict(self, f: int, values: Dict[int, bool]) -> int:
+        """
+        Substitute constants for variables
+
+        Args:
+            f (int): The BDD
+            values (Dict[int, bool]): Values of variables (by level)
+        """
+
+        memo = {}
+
+        def visit(node: int) -> int:
+            if node <= TRUE:
+                return node
+            if node not in memo:
+                level = self.levels[node]
+                if level in values:
+                    memo[node] = visit(self.highs[node] if values[level] else self.lows[node])
+                else:
+                    memo[node] = self.make_node(level, visit(self.lows[node]), visit(self.highs[node]))
+            return memo[node]
+
+        return visit(f)
+
+    def exists(self, f: int, levels: set) -> int:
+        """
+        Existential quantification of the variables of the given levels
+        """
+
+        return self.and_exists(f, TRUE, levels)
+
+    def and_exists(self, f: int, g: int, levels: set) -> int:
+        """
+        Existential quantification of the conjunction of two BDDs (relational product),
+        without building the conjunction first
+
+        Args:
+            f (int): First BDD
+            g (int): Second BDD
+            levels (set): Levels of the quantified variables
+        """
+
+        max_level = max(levels, default=-1)
+        memo = {}
+
+        def visit(f: int, g: int) -> int:
+            if f == FALSE or g == FALSE:
+                return FALSE
+            if f == TRUE and g == TRUE:
+                return TRUE
+            level = min(self.levels[f], self.levels[g])
+            if level > max_level:
+                return self.conj(f, g)
+            key = (f, g) if f <= g else (g, f)
+            if key in memo:
+                return memo[key]
+            f0, f1 = self.cofactors(f, level)
+            g0, g1 = self.cofactors(g, level)
+            low = visit(f0, g0)
+            if level in levels:
+                result = TRUE if low == TRUE else self.disj(low, visit(f1, g1))
+            else:
+                result = self.make_node(level, low, visit(f1, g1))
+            memo[key] = result
+            return result
+
+        return visit(f, g)
+
+    def rename(self, f: int, level_map: Dict[int, int]) -> int:
+        """
+        Replace variables by other variables
+
+        Args:
+            f (int): The BDD
+            level_map (Dict[int, int]): New level of each replaced variable (by level)
+        """
+
+        memo = {}
+
+        def visit(node: int) -> int:
+            if node <= TRUE:
+                return node
+            if node not in memo:
+                level = self.levels[node]
+                new_level = level_map.get(level, level)
+                memo[node] = self.ite(self.make_node(new_level, FALSE, TRUE),
+                                      visit(self.highs[node]), visit(self.lows[node]))
+            return memo[node]
+
+        return visit(f)
+
+    def sat_count(self, f: int, levels: List[int]) -> int:
+        """
+        Count the satisfying assignments of a BDD
+
+        Args:
+            f (int): The BDD
+            levels (List[int]): Levels of the counted variables, which include all the
+                variables of the BDD
+
+        Returns:
+            int: Number of assignments to the counted variables satisfying the BDD
+        """
+
+        levels = sorted(levels)
+        position = {level: ind for ind, level in enumerate(levels)}
+        position[TERMINAL_LEVEL] = len(levels)
+        memo = {FALSE: 0, TRUE: 1}
+
+        def visit(node: int) -> int:
+            # Assignments of the counted variables from the level of node and below
+            if node not in memo:
+                node_pos = position[self.levels[node]]
+                count = 0
+                for child in (self.lows[node], self.highs[node]):
+                    count += visit(child) << (position[self.levels[child]] - node_pos - 1)
+                memo[node] = count
+            return memo[node]
+
+        return visit(f) << position[self.levels[f]]
+
+    def iter_cubes(self, f: int, levels: List[int]) -> Iterator[str]:
+        """
+        Iterate over disjoint cubes covering a BDD (a cube per path to the true node)
+
+        Args:
+            f (int): The BDD
+            levels (List[int]): Levels of the variables of the cubes, which include all
+                the variables of the BDD
+
+        Yields:
+            str: A cube: a character per variable of levels, '0', '1' or '-' (don't care)
+        """
+
+        position = {level: ind for ind, level in enumerate(levels)}
+        stack = [(f, ['-'] * len(levels))]
+        while stack:
+            node, cube = stack.pop()
+            if node == FALSE:
+                continue
+            if node == TRUE:
+                yield ''.join(cube)
+                continue
+            pos = position[self.levels[node]]
+            for char, child in (('1', self.highs[node]), ('0', self.lows[node])):
+                child_cube = list(cube)
+                child_cube[pos] = char
+                stack.append((child, child_cube))
+
+    def from_expr(self, root: ExprNode, leaves: Dict[str, int]) -> int:
+        """
+        Build the BDD of an expression tree
+
+        Args:
+            root (ExprNode): Root of the expression tree
+            leaves (Dict[str, int]): BDD of each variable of the expression (by name)
+
+        Returns:
+            int: The BDD
+        """
+
+        results = {}
+        for node in topological_nodes(root):
+            if node.op == VAR:
+                result = leaves[node.name]
+            elif node.op == CONST:
+                result = TRUE if node.name == '1' else FALSE
+            elif node.op == NOT:
+                result = self.neg(results[id(node.args[0])])
+            else:
+                combine = {AND: self.conj, OR: self.disj, XOR: self.xor}[node.op]
+                result = results[id(node.args[0])]
+                for arg in node.args[1:]:
+                    result = combine(result, results[id(arg)])
+            results[id(node)] = result
+        return results[id(root)]
+
+    def to_dot(self, roots: Dict[str, int]) -> str:
+        """
+        Graphviz representation of BDDs (dashed edges go to low children)
+
+        Args:
+            roots (Dict[str, int]): The BDDs, by the names they are labeled with
+
+        Returns:
+            str: The .dot text
+        """
+
+        lines = ["digraph BDD {",
+                 '\tn0 [label="0", shape=box]',
+                 '\tn1 [label="1", shape=box]']
+        visited = {FALSE, TRUE}
+        stack = []
+        for name, root in roots.items():
+            lines.append('\t"{}" [shape=plaintext]'.format(name))
+            lines.append('\t"{}" -> n{}'.format(name, root))
+            stack.append(root)
+        while stack:
+            node = stack.pop()
+            if node in visited:
+                continue
+            visited.add(node)
+            lines.append('\tn{} [label="{}"]'.format(node, self.var_names[self.levels[node]]))
+            lines.append('\tn{} -> n{} [style=dashed]'.format(node, self.lows[node]))
+            lines.append('\tn{} -> n{}'.format(node, self.highs[node]))
+            stack.extend((self.lows[node], self.highs[node]))
+        lines.append("}")
+        return "\n".join(lines) + "\n"
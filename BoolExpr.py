@@ -0,0 +1,300 @@
+from typing import Dict, Iterable, List, Tuple
+import re
+
+
+# Node operation types
+VAR = 'VAR'
+CONST = 'CONST'
+NOT = 'NOT'
+AND = 'AND'
+OR = 'OR'
+XOR = 'XOR'
+
+NOT_CHARS = ('!', '~')
+BINARY_OPS = {'&': AND, '^': XOR, '|': OR}
+OP_STRS = {AND: ' & ', OR: ' | ', XOR: ' ^ '}
+CONST_TOKENS = {'0': 0, '1': 1, '0b0': 0, '0b1': 1}
+
+TOKEN_RE = re.compile(r'\s*(?:([!~&|^()])|([^\s!~&|^()]+))')
+
+
+class ExprNode():
+    """
+    Node of a boolean expression tree
+    """
+
+    __slots__ = ('op', 'args', 'name')
+
+    def __init__(self, op: str, args: Tuple['ExprNode', ...] = (), name: str = None) -> None:
+        self.op = op  # str: One of VAR, CONST, NOT, AND, OR, XOR
+        self.args = args  # Tuple[ExprNode]: Operands of NOT, AND, OR and XOR nodes
+        self.name = name  # str: Variable name of VAR nodes, '0' or '1' for CONST nodes
+
+    def __str__(self) -> str:
+        return expr2str(self)
+
+
+def tokenize(function_str: str) -> List[str]:
+    """
+    Split a function string to operator, parenthesis and operand tokens
+
+    Args:
+        function_str (str): String of a boolean function (for example '!12 & (5 | 7)')
+
+    Returns:
+        List[str]: The tokens
+    """
+
+    tokens = []
+    pos = 0
+    function_str = function_str.rstrip()
+    while pos < len(function_str):
+        match = TOKEN_RE.match(function_str, pos)
+        if match is None:
+            raise ValueError("Unexpected character at position {} of '{}'".format(pos, function_str))
+        tokens.append(match.group(1) or match.group(2))
+        pos = match.end()
+    return tokens
+
+
+class ExprParser():
+    """
+    Recursive descent parser of boolean function strings.
+    Operator precedence follows Python and SymPy (NOT, AND, XOR, OR from
+    strongest to weakest), so a parsed tree is equivalent to the expression
+    SymPy's parse_expr() builds from the same string
+    """
+
+    def __init__(self, function_str: str, variables: Iterable[str]) -> None:
+        """
+        Args:
+            function_str (str): String of the function
+            variables (Iterable[str]): Names of the variables of the function. Used to
+                tell apart a net named '0' or '1' from a constant
+        """
+
+        self.tokens = tokenize(function_str)
+        self.pos = 0
+        self.variables = set(variables)
+
+        # Dict[str, ExprNode]: One shared leaf per variable
+        self.leaves = {}
+
+    def parse(self) -> ExprNode:
+        if not self.tokens:
+            raise ValueError("Empty function string")
+        node = self.parse_binary(OR)
+        if self.pos != len(self.tokens):
+            raise ValueError("Unexpected token '{}'".format(self.tokens[self.pos]))
+        return node
+
+    def peek(self) -> str:
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None
+
+    def parse_binary(self, op: str) -> ExprNode:
+        """
+        Parse a chain of operands joined by the operator op. Chains are flattened
+        into a single n-ary node
+        """
+
+        lower_op = {OR: XOR, XOR: AND}.get(op)
+        operands = [self.parse_binary(lower_op) if lower_op else self.parse_unary()]
+        while BINARY_OPS.get(self.peek()) == op:
+            self.pos += 1
+            operands.append(self.parse_binary(lower_op) if lower_op else self.parse_unary())
+        if len(operands) == 1:
+            return operands[0]
+        args = []
+        for operand in operands:
+            if operand.op == op:
+                args.extend(operand.args)
+            else:
+                args.append(operand)
+        return ExprNode(op, tuple(args))
+
+    def parse_unary(self) -> ExprNode:
+        token = self.peek()
+        if token is None:
+            raise ValueError("Unexpected end of function string")
+        self.pos += 1
+        if token in NOT_CHARS:
+            return ExprNode(NOT, (self.parse_unary(),))
+        if token == '(':
+            node = self.parse_binary(OR)
+            if self.peek() != ')':
+                raise ValueError("Missing closing parenthesis")
+            self.pos += 1
+            return node
+        if token in self.variables:
+            if token not in self.leaves:
+                self.leaves[token] = ExprNode(VAR, name=token)
+            return self.leaves[token]
+        if token in CONST_TOKENS:
+            return ExprNode(CONST, name=str(CONST_TOKENS[token]))
+        raise ValueError("Unknown operand '{}'".format(token))
+
+
+def parse_function_str(function_str: str, variables: Iterable[str]) -> ExprNode:
+    """
+    Parse a boolean function string into an expression tree
+
+    Args:
+        function_str (str): String of the function (for example '!12 & (5 | 7)')
+        variables (Iterable[str]): Names of the variables of the function
+
+    Returns:
+        ExprNode: Root of the expression tree
+    """
+
+    return ExprParser(function_str, variables).parse()
+
+
+def parse_function(function) -> ExprNode:
+    """
+    Parse a hal boolean function into an expression tree with net IDs as variable names
+
+    Args:
+        function (hal_py.BooleanFunction): The function to parse
+
+    Returns:
+        ExprNode: Root of the expression tree
+    """
+
+    # Stand-ins of hal functions (AnalysisCache.CachedFunction) already hold their tree
+    expr = getattr(function, 'expr', None)
+    if isinstance(expr, ExprNode):
+        return expr
+    return parse_function_str(str(function), function.get_variables())
+
+
+def topological_nodes(root: ExprNode) -> List[ExprNode]:
+    """
+    List all distinct nodes of an expression tree, operands before the nodes using them
+
+    Args:
+        root (ExprNode): Root of the expression tree
+
+    Returns:
+        List[ExprNode]: The nodes, root is last
+    """
+
+    order = []
+    visited = set()
+    stack = [(root, False)]
+    while stack:
+        node, is_expanded = stack.pop()
+        if id(node) in visited:
+            continue
+        if is_expanded or not node.args:
+            visited.add(id(node))
+            order.append(node)
+        else:
+            stack.append((node, True))
+            for arg in reversed(node.args):
+                if id(arg) not in visited:
+                    stack.append((arg, False))
+    return order
+
+
+def get_node_variables(root: ExprNode) -> List[str]:
+    """
+    Get the variable names of an expression tree in order of first appearance
+    """
+
+    return [node.name for node in topological_nodes(root) if node.op == VAR]
+
+
+def evaluate_expr(root: ExprNode, values: Dict[str, bool]) -> bool:
+    """
+    Evaluate an expression tree
+
+    Args:
+        root (ExprNode): Root of the expression tree
+        values (Dict[str, bool]): Value of each variable of the tree
+
+    Returns:
+        bool: The value of the expression
+    """
+
+    results = {}
+    for node in topological_nodes(root):
+        if node.op == VAR:
+            result = bool(values[node.name])
+        elif node.op == CONST:
+            result = node.name == '1'
+        elif node.op == NOT:
+            result = not results[id(node.args[0])]
+        elif node.op == AND:
+            result = all(results[id(arg)] for arg in node.args)
+        elif node.op == OR:
+            result = any(results[id(arg)] for arg in node.args)
+        else:
+            result = sum(results[id(arg)] for arg in node.args) % 2 == 1
+        results[id(node)] = result
+    return results[id(root)]
+
+
+def expr2str(root: ExprNode, not_char: str = '!') -> str:
+    """
+    Render an expression tree as a function string, in a single pass over its nodes.
+    Compound operands are parenthesized
+
+    Args:
+        root (ExprNode): Root of the expression tree
+        not_char (str): Character of the NOT operator ('!' for hal, '~' for SymPy)
+
+    Returns:
+        str: The function string (for example '!12 & (5 | 7)')
+    """
+
+    # Dict[int, str]: String of each node as an operand of another node
+    operand_strs = {}
+    node_str = None
+    for node in topological_nodes(root):
+        if node.op in (VAR, CONST):
+            node_str = node.name
+        elif node.op == NOT:
+            node_str = not_char + operand_strs[id(node.args[0])]
+        else:
+            node_str = OP_STRS[node.op].join(operand_strs[id(arg)] for arg in node.args)
+        operand_strs[id(node)] = node_str if node.op in (VAR, CONST, NOT) else '(' + node_str + ')'
+    return node_str
+
+
+def substitute_variables(root: ExprNode, replacements: Dict[str, ExprNode]) -> ExprNode:
+    """
+    Replace the variables of an expression tree by other expressions, in a single pass
+    over its nodes. Double negations are removed and nested operations of the same
+    type are flattened
+
+    Args:
+        root (ExprNode): Root of the expression tree
+        replacements (Dict[str, ExprNode]): Expression replacing each variable. Variables
+            not in the dictionary are kept
+
+    Returns:
+        ExprNode: Root of the new expression tree
+    """
+
+    results = {}
+    for node in topological_nodes(root):
+        if node.op == VAR:
+            result = replacements.get(node.name, node)
+        elif node.op == CONST:
+            result = node
+        elif node.op == NOT:
+            arg = results[id(node.args[0])]
+            result = arg.args[0] if arg.op == NOT else ExprNode(NOT, (arg,))
+        else:
+            args = []
+            for arg in node.args:
+                arg = results[id(arg)]
+                if arg.op == node.op:
+                    args.extend(arg.args)
+                else:
+                    args.append(arg)
+            result = ExprNode(node.op, tuple(args))
+        results[id(node)] = result
+    return results[id(root)]
@@ -0,0 +1,305 @@
+from typing import Dict, Iterable, List
+from pysat.formula import IDPool
+from BoolExpr import ExprNode, VAR, CONST, NOT, AND, OR, XOR, topological_nodes
+
+
+TRUE_VAR_NAME = '__true'
+AUX_VAR_PREFIX = '__t'
+
+
+class TseitinEncoder():
+    """
+    Linear size CNF encoder of boolean expression trees.
+    Each AND, OR and XOR node gets an auxiliary variable which is constrained
+    to be equivalent to the node (Tseitin transformation), so the number of
+    clauses grows linearly with the size of the expression instead of
+    exponentially as with to_cnf().
+    Handles:
+        1. Constant propagation (constants and fixed variables are folded away)
+        2. Structural hashing: Equal gates over equal literals get the same
+           auxiliary variable, also across different expressions encoded by the
+           same encoder
+        3. Native XOR constraints: XOR gates may be kept as XOR constraints for
+           XOR-aware solvers (CryptoMiniSat) instead of being expanded to clauses
+    """
+
+    def __init__(self, vars_pool: IDPool = None, native_xor: bool = False) -> None:
+        """
+        Args:
+            vars_pool (IDPool): Pool of SAT variables shared with the caller. Variables of
+                the expressions get the IDs of their names in the pool
+            native_xor (bool): If True, XOR gates are added to xor_clauses instead of clauses
+        """
+
+        if vars_pool is None:
+            vars_pool = IDPool()
+        self.vars_pool = vars_pool
+
+        # List[List[int]]: All the clauses generated by the encoder
+        self.clauses = []
+
+        # int: Literal which is always true (constants are encoded as +-true_lit)
+        self.true_lit = self.vars_pool.id(TRUE_VAR_NAME)
+        self.clauses.append([self.true_lit])
+
+        # Dict[tuple, int]: Literal of each gate already encoded, keyed by the gate
+        # type and the literals of its operands
+        self.gates = {}
+
+        self.native_xor = native_xor
+
+        # List[List[int]]: XOR constraints, each constraining the exclusive or of its
+        # literals to be false (see add_xor). Empty unless native_xor is True
+        self.xor_clauses = []
+
+    def new_var(self) -> int:
+        return self.vars_pool.id(AUX_VAR_PREFIX + str(self.vars_pool.top + 1))
+
+    def new_vars(self, count: int) -> List[int]:
+        """
+        Allocate auxiliary variables
+
+        Returns:
+            List[int]: The variables
+        """
+
+        return [self.new_var() for _ in range(count)]
+
+    def encode(self, root: ExprNode, fixed: Dict[str, bool] = None) -> int:
+        """
+        Encode an expression tree
+
+        Args:
+            root (ExprNode): Root of the expression tree
+            fixed (Dict[str, bool]): Variables with known values, which are substituted
+                by constants
+
+        Returns:
+            int: Literal equivalent to the expression (+-self.true_lit if it is constant)
+        """
+
+        if fixed is None:
+            fixed = {}
+        lits = {}
+        for node in topological_nodes(root):
+            if node.op == VAR:
+                if node.name in fixed:
+                    lit = self.const_lit(fixed[node.name])
+                else:
+                    lit = self.vars_pool.id(node.name)
+            elif node.op == CONST:
+                lit = self.const_lit(node.name == '1')
+            elif node.op == NOT:
+                lit = -lits[id(node.args[0])]
+            elif node.op == AND:
+                lit = self.encode_and([lits[id(arg)] for arg in node.args])
+            elif node.op == OR:
+                lit = -self.encode_and([-lits[id(arg)] for arg in node.args])
+            else:
+                lit = lits[id(node.args[0])]
+                for arg in node.args[1:]:
+                    lit = self.encode_xor(lit, lits[id(arg)])
+            lits[id(node)] = lit
+        return lits[id(root)]
+
+    def const_lit(self, value: bool) -> int:
+        return self.true_lit if value else -self.true_lit
+
+    def encode_and(self, operands: List[int]) -> int:
+        """
+        Get a literal equivalent to the conjunction of the given literals
+        """
+
+        unique = set()
+        for lit in operands:
+            if lit == -self.true_lit or -lit in unique:
+                return -self.true_lit
+            if lit != self.true_lit:
+                unique.add(lit)
+        if not unique:
+            return self.true_lit
+        if len(unique) == 1:
+            return unique.pop()
+        key = (AND, tuple(sorted(unique)))
+        if key not in self.gates:
+            out = self.new_var()
+            for lit in key[1]:
+                self.clauses.append([-out, lit])
+            self.clauses.append([out] + [-lit for lit in key[1]])
+            self.gates[key] = out
+        return self.gates[key]
+
+    def encode_xor(self, lit1: int, lit2: int) -> int:
+        """
+        Get a literal equivalent to the exclusive or of two literals
+        """
+
+        # Negations are moved outside of the gate, so a ^ b, !a ^ !b, !(!a ^ b)
+        # share the same auxiliary variable
+        sign = 1
+        if lit1 < 0:
+            lit1, sign = -lit1, -sign
+        if lit2 < 0:
+            lit2, sign = -lit2, -sign
+        if lit1 == lit2:
+            return -sign * self.true_lit
+        if lit1 == self.true_lit:
+            return -sign * lit2
+        if lit2 == self.true_lit:
+            return -sign * lit1
+        key = (XOR, min(lit1, lit2), max(lit1, lit2))
+        if key not in self.gates:
+            out = self.new_var()
+            self.add_xor([out, lit1, lit2])
+            self.gates[key] = out
+        return sign * self.gates[key]
+
+    def add_xor(self, lits: List[int]):
+        """
+        Constrain out == (lit1 != lit2), given as [out, lit1, lit2] (the exclusive or
+        of the three literals is false). Kept as a native XOR constraint if native_xor
+        is True, otherwise added as four clauses
+        """
+
+        if self.native_xor:
+            self.xor_clauses.append(lits)
+        else:
+            self.clauses.extend(xnor_clauses(lits[0], lits[1], lits[2], negate=True))
+
+    def add_equal(self, lit1: int, lit2: int):
+        """
+        Constrain two literals to be equal
+        """
+
+        self.clauses.append([-lit1, lit2])
+        self.clauses.append([lit1, -lit2])
+
+
+class ClauseTemplate():
+    """
+    CNF encoding of a list of expression trees over local (template) variables,
+    which can be instantiated any number of times into a TseitinEncoder.
+    The template variables are numbered: the true variable, the expression variables,
+    then the auxiliary variables. An instance is created by renaming the template
+    literals: expression variables by name (copied variables with a suffix, fixed
+    variables become constants) and the auxiliary variables by a constant offset into a
+    block of fresh variables. So each instance costs O(clauses) integer operations and
+    no traversal of the expressions
+    """
+
+    def __init__(self, functions: List[ExprNode], copied_vars: Iterable[str] = (),
+                 native_xor: bool = False) -> None:
+        """
+        Args:
+            functions (List[ExprNode]): The expression trees
+            copied_vars (Iterable[str]): Variables renamed in each instance (see instantiate)
+            native_xor (bool): If True, XOR gates are kept as XOR constraints (see
+                TseitinEncoder)
+        """
+
+        encoder = TseitinEncoder(native_xor=native_xor)
+        outputs = [encoder.encode(function) for function in functions]
+        names = []
+        aux_vars = []
+        for var in range(1, encoder.vars_pool.top + 1):
+            name = encoder.vars_pool.obj(var)
+            if name.startswith(AUX_VAR_PREFIX):
+                aux_vars.append(var)
+            elif var != encoder.true_lit:
+                names.append(name)
+
+        # List[int]: Template variable of each encoder variable
+        renumber = [0] * (encoder.vars_pool.top + 1)
+        renumber[encoder.true_lit] = 1
+        for ind, name in enumerate(names):
+            renumber[encoder.vars_pool.id(name)] = ind + 2
+        for ind, var in enumerate(aux_vars):
+            renumber[var] = len(names) + 2 + ind
+
+        def renumber_lit(lit: int) -> int:
+            return renumber[lit] if lit > 0 else -renumber[-lit]
+
+        # List[int]: Template literal equivalent to each expression
+        self.outputs = [renumber_lit(lit) for lit in outputs]
+
+        # List[List[int]]: Template clauses
+        self.clauses = [[renumber_lit(lit) for lit in clause] for clause in encoder.clauses]
+
+        # List[List[int]]: Template XOR constraints (see TseitinEncoder.add_xor)
+        self.xor_clauses = [[renumber_lit(lit) for lit in lits] for lits in encoder.xor_clauses]
+
+        # int: Template variable which is always true
+        self.true_var = 1
+
+        # List[str]: Names of the template variables 2, 3, ... (expression variables)
+        self.var_names = names
+
+        copied_vars = set(copied_vars)
+        # List[bool]: True for each expression variable that is renamed in each instance
+        self.is_copied = [name in copied_vars for name in names]
+
+        # int: First template auxiliary variable
+        self.aux_start = len(names) + 2
+
+        # int: Number of template variables
+        self.vars_num = len(names) + 1 + len(aux_vars)
+
+    def instantiate(self, encoder: TseitinEncoder, fixed: Dict[str, bool] = None,
+                    suffix: str = '', lits: Dict[str, int] = None) -> List[int]:
+        """
+        Add a copy of the template clauses to an encoder
+
+        Args:
+            encoder (TseitinEncoder): The encoder to add the clauses to. Expression variables
+                are mapped to the encoder variables with the same names
+            fixed (Dict[str, bool]): Expression variables with known values (by template
+                names), which are substituted by constants
+            suffix (str): Suffix added to the names of the copied variables in this instance
+            lits (Dict[str, int]): Encoder literals of expression variables (by template
+                names), which are used instead of the variables of the same names
+
+        Returns:
+            List[int]: Encoder literal equivalent to each expression of the copy
+        """
+
+        if fixed is None:
+            fixed = {}
+        if lits is None:
+            lits = {}
+        true_lit = encoder.true_lit
+        lit_map = [0, true_lit]
+        for name, is_copied in zip(self.var_names, self.is_copied):
+            if name in lits:
+                lit_map.append(lits[name])
+            elif name in fixed:
+                lit_map.append(encoder.const_lit(fixed[name]))
+            else:
+                lit_map.append(encoder.vars_pool.id(name + suffix if is_copied else name))
+        lit_map.extend(encoder.new_vars(self.vars_num - self.aux_start + 1))
+
+        for clause in self.clauses:
+            new_clause = []
+            for lit in clause:
+                new_lit = lit_map[lit] if lit > 0 else -lit_map[-lit]
+                if new_lit == true_lit:
+                    break
+                if new_lit != -true_lit:
+                    new_clause.append(new_lit)
+            else:
+                # A clause whose literals are all false is kept as the false literal
+                encoder.clauses.append(new_clause or [-true_lit])
+        for lits in self.xor_clauses:
+            encoder.add_xor([lit_map[lit] if lit > 0 else -lit_map[-lit] for lit in lits])
+
+        return [lit_map[lit] if lit > 0 else -lit_map[-lit] for lit in self.outputs]
+
+
+def xnor_clauses(out: int, lit1: int, lit2: int, negate: bool = False) -> List[List[int]]:
+    """
+    Clauses constraining out == (lit1 == lit2), or out == (lit1 != lit2) if negate is True
+    """
+
+    if negate:
+        out = -out
+    return [[-out, -lit1, lit2], [-out, lit1, -lit2], [out, lit1, lit2], [out, -lit1, -lit2]]
+
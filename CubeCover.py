@@ -0,0 +1,121 @@
+from typing import Dict, Iterable, Iterator, List
+from itertools import product
+
+
+DONT_CARE_CHAR = '-'
+
+
+def expand_cube(cube: str) -> List[str]:
+    """
+    Get all the minterms covered by a cube
+    """
+
+    options = [('0', '1') if char == DONT_CARE_CHAR else (char,) for char in cube]
+    return [''.join(minterm) for minterm in product(*options)]
+
+
+def get_cube_str(value: int, care_mask: int, width: int) -> str:
+    """
+    Convert a cube given as the value and the mask of its cared bits (bit 0 is the last
+    character) to a string
+    """
+
+    return ''.join(DONT_CARE_CHAR if not care_mask >> bit & 1 else '1' if value >> bit & 1 else '0'
+                   for bit in reversed(range(width)))
+
+
+def iter_cube_values(value: int, free_mask: int) -> Iterator[int]:
+    """
+    Iterate over the minterms of a cube given as the value of its cared bits and the
+    mask of its free bits
+    """
+
+    subset = free_mask
+    while True:
+        yield value | subset
+        if subset == 0:
+            return
+        subset = (subset - 1) & free_mask
+
+
+def minimize_cover(minterms: Iterable[str]) -> List[str]:
+    """
+    Find a small set of cubes covering exactly the given minterms, in the style of
+    the Espresso heuristic instead of generating all the prime implicants (which is
+    exponential in the input width):
+        1. Expand: each minterm not covered yet is grown into a prime cube, by
+           freeing its bits one at a time as long as the cube covers only given
+           minterms
+        2. Irredundant: cubes whose minterms are all covered by other cubes are
+           removed, smallest first
+
+    Args:
+        minterms (Iterable[str]): Minterms (for example '0110')
+
+    Returns:
+        List[str]: The cubes, sorted
+    """
+
+    minterms = set(minterms)
+    if not minterms:
+        return []
+    width = len(next(iter(minterms)))
+    if width == 0:
+        return ['']
+    full_mask = (1 << width) - 1
+    on_set = {int(minterm, 2) for minterm in minterms}
+
+    # List[Tuple[int, int]]: Value and care mask of each cube of the cover
+    cubes = []
+    covered = set()
+    for minterm in sorted(on_set):
+        if minterm in covered:
+            continue
+        care_mask = full_mask
+        for bit in range(width):
+            # Freeing the bit adds the minterms of the cube with the bit flipped. The
+            # check stops at the first of them out of the on set, so it costs at most
+            # the size of the on set
+            flipped = (minterm ^ (1 << bit)) & care_mask
+            if all(value in on_set for value in iter_cube_values(flipped, full_mask ^ care_mask)):
+                care_mask &= ~(1 << bit)
+        cubes.append((minterm & care_mask, care_mask))
+        covered.update(iter_cube_values(minterm & care_mask, full_mask ^ care_mask))
+
+    # Dict[int, int]: Number of cubes covering each minterm
+    cover_count = dict.fromkeys(on_set, 0)
+    cube_minterms = []
+    for value, care_mask in cubes:
+        # The cubes cover only minterms of the on set, so their minterms are listed
+        # directly (the size of the cube, not of the on set)
+        cube_minterms.append(list(iter_cube_values(value, full_mask ^ care_mask)))
+        for minterm in cube_minterms[-1]:
+            cover_count[minterm] += 1
+    cover = []
+    for ind in sorted(range(len(cubes)), key=lambda ind: len(cube_minterms[ind])):
+        if all(cover_count[minterm] > 1 for minterm in cube_minterms[ind]):
+            for minterm in cube_minterms[ind]:
+                cover_count[minterm] -= 1
+        else:
+            cover.append(get_cube_str(*cubes[ind], width))
+    return sorted(cover)
+
+
+def compress_edges(transitions: Iterable[tuple]) -> Dict[tuple, List[str]]:
+    """
+    Group transitions by their current and next states and replace the input
+    vectors of each group by a minimized cube cover
+
+    Args:
+        transitions (Iterable[Tuple[str, str, str]]): Current state, next state and
+            input strings of each transition
+
+    Returns:
+        Dict[Tuple[str, str], List[str]]: Input cubes of each (current, next) state pair,
+            in order of first appearance
+    """
+
+    edges = {}
+    for cur_state, next_state, cur_input in transitions:
+        edges.setdefault((cur_state, next_state), []).append(cur_input)
+    return {edge: minimize_cover(inputs) for edge, inputs in edges.items()}
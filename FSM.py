@@ -1,21 +1,46 @@
 # Environment and HAL initialization
+from __future__ import annotations
 import sys, os
+from collections import namedtuple
 HAL_BASE = "/usr/local/"
 os.environ["HAL_BASE_PATH"] = HAL_BASE
 sys.path.append(HAL_BASE+"lib/")
-import hal_py
-hal_py.plugin_manager.load_all_plugins()
-from hal_plugins import graph_algorithm
-from ArgsPool import ArgsPool
-from typing import Dict, List, Union, Tuple
-import re
+try:
+    import hal_py
+except ImportError:
+    # Netlists can still be analyzed with the native loader (see NativeNetlist)
+    hal_py = None
+from ArgsPool import ArgsPool, ZERO, ONE
+from NativeNetlist import NativeNetlist, CellType, get_cells_hash, load_native_netlist
+from BoolExpr import ExprNode, VAR, NOT, parse_function, expr2str, substitute_variables
+from TruthTable import BatchEvaluator, SupportEvaluator
+from Reachability import ReachabilityExplorer
+from SymbolicFsm import SymbolicFsm
+from FsmCandidates import rank_fsm_candidates
+from CubeCover import compress_edges
+from TransitionWriter import DOT_FORMAT, open_writer
+from AnalysisCache import get_cache_key, load_analysis, save_analysis, load_transitions, \
+    save_transitions, DEFAULT_CACHE_DIR
+from typing import Dict, Iterator, List, Union, Tuple
 
 
-ZERO = hal_py.BooleanFunction.Value.ZERO
-ONE =  hal_py.BooleanFunction.Value.ONE
 HAL_NOT_CHAR = '!'
 SYMPY_NOT_CHAR = '~'
 
+# str: Suffix of the .dot file of the state function BDDs (see analyze_fsm SYMBOLIC_MODE)
+BDD_DOT_SUFFIX = "_bdd.dot"
+
+# str: Transition enumeration modes of analyze_fsm (see analyze_fsm mode)
+BATCHED_MODE = "batched"
+PER_VECTOR_MODE = "per_vector"
+GRAY_CODE_MODE = "gray_code"
+DECOMPOSED_MODE = "decomposed"
+REACHABLE_MODE = "reachable"
+SYMBOLIC_MODE = "symbolic"
+
+# bool: True once the hal plugins are loaded (see load_hal_plugins)
+hal_plugins_loaded = False
+
 
 class PosNegNet():
     def __init__(self, netlist: hal_py.Netlist) -> None:
@@ -40,6 +65,20 @@ class PosNegNet():
         return "PosNet - {}, NegNet - {}".format(self.pos, self.neg)
 
 
+def load_hal_plugins():
+    """
+    Load the hal plugins. Deferred until a netlist is loaded by hal, since the
+    native loader (NativeNetlist) does not need them
+    """
+
+    global hal_plugins_loaded
+    if not hal_plugins_loaded:
+        hal_py.plugin_manager.load_all_plugins()
+        # Registers the python types of the graph_algorithm plugin
+        from hal_plugins import graph_algorithm
+        hal_plugins_loaded = True
+
+
 def clear_all(netlist: hal_py.Netlist):
     """Deleting all existing modules and groupings
 
@@ -106,72 +145,6 @@ def get_not_ffs(netlist_or_module: Union[hal_py.Netlist, hal_py.Module]) -> List
     return netlist_or_module.get_gates(lambda g : "FF" not in g.get_type().get_name())
 
 
-def get_ffs_num(gates: List[hal_py.Gate]) -> int:
-    """
-    Count number of FFs in a given list of gates
-
-    Args:
-        gates (List[hal_py.Gate]): Gate to count FFs in
-
-    Returns:
-        int: Number of FFs
-    """
-
-    ff_num = 0
-    for g in gates:
-        if 'FF' in g.get_type().get_name():
-            ff_num += 1
-    return ff_num
-
-
-def get_fsm_candidates(netlist: hal_py.Netlist) -> List[List[hal_py.Gate]]:
-    """
-    Find all subgraphs made of strongly connected components that are bigger
-    that one node
-
-    Args:
-        netlist (hal_py.Netlist): The netlist in which to search for the FSM
-
-    Returns:
-        List[List[hal_py.Gate]]: List of strongly connected components
-    """
-
-    graph_algorithms = hal_py.plugin_manager.get_plugin_instance("graph_algorithm")
-
-    # Getting all strongly connected components
-    scc = graph_algorithms.get_strongly_connected_components(netlist)
-    
-    # Ignore single nodes
-    candidates = []
-    for c in scc:
-        if len(c) > 1:
-            candidates.append(c)
-
-    return candidates
-
-
-def select_fsm(candidates: List[List[hal_py.Gate]]) -> List[hal_py.Gate]:
-    """
-    Find the strongly connected sub-graph with the smalles amount of nodes.
-    This is assumed to be the control path state machine
-
-    Args:
-        candidates (List[List[hal_py.Gate]]): All the candidate to the smallest SCC sub-graph
-
-    Returns:
-        List[hal_py.Gate]: The control path FSM
-    """
-
-    selected_index = 0
-    min_ffs_num = get_ffs_num(candidates[selected_index])
-    for ind, c in enumerate(candidates):
-        cur_ffs_num = get_ffs_num(c)
-        if cur_ffs_num < min_ffs_num:
-            min_ffs_num = cur_ffs_num
-            selected_index = ind 
-    return candidates[selected_index]
-    
-    
 def dfs_from_net(net: hal_py.Net) -> List[hal_py.Gate]:
     """
     Backtrace from a FFs input net to global input. Return all gates inbetween.
@@ -186,12 +159,14 @@ def dfs_from_net(net: hal_py.Net) -> List[hal_py.Gate]:
     """
 
     gate_list = []
+    visited_ids = set()
     stack = [net]
     while(stack):
         n = stack.pop()
         for endpoint in n.get_sources():
             gate = endpoint.get_gate()
-            if gate not in gate_list:
+            if gate.get_id() not in visited_ids:
+                visited_ids.add(gate.get_id())
                 gate_list.append(gate)
                 for net in gate.get_fan_in_nets():
                     if not net.is_global_input_net():
@@ -199,27 +174,175 @@ def dfs_from_net(net: hal_py.Net) -> List[hal_py.Gate]:
     return gate_list
 
 
-def get_ff_input_func(netlist: hal_py.Netlist, flipflop: hal_py.Gate) -> hal_py.BooleanFunction:
+def get_source_gates(net: hal_py.Net) -> List[hal_py.Gate]:
+    """
+    Get the gates driving a net (none for global input nets)
+    """
+
+    if net.is_global_input_net():
+        return []
+    return [endpoint.get_gate() for endpoint in net.get_sources()]
+
+
+def get_ff_input_cones(flipflops: List[hal_py.Gate]) -> Dict[int, List[hal_py.Gate]]:
+    """
+    Get the combinational gates of the fan-in cone of the input ('D' pin) of each given FF.
+    All the cones are computed in a single post-order traversal which stops at FFs and
+    global inputs. Every gate is visited once and the cone of each gate output is
+    computed once and shared by all the cones containing it.
+    The combinational logic is assumed to be loop free
+
+    Args:
+        flipflops (List[hal_py.Gate]): The FFs
+
+    Returns:
+        Dict[int, List[hal_py.Gate]]: Gates of the input cone of each FF (by FF ID)
+    """
+
+    gates_by_id = {}
+
+    # Dict[int, frozenset]: IDs of the combinational gates of the cone of each visited
+    # gate's output (including the gate itself). Empty for FFs
+    gate_cones = {}
+
+    def visit(root: hal_py.Gate):
+        stack = [(root, False)]
+        in_progress = set()
+        while stack:
+            gate, is_expanded = stack.pop()
+            gate_id = gate.get_id()
+            if gate_id in gate_cones:
+                continue
+            if is_expanded:
+                fan_in_ids = {source.get_id() for net in gate.get_fan_in_nets()
+                              for source in get_source_gates(net)}
+                cone = {gate_id}
+                for source_id in fan_in_ids:
+                    # Sources still in progress are part of a combinational loop
+                    cone |= gate_cones.get(source_id, frozenset())
+                gate_cones[gate_id] = frozenset(cone)
+                continue
+            gates_by_id[gate_id] = gate
+            if "FF" in gate.get_type().get_name():
+                gate_cones[gate_id] = frozenset()
+                continue
+            if gate_id in in_progress:
+                continue
+            in_progress.add(gate_id)
+            stack.append((gate, True))
+            for net in gate.get_fan_in_nets():
+                for source in get_source_gates(net):
+                    if source.get_id() not in gate_cones:
+                        stack.append((source, False))
+
+    ff_cones = {}
+    for flipflop in flipflops:
+        cone = set()
+        for source in get_source_gates(flipflop.get_fan_in_net('D')):
+            visit(source)
+            cone |= gate_cones[source.get_id()]
+        ff_cones[flipflop.get_id()] = [gates_by_id[gate_id] for gate_id in cone]
+    return ff_cones
+
+
+def get_ff_input_func(netlist: hal_py.Netlist, flipflop: hal_py.Gate,
+                      cone: List[hal_py.Gate] = None) -> hal_py.BooleanFunction:
     """
     Get boolean function of the input to a given FF
 
     Args:
         netlist (hal_py.Netlist): The netlist in which the flip flops are
         flipflop (hal_py.Gate): The FF which input function to calculate
+        cone (List[hal_py.Gate]): The combinational gates of the input cone of the FF
+            (see get_ff_input_cones). Computed if not given
 
     Returns:
         hal_py.BooleanFunction: The input function
     """ 
 
     fanin_net = flipflop.get_fan_in_net('D')
-    gates = dfs_from_net(fanin_net)
-    all_ffs = get_ffs(netlist)
-    for ff in all_ffs:
-            if ff in gates: gates.remove(ff)
-    func = hal_py.NetlistUtils.get_subgraph_function(fanin_net, gates)
+    if cone is None:
+        cone = get_ff_input_cones([flipflop])[flipflop.get_id()]
+    if isinstance(netlist, NativeNetlist):
+        return netlist.get_subgraph_function(fanin_net, cone, (ZERO, ONE))
+    func = hal_py.NetlistUtils.get_subgraph_function(fanin_net, cone)
     return func
 
 
+def get_pin_display_name(netlist: hal_py.Netlist, net_str: str, key_group: int = None) -> Tuple[str, bool]:
+    """
+    Get the name of the argument representing a net in function strings (see get_function_str)
+
+    Args:
+        netlist (hal_py.Netlist): The netlist in which the net is defined
+        net_str (str): String of the net ID
+        key_group (int): Key group number, added as suffix to global input names
+
+    Returns:
+        Tuple[str, bool]:
+            str: The display name (for example 'Q_619' or 'INPUT2')
+            bool: True if the net is the opposite of the named argument ('QN' pins)
+    """
+
+    net = netlist.get_net_by_id(int(net_str))
+    if net.is_global_input_net():
+        pin_name = net.get_name().replace('(', '').replace(')', '')
+        if key_group is not None:
+            pin_name += '_' + str(key_group)
+        return pin_name, False
+    source_endpoint = net.get_sources()[0]
+    pin_name = source_endpoint.get_pin()
+    is_negative = pin_name == 'QN'
+    if is_negative:
+        pin_name = pin_name[:-1]
+    return get_gate_pin_display_name(source_endpoint.get_gate().get_name(), pin_name), is_negative
+
+
+def get_gate_pin_display_name(gate_name: str, pin_name: str = 'Q') -> str:
+    """
+    Get the display name of a gate output pin (for example 'Q_619' for pin Q of gate _619_).
+    With the default pin, it is the name of the state variable of a FF
+    """
+
+    return pin_name + '_' + gate_name.replace('_', '')
+
+
+def get_function_expr(netlist: hal_py.Netlist, function: hal_py.BooleanFunction, key_group: int = None) \
+    -> Tuple[ExprNode, Dict[str, PosNegNet]]:
+    """
+    Get the expression tree of a function with pin names instead of net IDs as variables
+    (see get_function_str). The function is parsed once, the display name of each net
+    is computed once, and the variables are replaced in a single pass over the tree.
+    Nets of 'QN' pins are replaced by the negation of the 'Q' pin variable
+
+    Args:
+        netlist (hal_py.Netlist): The netlist in which the function is defined
+        function (hal_py.BooleanFunction): The function
+        key_group (int): Key group number, added as suffix to global input names
+
+    Returns:
+        Tuple[ExprNode, Dict[str, PosNegNet]]: The expression tree and the nets of each
+            argument name (see get_function_str)
+    """
+
+    pin2net_dict = {}
+
+    # Dict[str, ExprNode]: Expression replacing each net ID variable
+    replacements = {}
+
+    # Dict[str, ExprNode]: One shared leaf per display name
+    leaves = {}
+    for net_str in function.get_variables():
+        pin_display_name, is_negative = get_pin_display_name(netlist, net_str, key_group)
+        if pin_display_name not in pin2net_dict:
+            pin2net_dict[pin_display_name] = PosNegNet(netlist)
+            leaves[pin_display_name] = ExprNode(VAR, name=pin_display_name)
+        pin2net_dict[pin_display_name].add_net(net_str, is_negative)
+        leaf = leaves[pin_display_name]
+        replacements[net_str] = ExprNode(NOT, (leaf,)) if is_negative else leaf
+    return substitute_variables(parse_function(function), replacements), pin2net_dict
+
+
 def get_function_str(netlist: hal_py.Netlist, function: hal_py.BooleanFunction, key_group: int = None) \
     -> Tuple[str, Dict[str, PosNegNet]]:
     """Get a string describing a given boolean function with gate names and pin names
@@ -231,6 +354,7 @@ def get_function_str(netlist: hal_py.Netlist, function: hal_py.BooleanFunction,
     Args:
         netlist (hal_py.Netlist): The netlist in which the function is defined
         function (hal_py.BooleanFunction): The funciton to print
+        key_group (int): Key group number, added as suffix to global input names
 
     Returns:
         Tuple[str, Dict[str, str]]: 
@@ -242,43 +366,138 @@ def get_function_str(netlist: hal_py.Netlist, function: hal_py.BooleanFunction,
                 Also, each PosNegNet object indicates whether the network is global input network or not
     """
 
-    net_indexes_str = str(function)
-    pin_names_str = net_indexes_str
-    pin2net_dict = {}
-    net_names = function.get_variables()
-    for net_str in net_names:
-        net = netlist.get_net_by_id(int(net_str))
-        sign_char = ''
-        is_negative = False
-        if net.is_global_input_net():
-            pin_name = netlist.get_net_by_id(int(net_str)).get_name()
-            pin_name = pin_name.replace('(', '')
-            pin_name = pin_name.replace(')', '')
-            gate_name = ''
-            if key_group is not None:
-                pin_name += '_' + str(key_group)
-        else:
-            source_endpoint = netlist.get_net_by_id(int(net_str)).get_sources()[0]
-            gate_name = source_endpoint.get_gate().get_name()
-            pin_name = source_endpoint.get_pin()
-            if pin_name == 'QN':
-                is_negative = True
-                pin_name = pin_name[:-1]
-                sign_char = HAL_NOT_CHAR
-            pin_name += '_'
-        gate_name = gate_name.replace('_', '')
-        pin_display_name = pin_name+gate_name
-        if pin_display_name not in pin2net_dict:
-            pin2net_dict[pin_display_name] = PosNegNet(netlist)
-        pin2net_dict[pin_display_name].add_net(net_str, is_negative)
-        # Avoid replacing two (for example) first digits of a three digit number
-        pin_names_str = re.sub(net_str+'\\b', sign_char+pin_display_name, pin_names_str)
-    pin_names_str = pin_names_str.replace(HAL_NOT_CHAR, SYMPY_NOT_CHAR)
-    return pin_names_str, pin2net_dict
+    expr, pin2net_dict = get_function_expr(netlist, function, key_group)
+    return expr2str(expr, SYMPY_NOT_CHAR), pin2net_dict
+
+
+def iter_argspool_transitions(argspool: ArgsPool, state_functions: List[hal_py.BooleanFunction],
+                              print_args: bool = False) -> Iterator[Tuple[str, str, str]]:
+    """
+    Iterate over the transitions of an FSM by evaluating the state functions
+    for each argument vector of an ArgsPool
+
+    Args:
+        argspool (ArgsPool): Arguments of the state functions
+        state_functions (List[hal_py.BooleanFunction]): The state functions
+        print_args (bool): If True, each argument vector is printed with its next state
+
+    Yields:
+        Tuple[str, str, str]: Current state, next state and input strings
+    """
+
+    while argspool.is_increment_possible():
+        next_state = ""
+        for function in state_functions:
+            next_state += argspool.evaluate(function)
+        if print_args:
+            print("\n{}Next state: {}".format(argspool, next_state))
+        yield argspool.get_state_str(), next_state, argspool.get_input_str()
+        argspool.increment_args()
+
+
+def iter_incremental_transitions(argspool: ArgsPool, state_functions: List[hal_py.BooleanFunction],
+                                 print_args: bool = False) -> Iterator[Tuple[str, str, str]]:
+    """
+    Same as iter_argspool_transitions, but after each increment only the state functions
+    of the changed arguments are evaluated again, and the other next state bits are
+    reused. With a Gray code ArgsPool a single argument changes per increment, so
+    functions of a few nets are rarely evaluated
+
+    Args:
+        argspool (ArgsPool): Arguments of the state functions (see ArgsPool gray_code)
+        state_functions (List[hal_py.BooleanFunction]): The state functions
+        print_args (bool): If True, each argument vector is printed with its next state
+
+    Yields:
+        Tuple[str, str, str]: Current state, next state and input strings
+    """
+
+    # Dict[str, List[int]]: Indexes of the state functions of each argument (by net ID)
+    dependents = {name: [] for name in argspool.net_ids_str}
+    for function_ind, function in enumerate(state_functions):
+        for name in function.get_variables():
+            dependents[name].append(function_ind)
+
+    next_bits = ["0"] * len(state_functions)
+    while argspool.is_increment_possible():
+        changed_functions = {function_ind for name in argspool.changed_args for function_ind in dependents[name]}
+        for function_ind in changed_functions:
+            next_bits[function_ind] = argspool.evaluate(state_functions[function_ind])
+        next_state = "".join(next_bits)
+        if print_args:
+            print("\n{}Next state: {}".format(argspool, next_state))
+        yield argspool.get_state_str(), next_state, argspool.get_input_str()
+        argspool.increment_args()
+
+
+# A transition of an FSM: current state, next state and input strings (same order as
+# the transition tuples of the enumerators, so it can be unpacked the same way)
+Transition = namedtuple('Transition', ['state', 'next_state', 'input'])
+
+
+def iter_transition_batches(netlist: hal_py.Netlist, state_functions: List[hal_py.BooleanFunction],
+                            ff_names: List[str], initial_state: str = None,
+                            workers: int = 1, decomposed: bool = False) -> Iterator[List[Transition]]:
+    """
+    Lazily enumerate the transitions of an FSM, a batch at a time (see iter_transitions)
+
+    Yields:
+        List[Transition]: The transitions of a block of argument vectors (see
+            TruthTable.BatchEvaluator), or of a single state if initial_state is given
+    """
+
+    argspool = ArgsPool(netlist, state_functions, ff_names=ff_names)
+    if initial_state is not None:
+        batches = ReachabilityExplorer(argspool, state_functions, ff_names).iter_states(initial_state)
+    else:
+        evaluator_class = SupportEvaluator if decomposed else BatchEvaluator
+        batches = evaluator_class(argspool, state_functions).iter_blocks(workers)
+    for batch in batches:
+        yield [Transition(*transition) for transition in batch]
+
+
+def iter_transitions(netlist: hal_py.Netlist, state_functions: List[hal_py.BooleanFunction],
+                     ff_names: List[str], initial_state: str = None,
+                     workers: int = 1, decomposed: bool = False) -> Iterator[Transition]:
+    """
+    Lazily enumerate the transitions of an FSM (as analyze_fsm writes them), without
+    holding the transition table in memory. The caller may filter the transitions,
+    stop early or write them to its own sink. For example:
+
+        netlist, functions, ff_names = analyze_fsm(netlist_path, lib_path, return_ff_names=True)
+        for transition in iter_transitions(netlist, functions, ff_names):
+            if transition.next_state == target_state:
+                break
+
+    Args:
+        netlist (hal_py.Netlist): The netlist in which the functions are defined
+        state_functions (List[hal_py.BooleanFunction]): Logical function of each state bit
+        ff_names (List[str]): Name of the FF of each state function (see analyze_fsm
+            return_ff_names). Orders the state bits of the current states as the next
+            states (see ArgsPool ff_names)
+        initial_state (str): If given, only the states reachable from it are explored
+            (breadth-first, see Reachability). Otherwise all the argument vectors of
+            ArgsPool are enumerated
+        workers (int): Number of processes evaluating blocks in parallel (used only if
+            initial_state is not given). Blocks evaluated by the processes may be
+            buffered ahead of the consumer
+        decomposed (bool): If True, each state function is evaluated only over its own
+            support (see TruthTable.SupportEvaluator). Used only if initial_state is not given
+
+    Yields:
+        Transition: Current state, next state and input strings
+    """
+
+    for batch in iter_transition_batches(netlist, state_functions, ff_names, initial_state, workers,
+                                         decomposed):
+        yield from batch
 
 
 def analyze_fsm(netlist_path: str, lib_path: str, print_functions: bool = False,
-                print_args: bool = False, result_filename: str = None) \
+                print_args: bool = False, result_filename: str = None, mode: str = BATCHED_MODE,
+                workers: int = 1, compress_labels: bool = False, cache_dir: str = None,
+                native: bool = False, return_ff_names: bool = False, output_format: str = DOT_FORMAT,
+                fsm_index: int = 0, lib_cells: Dict[str, CellType] = None) \
                     -> Tuple[hal_py.Netlist, List[hal_py.BooleanFunction]]:
     """Main function of the module. Finds a control path FSM in a netlist and generates
     a .dot file describing the states transitions.
@@ -292,69 +511,211 @@ def analyze_fsm(netlist_path: str, lib_path: str, print_functions: bool = False,
         netlist_path (str): Path to the netlist .v file
         lib_path (str): Path to the library file
         print_functions (bool): If True, the boolean functions are printed
-        print_args (bool): If True, each state function's arguments iteration will be printed
-        result_filename (str): The file name of the .dot output file (without extention)
+        print_args (bool): If True, each state function's arguments iteration will be printed.
+            The batched and decomposed modes then enumerate the vectors one at a time, as
+            PER_VECTOR_MODE. Ignored by the reachable and symbolic modes
+        result_filename (str): The file name of the output file (without extention)
+        mode (str): How the transitions are enumerated:
+            BATCHED_MODE: The state functions are evaluated bit-parallel over blocks of
+                argument vectors (see TruthTable.BatchEvaluator)
+            PER_VECTOR_MODE: The state functions are evaluated for each argument vector
+            GRAY_CODE_MODE: Per vector, with the argument vectors visited in Gray code
+                order, and only the state functions of the changed argument evaluated on
+                each step (see iter_incremental_transitions). The same transitions are
+                found, in another order
+            DECOMPOSED_MODE: Batched, with each state function evaluated only over its
+                own support and the values reused in all the blocks (see
+                TruthTable.SupportEvaluator). The transitions are the same
+            REACHABLE_MODE: Only the states reachable from the zero (reset) state are
+                explored (breadth-first), and the states in the .dot file are ordered by
+                the state functions
+            SYMBOLIC_MODE: The state functions are built as BDDs (see SymbolicFsm), and
+                the states reachable from the zero state and the exact input cover of
+                each edge are computed symbolically, so FSMs with many inputs are
+                analyzed without enumerating input vectors. Implies compress_labels
+                (the cubes are disjoint but not minimized). The reachable states are
+                found by image computation until a fixpoint, and their number is
+                printed. The BDDs of the state functions are also written to
+                <result_filename>_bdd.dot
+        workers (int): Number of processes evaluating the state functions in parallel
+            (used only by the batched and decomposed modes)
+        compress_labels (bool): If True, a single edge is written for each pair of current
+            and next states, labeled by a minimized cover of its input vectors with '-'
+            for don't care bits (one cube per line, for example "1-0----")
+        cache_dir (str): Directory of the analysis cache (see AnalysisCache). If given, the
+            selected FSM, the state functions and the transitions are loaded from the cache
+            when the netlist and library files were already analyzed with the same
+            options, and saved otherwise. A netlist loaded from the cache is an
+            AnalysisCache.CachedNetlist holding only the nets used by the state functions.
+            If print_args is True the transitions are enumerated (and saved) again, so
+            the arguments of each vector are printed
+        native (bool): If True, the netlist is loaded by the pure python loader
+            (see NativeNetlist) instead of hal, so hal is not needed. No modules are
+            created, and the returned netlist is a NativeNetlist
+        return_ff_names (bool): If True, the names of the FFs of the state bits are
+            returned as a third element (as needed by SLOD.decrypt_sequential)
+        output_format (str): Format of the output file (see TransitionWriter): .dot
+            graph (DOT_FORMAT), KISS2 state table or NumPy transition matrix
+            indexed by (state, input)
+        fsm_index (int): Rank of the analyzed FSM among the candidate control path FSMs
+            (see FsmCandidates.rank_fsm_candidates). 0 is the most likely one
+        lib_cells (Dict[str, CellType]): Cells of the library, already loaded by
+            NativeNetlist.load_liberty (used only if native is True). Lets several
+            analyses share a single parsed library
 
     Returns:
         Tuple[hal_py.Netlist, List[hal_py.BooleanFunction]]:
             hal_py.Netlist: The analized netlist
             List[hal_py.BooleanFunction]: List of the logical functions for each state bit
+            List[str]: Name of the FF of each state bit (only if return_ff_names is True)
     """
-    
-    netlist = hal_py.NetlistFactory.load_netlist(netlist_path, lib_path)
 
-    clear_all(netlist)
+    netlist, state_functions, ff_names = _analyze_fsm(
+        netlist_path, lib_path, print_functions, print_args, result_filename, mode, workers,
+        compress_labels, cache_dir, native, output_format, fsm_index, lib_cells)
+    if return_ff_names:
+        return netlist, state_functions, ff_names
+    return netlist, state_functions
 
-    # Section1 - Determine finite state machine
-    fsm_candid = get_fsm_candidates(netlist)
-    fsm_gates = select_fsm(fsm_candid)
-    
-    # Section 2 - Create a module from the most likely sub-graph to be the FSM
-    fsm_module = netlist.create_module("Control Path", netlist.get_top_module(), fsm_gates)
-    
-    # Section3 - Split the FSM to sequential and combinational logic
-    seq_gates = get_ffs(fsm_module)
-    netlist.create_module("Sequential", fsm_module, seq_gates)
-    comb_gates = get_not_ffs(fsm_module)
-    netlist.create_module("Combinational", fsm_module, comb_gates)
-    
-    # Section 4 - Find logical function for each of the state bits (FFs)
-    state_functions = []
-    for state_bit_ind, flipflop in enumerate(seq_gates):
-        cur_func = get_ff_input_func(netlist, flipflop)
-        state_functions.append(cur_func)
-        print_str, _ = get_function_str(netlist, cur_func)
-        if print_functions:
+
+def _analyze_fsm(netlist_path: str, lib_path: str, print_functions: bool, print_args: bool,
+                 result_filename: str, mode: str, workers: int, compress_labels: bool,
+                 cache_dir: str, native: bool, output_format: str, fsm_index: int,
+                 lib_cells: Dict[str, CellType]) \
+                    -> Tuple[hal_py.Netlist, List[hal_py.BooleanFunction], List[str]]:
+    """
+    Implementation of analyze_fsm (see there for the arguments)
+
+    Returns:
+        Tuple[hal_py.Netlist, List[hal_py.BooleanFunction], List[str]]: The netlist, the
+            logical function of each state bit and the name of its FF
+    """
+
+    if mode not in (BATCHED_MODE, PER_VECTOR_MODE, GRAY_CODE_MODE, DECOMPOSED_MODE,
+                    REACHABLE_MODE, SYMBOLIC_MODE):
+        raise ValueError("Unknown transition enumeration mode '{}'".format(mode))
+
+    cache_key = None
+    cached_analysis = None
+    if cache_dir is not None:
+        # Everything that can change the state functions or the transitions. The
+        # library file is hashed by get_cache_key, but cells given in lib_cells are used
+        # instead of it
+        options = {'mode': mode}
+        if native:
+            options['native'] = True
+            if lib_cells is not None:
+                options['lib_cells'] = get_cells_hash(lib_cells)
+        if fsm_index:
+            options['fsm_index'] = fsm_index
+        cache_key = get_cache_key(netlist_path, lib_path, options)
+        cached_analysis = load_analysis(cache_dir, cache_key, (ZERO, ONE))
+
+    if cached_analysis is not None:
+        netlist, _, ff_names, state_functions = cached_analysis
+    else:
+        if native:
+            netlist = load_native_netlist(netlist_path, lib_path, cache_dir, lib_cells)
+        else:
+            load_hal_plugins()
+            netlist = hal_py.NetlistFactory.load_netlist(netlist_path, lib_path)
+
+            clear_all(netlist)
+
+        # Section1 - Determine finite state machine
+        fsm_candid = rank_fsm_candidates(netlist)
+        if fsm_index >= len(fsm_candid):
+            raise ValueError("FSM {} requested, but {} candidates were found".format(fsm_index, len(fsm_candid)))
+        fsm_gates = fsm_candid[fsm_index].gates
+
+        if native:
+            seq_gates = [gate for gate in fsm_gates if "FF" in gate.get_type().get_name()]
+        else:
+            # Section 2 - Create a module from the most likely sub-graph to be the FSM
+            fsm_module = netlist.create_module("Control Path", netlist.get_top_module(), fsm_gates)
+
+            # Section3 - Split the FSM to sequential and combinational logic
+            seq_gates = get_ffs(fsm_module)
+            netlist.create_module("Sequential", fsm_module, seq_gates)
+            comb_gates = get_not_ffs(fsm_module)
+            netlist.create_module("Combinational", fsm_module, comb_gates)
+
+        # Section 4 - Find logical function for each of the state bits (FFs)
+        state_functions = []
+        ff_cones = get_ff_input_cones(seq_gates)
+        for flipflop in seq_gates:
+            state_functions.append(get_ff_input_func(netlist, flipflop, ff_cones[flipflop.get_id()]))
+        ff_names = [flipflop.get_name() for flipflop in seq_gates]
+
+        if cache_dir is not None:
+            save_analysis(cache_dir, cache_key, netlist, [gate.get_name() for gate in fsm_gates],
+                          ff_names, state_functions)
+
+    if print_functions:
+        for state_bit_ind, cur_func in enumerate(state_functions):
+            print_str, _ = get_function_str(netlist, cur_func)
             print("\nBoolean function of bit {}:\n\n\t{}\n".format(state_bit_ind, print_str))
 
     # Sections 5, 6 - Find state transitions of the FSM
-    if result_filename is not None:
-        dot_file_name = result_filename + ".dot"
-        with open(dot_file_name, "w+") as dot_file:
-            dot_file.write("strict digraph G {\n")
-            zero_state_str = len(seq_gates) * "0"
-            dot_file.write("\t" + zero_state_str + "\n")
-            argspool = ArgsPool(netlist, state_functions)
-            while argspool.is_increment_possible():
-                next_state = ""
-                for function in state_functions:
-                    next_state += argspool.evaluate(function)
-                cur_state = argspool.get_state_str()
-                cur_input = argspool.get_input_str()
-                dot_file.write('\t{} -> {} [label="{}"]\n'.format(cur_state, next_state, cur_input))
-                if print_args:
-                    print("\n{}Next state: {}".format(argspool, next_state))
-                argspool.increment_args()
-            dot_file.write("}")
-
-    return netlist, state_functions
+    if result_filename is not None and mode == SYMBOLIC_MODE:
+        zero_state_str = len(ff_names) * "0"
+        symbolic_fsm = SymbolicFsm(ArgsPool(netlist, state_functions), state_functions, ff_names)
+        symbolic_fsm.to_dot(result_filename + BDD_DOT_SUFFIX)
+        reachable_states = symbolic_fsm.get_reachable_states(zero_state_str)
+        print("\nReachable states: {}".format(symbolic_fsm.get_states_count(reachable_states)))
+        with open_writer(result_filename, output_format, zero_state_str) as writer:
+            writer.write_edges(dict(symbolic_fsm.iter_edges(reachable_states)))
+    elif result_filename is not None:
+        zero_state_str = len(ff_names) * "0"
+        with open_writer(result_filename, output_format, zero_state_str) as writer:
+            reachable_only = mode == REACHABLE_MODE
+            gray_code = mode == GRAY_CODE_MODE
+            is_per_vector = mode in (PER_VECTOR_MODE, GRAY_CODE_MODE) or (not reachable_only and print_args)
+            if reachable_only:
+                transitions_mode = "reachable"
+            elif gray_code:
+                transitions_mode = "gray"
+            else:
+                transitions_mode = "full"
+            transitions = None
+            if cache_dir is not None and not (is_per_vector and print_args):
+                # The per vector output of print_args needs the enumeration to run
+                transitions = load_transitions(cache_dir, cache_key, transitions_mode)
+            if transitions is None:
+                # hal netlists keep the original state strings of the full sweep (see
+                # ArgsPool ff_names). The native loader numbers the nets in another order,
+                # so its state bits follow the FFs, as do the reachable states, whose next
+                # states are explored as current states
+                state_ff_names = ff_names if native or reachable_only else None
+                argspool = ArgsPool(netlist, state_functions, gray_code, state_ff_names)
+                if reachable_only:
+                    explorer = ReachabilityExplorer(argspool, state_functions, ff_names)
+                    transitions = explorer.iter_transitions(zero_state_str)
+                elif not is_per_vector:
+                    evaluator_class = SupportEvaluator if mode == DECOMPOSED_MODE else BatchEvaluator
+                    evaluator = evaluator_class(argspool, state_functions)
+                    transitions = evaluator.iter_transitions(workers)
+                elif gray_code:
+                    transitions = iter_incremental_transitions(argspool, state_functions, print_args)
+                else:
+                    transitions = iter_argspool_transitions(argspool, state_functions, print_args)
+                if cache_dir is not None:
+                    transitions = save_transitions(cache_dir, cache_key, transitions_mode, transitions)
+            if compress_labels:
+                writer.write_edges(compress_edges(transitions))
+            else:
+                writer.write_transitions(transitions)
+
+    return netlist, state_functions, ff_names
 
 
 if __name__ == "__main__":
     # Part 1 - Simple FSM
     analyze_fsm("./project2_cipher_v1.v", "./NangateOpenCellLibrary_functional.lib",
-                print_functions=True, print_args=False, result_filename="fsm1")
+                print_functions=True, print_args=False, result_filename="fsm1",
+                cache_dir=DEFAULT_CACHE_DIR)
 
     # Part 2 - Obfuscated FSM
     analyze_fsm("./project2_cipher_v2_obfuscated.v", "./NangateOpenCellLibrary_functional.lib",
-                print_functions=True, print_args=False, result_filename="fsm2")
+                print_functions=True, print_args=False, result_filename="fsm2",
+                cache_dir=DEFAULT_CACHE_DIR)
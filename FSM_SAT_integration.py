@@ -1,6 +1,7 @@
 from pysat.solvers import Solver
 import FSM
 import SLOD
+from BoolExpr import expr2str
 
 
 def sat2pin(literals_vector, vars_pool):
@@ -38,10 +39,12 @@ def literals2args(literals_vector, vars_pool, pins2net_dict):
 
 if __name__ == "__main__":
     netlist, functions = FSM.analyze_fsm("./project2_cipher_v1.v", 
-        "./NangateOpenCellLibrary_functional.lib")
+        "./NangateOpenCellLibrary_functional.lib",
+        cache_dir=FSM.DEFAULT_CACHE_DIR)
     
     # netlist, functions = FSM.analyze_fsm("./project2_cipher_v2_obfuscated.v", 
-    #     "./NangateOpenCellLibrary_functional.lib")
+    #     "./NangateOpenCellLibrary_functional.lib",
+    #     cache_dir=FSM.DEFAULT_CACHE_DIR)
 
     for cur_func_ind, cur_func in enumerate(functions):
         solution = None
@@ -49,14 +52,14 @@ if __name__ == "__main__":
         solution_hal_args = None
         sulution_eval = None
 
-        s = Solver(name='g4', with_proof=True)
+        s = Solver(name=SLOD.DEFAULT_SOLVER)
 
-        # Conversion to function string with pin names (and not net IDs)
-        # as arguments is required so SymPy can parse them as expression
-        # variables and not as constants (net IDs are integers)
-        cur_func_str, pin2net_dict = FSM.get_function_str(netlist, cur_func)
+        # Conversion to an expression with pin names (and not net IDs)
+        # as arguments, which is built into a SymPy expression directly
+        cur_func_expr, pin2net_dict = FSM.get_function_expr(netlist, cur_func)
+        cur_func_str = expr2str(cur_func_expr, FSM.SYMPY_NOT_CHAR)
 
-        sym_cnf = SLOD.str2sym_cnf(cur_func_str)
+        sym_cnf = SLOD.sym2cnf(SLOD.expr2sym(cur_func_expr))
         cnf_clauses, pin2sat_pool = SLOD.sym_cnf2sat(sym_cnf)
         
         s.append_formula(cnf_clauses)
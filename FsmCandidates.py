@@ -0,0 +1,258 @@
+from typing import Dict, List, Set, Tuple
+
+
+def get_sccs(successors: List[List[int]]) -> List[List[int]]:
+    """
+    Get the strongly connected components of a graph (Tarjan's algorithm, iterative,
+    linear in the number of nodes and edges). Single nodes are components as well
+
+    Args:
+        successors (List[List[int]]): Successor nodes of each node (0 to n-1)
+
+    Returns:
+        List[List[int]]: Sorted nodes of each component, in reverse topological order
+            of the condensed graph (a component comes before its predecessors)
+    """
+
+    nodes_num = len(successors)
+    index = [None] * nodes_num
+    lowlink = [0] * nodes_num
+    on_stack = [False] * nodes_num
+    component_stack = []
+    components = []
+    counter = 0
+
+    for root in range(nodes_num):
+        if index[root] is not None:
+            continue
+        # Each frame is a node and the position of its next successor to visit
+        frames = [(root, 0)]
+        index[root] = lowlink[root] = counter
+        counter += 1
+        component_stack.append(root)
+        on_stack[root] = True
+        while frames:
+            node, next_ind = frames[-1]
+            if next_ind < len(successors[node]):
+                frames[-1] = (node, next_ind + 1)
+                successor = successors[node][next_ind]
+                if index[successor] is None:
+                    index[successor] = lowlink[successor] = counter
+                    counter += 1
+                    component_stack.append(successor)
+                    on_stack[successor] = True
+                    frames.append((successor, 0))
+                elif on_stack[successor]:
+                    lowlink[node] = min(lowlink[node], index[successor])
+                continue
+            frames.pop()
+            if frames:
+                parent = frames[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index[node]:
+                component = []
+                while True:
+                    member = component_stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(sorted(component))
+    return components
+
+
+def is_ff(gate) -> bool:
+    return "FF" in gate.get_type().get_name()
+
+
+def get_ff_supports(flipflops: list) -> Tuple[Dict[int, Set[int]], Dict[int, Set[int]], Dict[int, Set[int]]]:
+    """
+    Get what drives the input ('D' pin) of each FF through combinational logic.
+    Like FSM.get_ff_input_cones, all the FFs are handled by a single post-order traversal
+    which stops at FFs and global inputs, and the support of each gate output is
+    computed once and shared
+
+    Args:
+        flipflops (List[hal_py.Gate]): The FFs
+
+    Returns:
+        Tuple[Dict[int, Set[int]], Dict[int, Set[int]], Dict[int, Set[int]]]: By FF ID:
+            Dict[int, Set[int]]: IDs of the FFs driving the FF
+            Dict[int, Set[int]]: IDs of the global input nets driving the FF
+            Dict[int, Set[int]]: IDs of the combinational gates of the input cone of the FF
+    """
+
+    # Dict[int, Tuple[frozenset, frozenset, frozenset]]: Global input net IDs, FF IDs and
+    # combinational gate IDs driving each visited gate's output (including the gate itself)
+    supports = {}
+    empty = frozenset()
+
+    def get_net_support(net) -> Tuple[frozenset, frozenset, frozenset]:
+        if net.is_global_input_net():
+            return frozenset([net.get_id()]), empty, empty
+        input_ids, ff_ids, comb_ids = set(), set(), set()
+        for endpoint in net.get_sources():
+            # Sources still in progress are part of a combinational loop
+            source_inputs, source_ffs, source_combs = supports.get(endpoint.get_gate().get_id(),
+                                                                   (empty, empty, empty))
+            input_ids |= source_inputs
+            ff_ids |= source_ffs
+            comb_ids |= source_combs
+        return frozenset(input_ids), frozenset(ff_ids), frozenset(comb_ids)
+
+    def visit(root):
+        stack = [(root, False)]
+        in_progress = set()
+        while stack:
+            gate, is_expanded = stack.pop()
+            gate_id = gate.get_id()
+            if gate_id in supports:
+                continue
+            if is_expanded:
+                input_ids, ff_ids, comb_ids = set(), set(), {gate_id}
+                for net in gate.get_fan_in_nets():
+                    net_inputs, net_ffs, net_combs = get_net_support(net)
+                    input_ids |= net_inputs
+                    ff_ids |= net_ffs
+                    comb_ids |= net_combs
+                supports[gate_id] = (frozenset(input_ids), frozenset(ff_ids), frozenset(comb_ids))
+                continue
+            if is_ff(gate):
+                supports[gate_id] = (empty, frozenset([gate_id]), empty)
+                continue
+            if gate_id in in_progress:
+                continue
+            in_progress.add(gate_id)
+            stack.append((gate, True))
+            for net in gate.get_fan_in_nets():
+                if net.is_global_input_net():
+                    continue
+                for endpoint in net.get_sources():
+                    if endpoint.get_gate().get_id() not in supports:
+                        stack.append((endpoint.get_gate(), False))
+
+    ff_sources, ff_inputs, ff_cones = {}, {}, {}
+    for flipflop in flipflops:
+        net = flipflop.get_fan_in_net('D')
+        if not net.is_global_input_net():
+            for endpoint in net.get_sources():
+                visit(endpoint.get_gate())
+        input_ids, ff_ids, comb_ids = get_net_support(net)
+        ff_sources[flipflop.get_id()] = set(ff_ids)
+        ff_inputs[flipflop.get_id()] = set(input_ids)
+        ff_cones[flipflop.get_id()] = set(comb_ids)
+    return ff_sources, ff_inputs, ff_cones
+
+
+class FsmCandidate():
+    """
+    A strongly connected component of the FF dependency graph (FF a depends on FF b
+    if the output of b reaches the input of a through combinational logic) which has
+    feedback, and its features
+    """
+
+    def __init__(self, ffs: list, gates: list) -> None:
+        self.ffs = ffs  # List[hal_py.Gate]: The FFs of the component (by ID order)
+        self.gates = gates  # List[hal_py.Gate]: The FFs and the gates of their input cones
+
+        self.ff_num = len(ffs)  # int: Number of FFs
+        self.input_nets = 0  # int: Number of global input nets driving the FFs
+        self.internal_edges = 0  # int: Number of dependencies between FFs of the component
+        self.self_loops = 0  # int: Number of FFs depending on themselves
+        self.upstream_ffs = 0  # int: Number of FFs out of the component driving it
+        self.downstream_ffs = 0  # int: Number of FFs out of the component it drives
+
+    def get_features(self) -> Dict[str, int]:
+        return {'ff_num': self.ff_num, 'input_nets': self.input_nets,
+                'internal_edges': self.internal_edges, 'self_loops': self.self_loops,
+                'upstream_ffs': self.upstream_ffs, 'downstream_ffs': self.downstream_ffs}
+
+    def get_rank_key(self) -> tuple:
+        """
+        Sort key of the candidates, most likely control path first: fewest FFs (as the
+        original selection of the gate level SCC with the fewest FFs), then least driven
+        by other FFs (control logic is driven by the inputs), then driving the most FFs
+        """
+
+        return self.ff_num, self.upstream_ffs, -self.downstream_ffs
+
+    def __str__(self) -> str:
+        return "FSM candidate {}: {}".format([ff.get_name() for ff in self.ffs], self.get_features())
+
+
+def rank_fsm_candidates(netlist) -> List[FsmCandidate]:
+    """
+    Find every candidate control path FSM of a netlist and rank them.
+    The FF dependency graph is built once, condensed into strongly connected
+    components (get_sccs) and a feature vector is computed for each component with
+    feedback (more than one FF, or a FF depending on itself)
+
+    Args:
+        netlist (hal_py.Netlist): The netlist (hal or NativeNetlist)
+
+    Returns:
+        List[FsmCandidate]: The candidates, most likely first (see FsmCandidate.get_rank_key)
+    """
+
+    flipflops = sorted(netlist.get_gates(is_ff), key=lambda gate: gate.get_id())
+    ff_index = {flipflop.get_id(): ind for ind, flipflop in enumerate(flipflops)}
+    ff_sources, ff_inputs, ff_cones = get_ff_supports(flipflops)
+
+    # Successors of each FF: the FFs it drives
+    successors = [[] for _ in flipflops]
+    for flipflop in flipflops:
+        for source_id in ff_sources[flipflop.get_id()]:
+            successors[ff_index[source_id]].append(ff_index[flipflop.get_id()])
+
+    components = get_sccs(successors)
+    component_of = [0] * len(flipflops)
+    for component_ind, component in enumerate(components):
+        for ind in component:
+            component_of[ind] = component_ind
+
+    gates_by_id = {}
+    for flipflop in flipflops:
+        gates_by_id[flipflop.get_id()] = flipflop
+    for cone in ff_cones.values():
+        for gate_id in cone:
+            if gate_id not in gates_by_id:
+                gates_by_id[gate_id] = netlist.get_gate_by_id(gate_id)
+
+    candidates = []
+    for component_ind, component in enumerate(components):
+        ff_ids = [flipflops[ind].get_id() for ind in component]
+        internal_edges = 0
+        self_loops = 0
+        upstream = set()
+        downstream = set()
+        input_nets = set()
+        cone_ids = set()
+        for ind in component:
+            ff_id = flipflops[ind].get_id()
+            input_nets |= ff_inputs[ff_id]
+            cone_ids |= ff_cones[ff_id]
+            for source_id in ff_sources[ff_id]:
+                if component_of[ff_index[source_id]] == component_ind:
+                    internal_edges += 1
+                    self_loops += source_id == ff_id
+                else:
+                    upstream.add(source_id)
+            for successor in successors[ind]:
+                if component_of[successor] != component_ind:
+                    downstream.add(successor)
+        if internal_edges == 0:
+            # No feedback, so not a state machine
+            continue
+
+        candidate = FsmCandidate([gates_by_id[ff_id] for ff_id in ff_ids],
+                                 [gates_by_id[gate_id] for gate_id in ff_ids + sorted(cone_ids)])
+        candidate.input_nets = len(input_nets)
+        candidate.internal_edges = internal_edges
+        candidate.self_loops = self_loops
+        candidate.upstream_ffs = len(upstream)
+        candidate.downstream_ffs = len(downstream)
+        candidates.append(candidate)
+
+    # The sort is stable, so equal candidates stay in discovery order
+    candidates.sort(key=FsmCandidate.get_rank_key)
+    return candidates
@@ -0,0 +1,672 @@
+"""
+Pure python loader of Yosys style gate-level Verilog netlists and of the cell
+functions of a Liberty library. It is a lightweight alternative to
+hal_py.NetlistFactory.load_netlist(), which loads all the hal plugins and gate
+libraries before parsing.
+The netlist is kept in flat arrays (gates, pins and nets by index). Gate, net and
+endpoint views expose the subset of the hal API used by the FSM analysis, so
+the same code can run on either netlist
+"""
+from typing import Callable, Dict, List, Tuple
+import hashlib
+import json
+import os
+import re
+from BoolExpr import ExprNode, VAR, CONST, parse_function_str, get_node_variables, substitute_variables
+from TruthTable import CompiledFunction, get_var_masks
+from AnalysisCache import CachedFunction, CACHE_VERSION, hash_file, write_atomic
+from FsmCandidates import get_sccs
+
+
+# int: ID of the first gate and the first net (as in hal)
+FIRST_ID = 1
+
+INPUT_DIRECTION = 'input'
+OUTPUT_DIRECTION = 'output'
+
+# Dict[str, int]: Merge priority of the nets connected by assign statements.
+# The name of the merged net is the name of its highest priority net
+PORT_PRIORITY = {INPUT_DIRECTION: 2, OUTPUT_DIRECTION: 1}
+
+COMMENT_RE = re.compile(r'/\*.*?\*/|//[^\n]*', re.DOTALL)
+ATTRIBUTE_RE = re.compile(r'\(\*.*?\*\)', re.DOTALL)
+GROUP_RE = re.compile(r'^\s*(\w+)\s*\(([^)]*)\)\s*\{')
+ATTRIBUTE_VALUE_RE = re.compile(r'^\s*(\w+)\s*:\s*"?([^";]*?)"?\s*;')
+RANGE_RE = re.compile(r'^\[\s*(\d+)\s*:\s*(\d+)\s*\]\s*')
+BIT_SELECT_RE = re.compile(r'^([\w$\\.]+)\s*\[\s*(\d+)\s*\]$')
+PART_SELECT_RE = re.compile(r'^([\w$\\.]+)\s*\[\s*(\d+)\s*:\s*(\d+)\s*\]$')
+CONST_RE = re.compile(r"^(\d*)'([bhd])([0-9a-fA-FxXzZ_]+)$")
+INSTANCE_RE = re.compile(r'^([\w$\\]+)\s+([\w$\\.\[\]]+)\s*\((.*)\)$', re.DOTALL)
+CONNECTION_RE = re.compile(r'\.(\w+)\s*\(\s*([^()]*?)\s*\)')
+
+
+class CellType():
+    """
+    Gate type of a Liberty library: the pins of a cell and the function of each output pin
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.input_pins = []  # List[str]: Names of the input pins
+        self.output_pins = []  # List[str]: Names of the output pins
+        self.functions = {}  # Dict[str, ExprNode]: Function of each output pin over the input pins
+
+        # Dict[str, int]: Truth table of each output pin. Bit p is the value of the
+        # output when each input pin i has the value of bit i of p
+        self.tables = {}
+
+        self.is_sequential = False  # bool: True if the cell has an 'ff' or 'latch' group
+
+    def get_name(self) -> str:
+        return self.name
+
+    def compile(self, function_strs: Dict[str, str]):
+        """
+        Parse the function of each output pin and compute its truth table
+
+        Args:
+            function_strs (Dict[str, str]): Liberty function string of each output pin
+        """
+
+        inputs_num = len(self.input_pins)
+        masks = get_var_masks(inputs_num, 0, inputs_num)
+        full_mask = (1 << (1 << inputs_num)) - 1
+        for pin, function_str in function_strs.items():
+            self.functions[pin] = parse_function_str(function_str, self.input_pins)
+            self.tables[pin] = CompiledFunction(self.functions[pin], self.input_pins)(masks, full_mask)
+
+    def evaluate(self, pin: str, input_values: List[bool]) -> bool:
+        """
+        Get the value of an output pin (a truth table lookup)
+
+        Args:
+            pin (str): The output pin
+            input_values (List[bool]): Value of each input pin (in the order of self.input_pins)
+
+        Returns:
+            bool: The value of the output
+        """
+
+        index = 0
+        for bit, value in enumerate(input_values):
+            if value:
+                index |= 1 << bit
+        return (self.tables[pin] >> index) & 1 == 1
+
+
+def get_library_cache_path(cache_dir: str, lib_path: str) -> str:
+    """
+    Get the path of the compiled cells of a library in a cache directory.
+    The file name is the hash of the library contents
+    """
+
+    sha = hashlib.sha256()
+    sha.update(CACHE_VERSION.encode())
+    sha.update(hash_file(lib_path).encode())
+    return os.path.join(cache_dir, 'lib-{}.json'.format(sha.hexdigest()))
+
+
+def load_liberty(lib_path: str, cache_dir: str = None) -> Dict[str, CellType]:
+    """
+    Load the cells of a Liberty library. Only the pin directions and output functions
+    are read (timing and power groups are skipped). The functions are compiled to
+    truth tables (see CellType.tables)
+
+    Args:
+        lib_path (str): Path to the .lib file
+        cache_dir (str): Directory of the analysis cache (see AnalysisCache). If given,
+            the compiled cells are loaded from the cache when the library was already
+            loaded, and saved otherwise
+
+    Returns:
+        Dict[str, CellType]: The cells by name
+    """
+
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = get_library_cache_path(cache_dir, lib_path)
+        if os.path.isfile(cache_path):
+            with open(cache_path) as cache_file:
+                return {record['name']: record2cell(record) for record in json.load(cache_file)}
+
+    cells = parse_liberty(lib_path)
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        write_atomic(cache_path, json.dumps([cell2record(cell) for cell in cells.values()]))
+    return cells
+
+
+def cell2record(cell: CellType) -> dict:
+    return {
+        'name': cell.name,
+        'input_pins': cell.input_pins,
+        'output_pins': cell.output_pins,
+        'is_sequential': cell.is_sequential,
+        'functions': {pin: str(function) for pin, function in cell.functions.items()},
+        'tables': cell.tables,
+    }
+
+
+def get_cells_hash(cells: Dict[str, CellType]) -> str:
+    """
+    Get a hash of the pins and functions of a set of cells (for example cells loaded
+    once by load_liberty and shared by several analyses, see AnalysisCache.get_cache_key)
+    """
+
+    records = [cell2record(cells[name]) for name in sorted(cells)]
+    return hashlib.sha256(json.dumps(records, sort_keys=True).encode()).hexdigest()
+
+
+def record2cell(record: dict) -> CellType:
+    cell = CellType(record['name'])
+    cell.input_pins = record['input_pins']
+    cell.output_pins = record['output_pins']
+    cell.is_sequential = record['is_sequential']
+    cell.tables = record['tables']
+    cell.functions = {pin: parse_function_str(function_str, cell.input_pins)
+                      for pin, function_str in record['functions'].items()}
+    return cell
+
+
+def parse_liberty(lib_path: str) -> Dict[str, CellType]:
+    """
+    Parse the cells of a Liberty library file (see load_liberty)
+    """
+
+    with open(lib_path) as lib_file:
+        text = COMMENT_RE.sub('', lib_file.read())
+
+    cells = {}
+    functions = {}  # Dict[str, str]: Function strings of the output pins of the current cell
+    cell = None
+    pin = None
+    direction = None
+
+    # List[str]: Names of the groups enclosing the current line
+    groups = []
+    for line in text.split('\n'):
+        group_match = GROUP_RE.match(line)
+        if group_match:
+            group_type = group_match.group(1)
+            group_name = group_match.group(2).strip().strip('"')
+            groups.append(group_type)
+            if group_type == 'cell' and len(groups) == 2:
+                cell = CellType(group_name)
+                functions = {}
+            elif group_type == 'pin' and cell is not None and groups[-2] == 'cell':
+                pin = group_name
+                direction = None
+            elif group_type in ('ff', 'latch', 'statetable') and cell is not None:
+                cell.is_sequential = True
+        elif pin is not None and groups[-1] == 'pin':
+            attribute_match = ATTRIBUTE_VALUE_RE.match(line)
+            if attribute_match:
+                key, value = attribute_match.groups()
+                if key == 'direction':
+                    direction = value
+                elif key == 'function':
+                    functions[pin] = value
+
+        for _ in range(line.count('}') - line.count('{') + (1 if group_match else 0)):
+            group_type = groups.pop()
+            if group_type == 'pin' and pin is not None:
+                if direction == INPUT_DIRECTION:
+                    cell.input_pins.append(pin)
+                elif direction == OUTPUT_DIRECTION:
+                    cell.output_pins.append(pin)
+                pin = None
+            elif group_type == 'cell' and cell is not None:
+                # Functions of sequential outputs are over internal states (IQ, IQN),
+                # and are not parsed
+                if not cell.is_sequential:
+                    cell.compile(functions)
+                cells[cell.name] = cell
+                cell = None
+
+    return cells
+
+
+class NativeEndpoint():
+    def __init__(self, netlist: 'NativeNetlist', pin_ind: int) -> None:
+        self.netlist = netlist
+        self.pin_ind = pin_ind
+
+    def get_gate(self) -> 'NativeGate':
+        return NativeGate(self.netlist, self.netlist.pin_gates[self.pin_ind])
+
+    def get_pin(self) -> str:
+        return self.netlist.pin_names[self.pin_ind]
+
+
+class NativeNet():
+    """
+    View of a net of a NativeNetlist (mimics hal_py.Net)
+    """
+
+    def __init__(self, netlist: 'NativeNetlist', net_ind: int) -> None:
+        self.netlist = netlist
+        self.net_ind = net_ind
+
+    def get_id(self) -> int:
+        return self.net_ind + FIRST_ID
+
+    def get_name(self) -> str:
+        return self.netlist.net_names[self.net_ind]
+
+    def is_global_input_net(self) -> bool:
+        return self.netlist.net_is_global_input[self.net_ind]
+
+    def get_sources(self) -> List[NativeEndpoint]:
+        return [NativeEndpoint(self.netlist, pin_ind) for pin_ind in self.netlist.net_sources[self.net_ind]]
+
+    def get_destinations(self) -> List[NativeEndpoint]:
+        return [NativeEndpoint(self.netlist, pin_ind)
+                for pin_ind in self.netlist.net_destinations[self.net_ind]]
+
+
+class NativeGate():
+    """
+    View of a gate of a NativeNetlist (mimics hal_py.Gate)
+    """
+
+    def __init__(self, netlist: 'NativeNetlist', gate_ind: int) -> None:
+        self.netlist = netlist
+        self.gate_ind = gate_ind
+
+    def get_id(self) -> int:
+        return self.gate_ind + FIRST_ID
+
+    def get_name(self) -> str:
+        return self.netlist.gate_names[self.gate_ind]
+
+    def get_type(self) -> CellType:
+        return self.netlist.gate_types[self.gate_ind]
+
+    def get_fan_in_nets(self) -> List[NativeNet]:
+        return [NativeNet(self.netlist, self.netlist.pin_nets[pin_ind])
+                for pin_ind in self.netlist.gate_pins[self.gate_ind]
+                if not self.netlist.pin_is_output[pin_ind]]
+
+    def get_fan_out_nets(self) -> List[NativeNet]:
+        return [NativeNet(self.netlist, self.netlist.pin_nets[pin_ind])
+                for pin_ind in self.netlist.gate_pins[self.gate_ind]
+                if self.netlist.pin_is_output[pin_ind]]
+
+    def get_fan_in_net(self, pin: str) -> NativeNet:
+        return self.get_pin_net(pin, False)
+
+    def get_fan_out_net(self, pin: str) -> NativeNet:
+        return self.get_pin_net(pin, True)
+
+    def get_pin_net(self, pin: str, is_output: bool) -> NativeNet:
+        for pin_ind in self.netlist.gate_pins[self.gate_ind]:
+            if self.netlist.pin_names[pin_ind] == pin and self.netlist.pin_is_output[pin_ind] == is_output:
+                return NativeNet(self.netlist, self.netlist.pin_nets[pin_ind])
+        return None
+
+
+class NativeNetlist():
+    """
+    Gate-level netlist loaded without hal (see load_native_netlist).
+    Gates, pins and nets are stored in parallel lists, indexed by gate, pin and net
+    index (ID minus FIRST_ID). Views (NativeGate, NativeNet) are created on demand
+    """
+
+    def __init__(self, cells: Dict[str, CellType]) -> None:
+        self.cells = cells
+
+        self.gate_names = []  # List[str]: Instance name of each gate
+        self.gate_types = []  # List[CellType]: Cell of each gate
+        self.gate_pins = []  # List[List[int]]: Indexes of the connected pins of each gate
+
+        self.pin_gates = []  # List[int]: Gate of each pin
+        self.pin_names = []  # List[str]: Name of each pin (in the cell)
+        self.pin_nets = []  # List[int]: Net connected to each pin
+        self.pin_is_output = []  # List[bool]: True for output pins
+
+        self.net_names = []  # List[str]: Name of each net
+        self.net_is_global_input = []  # List[bool]: True for nets of input ports
+        self.net_consts = []  # List[str]: '0' or '1' for constant nets, None otherwise
+        self.net_sources = []  # List[List[int]]: Output pins driving each net
+        self.net_destinations = []  # List[List[int]]: Input pins driven by each net
+
+        # Dict[str, int]: Net index of each net name
+        self.net_by_name = {}
+
+    def add_net(self, name: str, is_global_input: bool = False, const: str = None) -> int:
+        self.net_by_name[name] = len(self.net_names)
+        self.net_names.append(name)
+        self.net_is_global_input.append(is_global_input)
+        self.net_consts.append(const)
+        self.net_sources.append([])
+        self.net_destinations.append([])
+        return len(self.net_names) - 1
+
+    def add_gate(self, name: str, cell: CellType, connections: List[Tuple[str, int]]) -> int:
+        """
+        Add a gate
+
+        Args:
+            name (str): Instance name
+            cell (CellType): Cell of the gate
+            connections (List[Tuple[str, int]]): Pin name and net index of each connected pin
+
+        Returns:
+            int: Index of the gate
+        """
+
+        gate_ind = len(self.gate_names)
+        self.gate_names.append(name)
+        self.gate_types.append(cell)
+        pins = []
+        for pin_name, net_ind in connections:
+            pin_ind = len(self.pin_names)
+            is_output = pin_name in cell.output_pins
+            self.pin_gates.append(gate_ind)
+            self.pin_names.append(pin_name)
+            self.pin_nets.append(net_ind)
+            self.pin_is_output.append(is_output)
+            if is_output:
+                self.net_sources[net_ind].append(pin_ind)
+            else:
+                self.net_destinations[net_ind].append(pin_ind)
+            pins.append(pin_ind)
+        self.gate_pins.append(pins)
+        return gate_ind
+
+    def get_gates(self, filter: Callable[[NativeGate], bool] = None) -> List[NativeGate]:
+        gates = [NativeGate(self, gate_ind) for gate_ind in range(len(self.gate_names))]
+        if filter is None:
+            return gates
+        return [gate for gate in gates if filter(gate)]
+
+    def get_nets(self) -> List[NativeNet]:
+        return [NativeNet(self, net_ind) for net_ind in range(len(self.net_names))]
+
+    def get_gate_by_id(self, gate_id: int) -> NativeGate:
+        return NativeGate(self, gate_id - FIRST_ID)
+
+    def get_net_by_id(self, net_id: int) -> NativeNet:
+        return NativeNet(self, net_id - FIRST_ID)
+
+    def get_successor_gates(self, gate_ind: int) -> List[int]:
+        """
+        Get the indexes of the gates driven by the outputs of a gate
+        """
+
+        successors = []
+        for pin_ind in self.gate_pins[gate_ind]:
+            if self.pin_is_output[pin_ind]:
+                for dest_pin in self.net_destinations[self.pin_nets[pin_ind]]:
+                    successors.append(self.pin_gates[dest_pin])
+        return successors
+
+    def get_strongly_connected_components(self) -> List[List[NativeGate]]:
+        """
+        Get the strongly connected components of the gates graph (see
+        FsmCandidates.get_sccs). Single gates are components as well
+
+        Returns:
+            List[List[NativeGate]]: The gates of each component
+        """
+
+        successors = [self.get_successor_gates(gate_ind) for gate_ind in range(len(self.gate_names))]
+        return [[NativeGate(self, member) for member in component] for component in get_sccs(successors)]
+
+    def get_net_expr(self, net_ind: int, gate_inds: set, exprs: Dict[int, ExprNode]) -> ExprNode:
+        """
+        Compose the function of a net from the cell functions of the given gates.
+        Nets which are not driven by one of the gates are variables (named by net ID)
+        or constants. The gates are assumed to be loop free
+
+        Args:
+            net_ind (int): Index of the net
+            gate_inds (set): Indexes of the gates to compose
+            exprs (Dict[int, ExprNode]): Functions of already composed nets (by net index).
+                Updated with the nets composed by this call
+
+        Returns:
+            ExprNode: The function of the net
+        """
+
+        stack = [(net_ind, False)]
+        while stack:
+            cur_net, is_expanded = stack.pop()
+            if cur_net in exprs:
+                continue
+            sources = self.net_sources[cur_net]
+            if not sources or self.pin_gates[sources[0]] not in gate_inds:
+                if self.net_consts[cur_net] is not None:
+                    exprs[cur_net] = ExprNode(CONST, name=self.net_consts[cur_net])
+                else:
+                    exprs[cur_net] = ExprNode(VAR, name=str(cur_net + FIRST_ID))
+                continue
+            gate_ind = self.pin_gates[sources[0]]
+            in_pins = [pin_ind for pin_ind in self.gate_pins[gate_ind] if not self.pin_is_output[pin_ind]]
+            if not is_expanded:
+                stack.append((cur_net, True))
+                stack.extend((self.pin_nets[pin_ind], False) for pin_ind in in_pins
+                             if self.pin_nets[pin_ind] not in exprs)
+                continue
+            cell = self.gate_types[gate_ind]
+            out_pin = self.pin_names[sources[0]]
+            pin_exprs = {self.pin_names[pin_ind]: exprs[self.pin_nets[pin_ind]] for pin_ind in in_pins}
+            if all(pin_exprs[pin].op == CONST for pin in cell.input_pins):
+                # Constant inputs are folded by the truth table of the cell
+                value = cell.evaluate(out_pin, [pin_exprs[pin].name == '1' for pin in cell.input_pins])
+                exprs[cur_net] = ExprNode(CONST, name='1' if value else '0')
+            else:
+                exprs[cur_net] = substitute_variables(cell.functions[out_pin], pin_exprs)
+        return exprs[net_ind]
+
+    def get_subgraph_function(self, net: NativeNet, gates: List[NativeGate], values: tuple) -> CachedFunction:
+        """
+        Get the boolean function of a net over the inputs of a subgraph
+        (mimics hal_py.NetlistUtils.get_subgraph_function)
+
+        Args:
+            net (NativeNet): The net
+            gates (List[NativeGate]): The combinational gates of the subgraph
+            values (tuple): Values representing false and true when evaluating the function
+
+        Returns:
+            CachedFunction: The function, with net IDs as variables
+        """
+
+        expr = self.get_net_expr(net.net_ind, {gate.gate_ind for gate in gates}, {})
+        return CachedFunction(None, sorted(get_node_variables(expr)), values, expr)
+
+
+def split_top_level(text: str, separator: str = ',') -> List[str]:
+    """
+    Split a string on separators which are not enclosed in braces or parentheses
+    """
+
+    parts = []
+    depth = 0
+    start = 0
+    for pos, char in enumerate(text):
+        if char in '({':
+            depth += 1
+        elif char in ')}':
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append(text[start:pos].strip())
+            start = pos + 1
+    parts.append(text[start:].strip())
+    return [part for part in parts if part]
+
+
+def get_bit_name(name: str, bit: int) -> str:
+    """
+    Name of a bit of a vector net, in hal format (for example 'INPUT(0)')
+    """
+
+    return name if bit is None else '{}({})'.format(name, bit)
+
+
+class VerilogReader():
+    """
+    Reader of a flat Yosys style gate-level Verilog module (port, wire, assign and
+    cell instance statements)
+    """
+
+    def __init__(self, netlist: NativeNetlist) -> None:
+        self.netlist = netlist
+
+        # Dict[str, Tuple[int, int]]: MSB and LSB of each vector signal (None for scalars)
+        self.ranges = {}
+
+        # Dict[str, str]: Direction of each port bit ('input' or 'output')
+        self.directions = {}
+
+        # Dict[str, str]: Parent of each bit name in the union-find of assign statements
+        self.aliases = {}
+
+        # List[Tuple[str, str, List[Tuple[str, str]]]]: Cell name, instance name and
+        # pin connections (pin name and bit name) of each gate
+        self.instances = []
+
+    def get_bits(self, expr: str) -> List[str]:
+        """
+        Get the bit names of a net expression, MSB first
+        """
+
+        expr = expr.strip()
+        if expr.startswith('{'):
+            return [bit for part in split_top_level(expr[1:-1]) for bit in self.get_bits(part)]
+        const_match = CONST_RE.match(expr)
+        if const_match:
+            width, base, digits = const_match.groups()
+            value = int(digits.replace('_', '').lower().replace('x', '0').replace('z', '0'),
+                        {'b': 2, 'h': 16, 'd': 10}[base])
+            width = int(width) if width else max(value.bit_length(), 1)
+            return ["'{}'".format((value >> bit) & 1) for bit in reversed(range(width))]
+        bit_match = BIT_SELECT_RE.match(expr)
+        if bit_match:
+            return [get_bit_name(bit_match.group(1), int(bit_match.group(2)))]
+        part_match = PART_SELECT_RE.match(expr)
+        if part_match:
+            name, msb, lsb = part_match.group(1), int(part_match.group(2)), int(part_match.group(3))
+        else:
+            name = expr
+            if self.ranges.get(name) is None:
+                return [name]
+            msb, lsb = self.ranges[name]
+        step = -1 if msb >= lsb else 1
+        return [get_bit_name(name, bit) for bit in range(msb, lsb + step, step)]
+
+    def find(self, bit: str) -> str:
+        root = bit
+        while self.aliases.get(root, root) != root:
+            root = self.aliases[root]
+        while bit != root:
+            self.aliases[bit], bit = root, self.aliases[bit]
+        return root
+
+    def union(self, bit1: str, bit2: str):
+        root1 = self.find(bit1)
+        root2 = self.find(bit2)
+        if root1 == root2:
+            return
+        # Constants and ports name the merged net
+        priority1 = 3 if root1.startswith("'") else PORT_PRIORITY.get(self.directions.get(root1), 0)
+        priority2 = 3 if root2.startswith("'") else PORT_PRIORITY.get(self.directions.get(root2), 0)
+        if priority1 < priority2:
+            root1, root2 = root2, root1
+        self.aliases[root2] = root1
+
+    def read_statement(self, statement: str):
+        keyword = statement.split(None, 1)[0]
+        rest = statement[len(keyword):].strip()
+        if keyword in ('module', 'endmodule'):
+            return
+        if keyword in (INPUT_DIRECTION, OUTPUT_DIRECTION, 'inout', 'wire', 'reg'):
+            vector_range = None
+            range_match = RANGE_RE.match(rest)
+            if range_match:
+                vector_range = (int(range_match.group(1)), int(range_match.group(2)))
+                rest = rest[range_match.end():]
+            for name in split_top_level(rest):
+                self.ranges[name] = vector_range
+                if keyword in (INPUT_DIRECTION, OUTPUT_DIRECTION):
+                    # LSB first, as hal numbers the bits of vector ports
+                    for bit in reversed(self.get_bits(name)):
+                        self.directions[bit] = keyword
+            return
+        if keyword == 'assign':
+            lhs, rhs = rest.split('=', 1)
+            for lhs_bit, rhs_bit in zip(self.get_bits(lhs), self.get_bits(rhs)):
+                self.union(lhs_bit, rhs_bit)
+            return
+        instance_match = INSTANCE_RE.match(statement)
+        if instance_match is None:
+            raise ValueError("Unsupported Verilog statement '{}'".format(statement[:80]))
+        cell_name, instance_name, connections_str = instance_match.groups()
+        connections = []
+        for pin_name, net_expr in CONNECTION_RE.findall(connections_str):
+            # Unconnected pins ('.QN()') are skipped
+            if net_expr:
+                connections.append((pin_name, self.get_bits(net_expr)[0]))
+        self.instances.append((cell_name, instance_name, connections))
+
+    def read(self, text: str):
+        text = ATTRIBUTE_RE.sub('', COMMENT_RE.sub('', text))
+        # endmodule is the only statement not terminated by a semicolon
+        text = re.sub(r'\bendmodule\b', ';', text)
+        for statement in text.split(';'):
+            statement = statement.strip()
+            if statement:
+                self.read_statement(statement)
+
+    def build(self):
+        """
+        Add the nets and gates read to the netlist
+        """
+
+        netlist = self.netlist
+        bit_nets = {}  # Dict[str, int]: Net index of each root bit name
+
+        def get_net(bit: str) -> int:
+            root = self.find(bit)
+            if root not in bit_nets:
+                const = root[1] if root.startswith("'") else None
+                bit_nets[root] = netlist.add_net(
+                    root, self.directions.get(root) == INPUT_DIRECTION, const)
+            return bit_nets[root]
+
+        # Port nets first, in declaration order
+        for bit in self.directions:
+            get_net(bit)
+        for cell_name, instance_name, connections in self.instances:
+            if cell_name not in netlist.cells:
+                raise ValueError("Unknown cell '{}' of gate '{}'".format(cell_name, instance_name))
+            netlist.add_gate(instance_name, netlist.cells[cell_name],
+                             [(pin_name, get_net(bit)) for pin_name, bit in connections])
+
+
+def load_native_netlist(netlist_path: str, lib_path: str, cache_dir: str = None,
+                        cells: Dict[str, CellType] = None) -> NativeNetlist:
+    """
+    Load a Yosys style gate-level Verilog netlist without hal
+
+    Args:
+        netlist_path (str): Path to the netlist .v file
+        lib_path (str): Path to the Liberty library file
+        cache_dir (str): Directory of the compiled library cache (see load_liberty)
+        cells (Dict[str, CellType]): Cells of the library, already loaded by load_liberty.
+            The library is loaded if not given. The cells are not modified, so they can
+            be shared by several netlists
+
+    Returns:
+        NativeNetlist: The netlist
+    """
+
+    if cells is None:
+        cells = load_liberty(lib_path, cache_dir)
+    netlist = NativeNetlist(cells)
+    reader = VerilogReader(netlist)
+    with open(netlist_path) as netlist_file:
+        reader.read(netlist_file.read())
+    reader.build()
+    return netlist
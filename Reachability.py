@@ -0,0 +1,114 @@
+from typing import Iterator, List, Tuple
+from collections import deque
+from BoolExpr import parse_function
+from Aig import get_shared_exprs
+from TruthTable import BLOCK_BITS, CompiledFunctions, get_var_masks, masks2rows
+
+
+class ReachabilityExplorer():
+    """
+    Explores the states of an FSM breadth-first from an initial state.
+    For each reached state only the input arguments are enumerated (bit-parallel,
+    a block of input vectors at a time), so the work is proportional to the number
+    of reachable states times the number of input vectors, and unreachable states
+    are never visited
+    """
+
+    def __init__(self, argspool, functions_list: list, ff_names: List[str],
+                 block_bits: int = BLOCK_BITS) -> None:
+        """
+        Args:
+            argspool (ArgsPool): Arguments of the state functions
+            functions_list (List[hal_py.BooleanFunction]): The state functions
+            ff_names (List[str]): Name of the FF of each state function (state bit)
+            block_bits (int): Log2 of the number of input vectors evaluated together
+        """
+
+        self.vars_num = len(argspool.net_ids_str)
+
+        # CompiledFunctions: Bit-parallel form of all the state functions, normalized through
+        # a shared AIG so the logic they share is evaluated once
+        exprs = get_shared_exprs([parse_function(function) for function in functions_list])
+        self.compiled = CompiledFunctions(exprs, argspool.net_ids_str)
+
+        # List[Tuple[int, int, bool]]: Arguments determined by the state. For each one:
+        # argument index, state bit index and True if the argument is the opposite
+        # of the state bit ('QN' pin)
+        self.state_args = []
+
+        # List[int]: Indexes of the arguments that are not determined by the state.
+        # Those are enumerated for each state and make up the transition labels
+        self.free_indexes = []
+
+        ff_index = {name: ind for ind, name in enumerate(ff_names)}
+        for arg_ind, gate_name in enumerate(argspool.gate_names):
+            pin_name = argspool.pin_names[arg_ind]
+            if gate_name in ff_index and pin_name in ('Q', 'QN'):
+                self.state_args.append((arg_ind, ff_index[gate_name], pin_name == 'QN'))
+            else:
+                self.free_indexes.append(arg_ind)
+
+        self.block_bits = min(block_bits, len(self.free_indexes))
+
+    def get_successors(self, state: str) -> List[Tuple[str, str]]:
+        """
+        Get the transitions going out of a state
+
+        Args:
+            state (str): The state (for example 0010, a character per state function)
+
+        Returns:
+            List[Tuple[str, str]]: Next state and input strings of each transition
+        """
+
+        size = 1 << self.block_bits
+        full_mask = (1 << size) - 1
+        var_masks = [0] * self.vars_num
+        for arg_ind, state_bit, is_opposite in self.state_args:
+            if (state[state_bit] == '1') != is_opposite:
+                var_masks[arg_ind] = full_mask
+
+        successors = []
+        for start in range(0, 1 << len(self.free_indexes), size):
+            free_masks = get_var_masks(len(self.free_indexes), start, self.block_bits)
+            for bit, arg_ind in enumerate(self.free_indexes):
+                var_masks[arg_ind] = free_masks[bit]
+            successors.extend(zip(masks2rows(self.compiled(var_masks, full_mask), size),
+                                  masks2rows(free_masks, size)))
+        return successors
+
+    def iter_transitions(self, initial_state: str) -> Iterator[Tuple[str, str, str]]:
+        """
+        Iterate over the transitions of all the states reachable from the initial state,
+        in breadth-first order
+
+        Args:
+            initial_state (str): The initial (reset) state
+
+        Yields:
+            Tuple[str, str, str]: Current state, next state and input strings
+        """
+
+        for transitions in self.iter_states(initial_state):
+            yield from transitions
+
+    def iter_states(self, initial_state: str) -> Iterator[List[Tuple[str, str, str]]]:
+        """
+        Iterate over the transitions of the reachable states a state at a time
+        (see iter_transitions)
+
+        Yields:
+            List[Tuple[str, str, str]]: Current state, next state and input strings of
+                the transitions going out of a state
+        """
+
+        visited = {initial_state}
+        queue = deque([initial_state])
+        while queue:
+            cur_state = queue.popleft()
+            successors = self.get_successors(cur_state)
+            yield [(cur_state, next_state, cur_input) for next_state, cur_input in successors]
+            for next_state, _ in successors:
+                if next_state not in visited:
+                    visited.add(next_state)
+                    queue.append(next_state)
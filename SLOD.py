@@ -1,23 +1,48 @@
 # Environment and HAL initialization
+from __future__ import annotations
 import sys, os
+import multiprocessing
 
 HAL_BASE = "/usr/local/"
 os.environ["HAL_BASE_PATH"] = HAL_BASE
 sys.path.append(HAL_BASE+"lib/")
-import hal_py
+try:
+    import hal_py
+except ImportError:
+    # Netlists can still be analyzed with the native loader (see NativeNetlist)
+    hal_py = None
 
-from typing import Dict, List, Tuple, Union
+from typing import Callable, Dict, List, Tuple, Union
 
-from sympy import symbols
-from sympy.logic.boolalg import to_cnf, And, Or, Not, BooleanTrue, BooleanFalse
+from sympy import symbols, Symbol
+from sympy.logic.boolalg import to_cnf, And, Or, Not, Xor, BooleanTrue, BooleanFalse, true, false
 from sympy.parsing.sympy_parser import parse_expr
 from sympy.logic import simplify_logic
 
 from pysat.formula import IDPool, CNF
-from pysat.solvers import Solver
+from pysat.solvers import Solver, SolverNames
+try:
+    import pycryptosat
+except ImportError:
+    # Only the native XOR constraints need it (see check_native_xor)
+    pycryptosat = None
 
-import hal_py
 import FSM
+from BoolExpr import ExprNode, VAR, CONST, NOT, AND, OR, XOR, topological_nodes, get_node_variables, \
+    substitute_variables
+from CnfEncoder import TseitinEncoder, ClauseTemplate
+from TruthTable import CompiledFunctions
+from Aig import get_shared_exprs
+
+
+TSEITIN_ENCODING = 'tseitin'
+SYMPY_ENCODING = 'sympy'
+
+# str: Name of the pysat backend used by default
+DEFAULT_SOLVER = 'g4'
+
+# List[str]: pysat backends raced by the portfolio mode (see run_portfolio)
+PORTFOLIO_SOLVERS = ['cadical153', 'glucose4', 'maplechrono', 'lingeling']
 
 
 def sym_cnf2clauses(expr) -> tuple:
@@ -51,11 +76,39 @@ def parse_clause(clause: Union[Not, Or], vars_pool: IDPool) -> List[int]:
 
 
 def str2sym_cnf(function_str: str) -> Union[Not, And]:
-    sympy_expr = parse_expr(function_str)
+    return sym2cnf(parse_expr(function_str))
+
+
+def sym2cnf(sympy_expr) -> Union[Not, And]:
     sympy_expr_cnf = simplify_logic(to_cnf(sympy_expr))
     return sympy_expr_cnf
 
 
+def expr2sym(root: ExprNode):
+    """
+    Build the SymPy expression of an expression tree directly, in a single pass over
+    its nodes (equivalent to parse_expr() of its string, without the string round trip)
+
+    Args:
+        root (ExprNode): Root of the expression tree
+
+    Returns:
+        sympy.logic.boolalg.Boolean: The SymPy expression
+    """
+
+    results = {}
+    for node in topological_nodes(root):
+        if node.op == VAR:
+            result = Symbol(node.name)
+        elif node.op == CONST:
+            result = true if node.name == '1' else false
+        else:
+            args = [results[id(arg)] for arg in node.args]
+            result = {NOT: Not, AND: And, OR: Or, XOR: Xor}[node.op](*args)
+        results[id(node)] = result
+    return results[id(root)]
+
+
 def sym_cnf2sat(sym_func: Union[Not, And], 
                 vars_pool: IDPool = None) -> Tuple[List[List[int]], IDPool]:
     if vars_pool is None:
@@ -75,8 +128,8 @@ def func2sym(netlist: hal_py.Netlist, functions: List[hal_py.BooleanFunction],
     else:
         function_for_iter = functions
     for func in function_for_iter:
-        func_str, pin2net_dict = FSM.get_function_str(netlist, func, group_num)
-        sym_func = parse_expr(func_str)
+        func_expr, pin2net_dict = FSM.get_function_expr(netlist, func, group_num)
+        sym_func = expr2sym(func_expr)
         sym_functions.append(sym_func)
     if type(functions) is not list:
         return sym_functions[0], pin2net_dict
@@ -84,6 +137,255 @@ def func2sym(netlist: hal_py.Netlist, functions: List[hal_py.BooleanFunction],
         return sym_functions, pin2net_dict
 
 
+def func2expr(netlist: hal_py.Netlist, functions: List[hal_py.BooleanFunction],
+              group_num: int) -> Tuple[List[ExprNode], Dict[str, FSM.PosNegNet]]:
+    """
+    Convert hal boolean functions to expression trees with pin names as variables
+    (same variable names as func2sym)
+
+    Args:
+        netlist (hal_py.Netlist): The netlist in which the functions are defined
+        functions (List[hal_py.BooleanFunction]): The functions to convert
+        group_num (int): Key group number, added as suffix to key (global input) variables
+
+    Returns:
+        Tuple[List[ExprNode], Dict[str, FSM.PosNegNet]]:
+            List[ExprNode]: Expression tree of each function
+            Dict[str, FSM.PosNegNet]: Nets of each variable name (see FSM.get_function_str)
+    """
+
+    expressions = []
+    pin2net_dict = {}
+    for func in functions:
+        func_expr, cur_pin2net = FSM.get_function_expr(netlist, func, group_num)
+        expressions.append(func_expr)
+        pin2net_dict.update(cur_pin2net)
+    return expressions, pin2net_dict
+
+
+def get_key_group_name(name: str, group_num: int) -> str:
+    """
+    Name of a key variable in a key group (see FSM.get_function_str)
+    """
+
+    return name + '_' + str(group_num)
+
+
+# str: Separator of the frame number in the names of unrolled input variables
+FRAME_SEPARATOR = '@'
+
+# str: Frame name of the unconstrained (free state) copy of the sequential attack
+FREE_FRAME = 'free'
+
+
+class CircuitTemplate():
+    """
+    The state functions of a locked FSM, parsed once, from which any number of
+    copies with renamed key variables (key groups) are created.
+    A copy is made by replacing the key leaves of the parsed trees, or, for CNF
+    encodings, by instantiating a single ClauseTemplate with a key group suffix.
+    Either way a copy costs O(size of the functions) and nothing is parsed again
+    """
+
+    def __init__(self, netlist: hal_py.Netlist, functions: List[hal_py.BooleanFunction]) -> None:
+        """
+        Args:
+            netlist (hal_py.Netlist): The netlist in which the functions are defined
+            functions (List[hal_py.BooleanFunction]): Logical function of each state bit
+        """
+
+        # List[ExprNode]: Expression of each state function, with key variables not
+        # assigned to a key group. The functions are normalized through a shared AIG, so
+        # logic repeated in several of them is a single shared node (see Aig.to_exprs),
+        # which is encoded once per copy
+        expressions, self.pin2net_dict = func2expr(netlist, functions, None)
+        self.functions = get_shared_exprs(expressions)
+
+        # List[str]: Names of the key (global input) variables
+        self.key_names = [name for name, nets in self.pin2net_dict.items() if nets.is_key_net]
+
+        # Dict[bool, ClauseTemplate]: CNF encoding of the functions, without and with
+        # native XOR constraints. Built on first use
+        self.clause_templates = {}
+
+    def get_copy(self, group_num: int) -> List[ExprNode]:
+        """
+        Get the state functions with the key variables of a key group
+
+        Args:
+            group_num (int): Key group number, added as suffix to the key variables
+
+        Returns:
+            List[ExprNode]: Expression tree of each state function
+        """
+
+        leaves = {name: ExprNode(VAR, name=get_key_group_name(name, group_num)) for name in self.key_names}
+        return [substitute_variables(function, leaves) for function in self.functions]
+
+    def get_pin2net_dict(self, group_nums: List[int]) -> Dict[str, FSM.PosNegNet]:
+        """
+        Get the nets of each variable name of the given key groups (see FSM.get_function_str)
+        """
+
+        pin2net_dict = {}
+        for name, nets in self.pin2net_dict.items():
+            if nets.is_key_net:
+                for group_num in group_nums:
+                    pin2net_dict[get_key_group_name(name, group_num)] = nets
+            else:
+                pin2net_dict[name] = nets
+        return pin2net_dict
+
+    def get_clause_template(self, native_xor: bool = False) -> ClauseTemplate:
+        """
+        Get the CNF encoding of the state functions, instantiated for a key group
+        with the suffix of get_key_group_name()
+        """
+
+        if native_xor not in self.clause_templates:
+            self.clause_templates[native_xor] = ClauseTemplate(self.functions, self.key_names, native_xor)
+        return self.clause_templates[native_xor]
+
+    def instantiate(self, encoder: TseitinEncoder, group_num: int, fixed: Dict[str, bool] = None,
+                    lits: Dict[str, int] = None) -> List[int]:
+        """
+        Add a copy of the CNF encoding of the state functions to an encoder
+
+        Args:
+            encoder (TseitinEncoder): The encoder
+            group_num (int): Key group of the key variables of the copy
+            fixed (Dict[str, bool]): Values of non key variables
+            lits (Dict[str, int]): Encoder literals of variables (see ClauseTemplate.instantiate)
+
+        Returns:
+            List[int]: Encoder literal equivalent to each state function
+        """
+
+        return self.get_clause_template(encoder.native_xor).instantiate(
+            encoder, fixed, get_key_group_name('', group_num), lits)
+
+
+def check_native_xor(solver_name: str):
+    """
+    Check that native XOR constraints can be given to a pysat backend, before any
+    encoding is done (pysat only fails when the solver is created)
+    """
+
+    if solver_name not in SolverNames.cryptosat:
+        raise ValueError("Native XOR constraints need a CryptoMiniSat backend (one of {}), got '{}'"
+                         .format(', '.join(SolverNames.cryptosat), solver_name))
+    if pycryptosat is None:
+        raise ImportError("Native XOR constraints need the CryptoMiniSat backend of pysat, which needs "
+                          "pycryptosat (pip install pycryptosat)")
+
+
+class EncoderFeed():
+    """
+    Adds the clauses and XOR constraints of a TseitinEncoder to an incremental
+    solver, sending only what was generated since the previous call
+    """
+
+    def __init__(self, solver: Solver, encoder: TseitinEncoder) -> None:
+        self.solver = solver
+        self.encoder = encoder
+        self.clauses_num = 0  # int: Number of clauses already sent
+        self.xor_clauses_num = 0  # int: Number of XOR constraints already sent
+
+    def send(self):
+        self.solver.append_formula(self.encoder.clauses[self.clauses_num:])
+        self.clauses_num = len(self.encoder.clauses)
+        for lits in self.encoder.xor_clauses[self.xor_clauses_num:]:
+            # The solver takes variables and the value of their exclusive or
+            value = False
+            for lit in lits:
+                if lit < 0:
+                    value = not value
+            self.solver.add_xor_clause([abs(lit) for lit in lits], value)
+        self.xor_clauses_num = len(self.encoder.xor_clauses)
+
+
+class DecryptionResult():
+    """
+    Outcome of a key recovery
+    """
+
+    def __init__(self, key: Dict[str, bool], iterations: int, clauses_num: int, vars_num: int,
+                 depth: int = None, solver_name: str = None, unique: bool = None,
+                 equivalent: bool = None, equivalent_from_reset: bool = None) -> None:
+        self.key = key  # Dict[str, bool]: Recovered key values (by variable names)
+        self.iterations = iterations  # int: Number of distinguishing inputs found
+        self.clauses_num = clauses_num  # int: Number of clauses of the final formula
+        self.vars_num = vars_num  # int: Number of SAT variables of the final formula
+        self.depth = depth  # int: Number of unrolled cycles (sequential attack only)
+        self.solver_name = solver_name  # str: The pysat backend which found the key
+
+        # bool: True if no other key is consistent with the oracle (sequential attack only)
+        self.unique = unique
+
+        # bool: True if all the keys consistent with the oracle were proven to give the
+        # same state functions, so any of them unlocks the FSM (sequential attack only)
+        self.equivalent = equivalent
+
+        # bool: True if all the keys consistent with the oracle were proven to give the
+        # same state traces from the initial state under any input sequence (sequential
+        # attack only). They may still give different next states from states that are
+        # not reachable from it. If unique, equivalent and equivalent_from_reset are all
+        # False, the key is only known to agree with the correct key on input sequences
+        # up to depth cycles long
+        self.equivalent_from_reset = equivalent_from_reset
+
+    def __str__(self) -> str:
+        result_str = "Key: {}\nIterations: {}\nClauses: {}\nVariables: {}".format(
+            self.key, self.iterations, self.clauses_num, self.vars_num)
+        if self.depth is not None:
+            result_str += "\nDepth: {}".format(self.depth)
+        if self.solver_name is not None:
+            result_str += "\nSolver: {}".format(self.solver_name)
+        if self.unique is not None:
+            result_str += "\nUnique: {}\nEquivalent: {}\nEquivalent from reset: {}".format(
+                self.unique, self.equivalent, self.equivalent_from_reset)
+        return result_str
+
+
+class Oracle():
+    """
+    Evaluates the unlocked circuit (the state functions with the correct key)
+    """
+
+    def __init__(self, functions: List[ExprNode], correct_key: Dict[str, bool]) -> None:
+        """
+        Args:
+            functions (List[ExprNode]): Expression tree of each state function
+            correct_key (Dict[str, bool]): Values of the key variables
+        """
+
+        self.var_names = []
+        for function in functions:
+            for name in get_node_variables(function):
+                if name not in self.var_names:
+                    self.var_names.append(name)
+        self.compiled = CompiledFunctions(functions, self.var_names)
+
+        # List[int]: Argument vector with the key values set (other values are
+        # overwritten on each call)
+        self.args = [int(bool(correct_key.get(name, False))) for name in self.var_names]
+        self.key_indexes = {ind for ind, name in enumerate(self.var_names) if name in correct_key}
+
+    def __call__(self, inputs: Dict[str, bool]) -> List[bool]:
+        """
+        Args:
+            inputs (Dict[str, bool]): Values of the non key variables
+
+        Returns:
+            List[bool]: Value of each state function
+        """
+
+        for ind, name in enumerate(self.var_names):
+            if ind not in self.key_indexes:
+                self.args[ind] = int(bool(inputs.get(name, False)))
+        return [bool(value) for value in self.compiled(self.args, 1)]
+
+
 def get_args_dict_sym(literals_vec: List[int], vars_pool: IDPool, 
                         pin2net_dict: Dict[str, FSM.PosNegNet],
                         is_get_keys: bool) -> Dict[str, bool]:
@@ -100,8 +402,473 @@ def get_args_dict_sym(literals_vec: List[int], vars_pool: IDPool,
     return inputs_dict
 
 
+def add_unused_keys(key: Dict[str, bool], pin2net_dict: Dict[str, FSM.PosNegNet]):
+    """
+    Give the key variables missing from a recovered key the value False. Those do not
+    affect the state functions, so they were folded away (see Aig) and any value is correct
+    """
+
+    for name, nets in pin2net_dict.items():
+        if nets.is_key_net and name not in key:
+            key[name] = False
+
+
+def portfolio_worker(queue: multiprocessing.Queue, attack: Callable[..., DecryptionResult],
+                     args: tuple, kwargs: dict, solver_name: str):
+    try:
+        result = attack(*args, verbose=False, solver_name=solver_name, **kwargs)
+    except Exception as error:
+        result = error
+    queue.put((solver_name, result))
+
+
+def run_portfolio(attack: Callable[..., DecryptionResult], args: tuple, kwargs: dict,
+                  solver_names: List[str], verbose: bool = True) -> DecryptionResult:
+    """
+    Race a key recovery with several pysat backends on the same formula, each in its
+    own process, and return the first answer (the best backend varies a lot between
+    locked circuits). The other processes are terminated.
+    The processes are forked where possible, so the netlist and functions are
+    inherited rather than pickled (hal objects cannot be pickled)
+
+    Args:
+        attack (Callable[..., DecryptionResult]): The recovery function. Called with
+            args, kwargs, verbose=False and solver_name
+        args (tuple): Positional arguments of the attack
+        kwargs (dict): Keyword arguments of the attack
+        solver_names (List[str]): Names of the pysat backends (see PORTFOLIO_SOLVERS)
+        verbose (bool): If True, the winning backend and the key are printed
+
+    Returns:
+        DecryptionResult: Result of the first backend to finish
+    """
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+    queue = context.Queue()
+    processes = [context.Process(target=portfolio_worker, args=(queue, attack, args, kwargs, solver_name),
+                                 daemon=True)
+                 for solver_name in solver_names]
+    for process in processes:
+        process.start()
+
+    # A backend which fails (for example, one that is not built in this pysat) is
+    # skipped, unless all of them fail
+    error = None
+    try:
+        for _ in processes:
+            solver_name, result = queue.get()
+            if isinstance(result, Exception):
+                error = result
+                if verbose:
+                    print("Solver {} failed: {}".format(solver_name, result))
+                continue
+            if verbose:
+                print("First answer by solver {}".format(solver_name))
+                print(result.key)
+            return result
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+    raise error
+
+
+def decrypt_tseitin(netlist: hal_py.Netlist, functions: List[hal_py.BooleanFunction],
+                    correct_key: Dict[str, bool], verbose: bool = True,
+                    solver_name: str = DEFAULT_SOLVER, with_proof: bool = False,
+                    native_xor: bool = False) -> DecryptionResult:
+    """
+    Same algorithm as decrypt(), with the relations C1(X, K1, Y1), C2(X, K2, Y2), the
+    miter and the constraints of each distinguishing input encoded by a TseitinEncoder
+    (clauses are linear in the size of the functions).
+    The constraints of each distinguishing input are instances of fixed clause
+    templates and the oracle is a compiled evaluator, so no expression is
+    traversed inside the loop
+
+    Args:
+        netlist (hal_py.Netlist): The netlist in which the functions are defined
+        functions (List[hal_py.BooleanFunction]): Logical function of each state bit
+        correct_key (Dict[str, bool]): Key values (by key group 1 variable names)
+            used as the oracle
+        verbose (bool): If True, the final formula solution is printed
+        solver_name (str): Name of the pysat backend
+        with_proof (bool): If True, the solver traces a proof (slower, and uses
+            much more memory)
+        native_xor (bool): If True, XOR gates (including the miter) are given to the
+            solver as XOR constraints. Needs a CryptoMiniSat backend
+
+    Returns:
+        DecryptionResult: The recovered key
+    """
+
+    if native_xor:
+        check_native_xor(solver_name)
+
+    # The functions are parsed once. Key group copies are made from the template
+    circuit = CircuitTemplate(netlist, functions)
+    outputs1 = circuit.get_copy(1)
+    outputs2 = circuit.get_copy(2)
+
+    # pin2net_dict will be used to identificate key nets
+    pin2net_dict = circuit.get_pin2net_dict([1, 2])
+
+    encoder = TseitinEncoder(native_xor=native_xor)
+    vars_pool = encoder.vars_pool
+
+    # Variables of the outputs of all the flip flops for both
+    # variable options (1 and 2). Those are Y1 and Y2 of the algorithm
+    y1_lits = [vars_pool.id('y{}_1'.format(FF_ind)) for FF_ind in range(len(functions))]
+    y2_lits = [vars_pool.id('y{}_2'.format(FF_ind)) for FF_ind in range(len(functions))]
+
+    # Line 3 of the Logic Decryption Algorithm in the paper (C1 & C2)
+    for FF_ind in range(len(functions)):
+        encoder.add_equal(encoder.encode(outputs1[FF_ind]), y1_lits[FF_ind])
+        encoder.add_equal(encoder.encode(outputs2[FF_ind]), y2_lits[FF_ind])
+
+    # At least one bit of the output vector (state vector)
+    # sould be diffetent between assignment options 1 and 2: a difference variable
+    # per state bit and a single clause, so the miter is linear in the state width.
+    # The clause is not added to the encoder, since the final key search is done without it
+    y1_diff_y2 = [encoder.encode_xor(y1, y2) for y1, y2 in zip(y1_lits, y2_lits)]
+
+    # The clause template of C(X, K, Y) is instantiated as C(X, K1, Y1) and
+    # C(X, K2, Y2) for every distinguishing input
+    oracle = Oracle(outputs1, correct_key)
+
+    with Solver(name=solver_name, with_proof=with_proof) as s:
+        feed = EncoderFeed(s, encoder)
+        feed.send()
+        s.add_clause(y1_diff_y2)
+
+        iterations = 0
+        while s.solve():
+            iterations += 1
+            SOL = s.get_model()
+
+            Xd = get_args_dict_sym(SOL, vars_pool, pin2net_dict, is_get_keys=False)
+            Yd = oracle(Xd)
+
+            # C1(Xd, K1, Yd) & C2(Xd, K2, Yd)
+            for group_num in (1, 2):
+                for output_lit, y_value in zip(circuit.instantiate(encoder, group_num, Xd), Yd):
+                    encoder.clauses.append([output_lit if y_value else -output_lit])
+
+            feed.send()
+
+    with Solver(name=solver_name, with_proof=with_proof) as s:
+        EncoderFeed(s, encoder).send()
+        SAT = s.solve()
+        SOL = s.get_model()
+        Kc = get_args_dict_sym(SOL, vars_pool, pin2net_dict, is_get_keys=True)
+        add_unused_keys(Kc, pin2net_dict)
+
+        if verbose:
+            print('\n\nFunction test:\n\n\tClauses:\t{}\n\tSAT:\t{}\n\tModel:\t{}'
+                .format(len(encoder.clauses), SAT, SOL))
+            print('\nid2obj:\t{}'.format(vars_pool.id2obj))
+            print(Kc)
+
+    return DecryptionResult(Kc, iterations, len(encoder.clauses), vars_pool.top, solver_name=solver_name)
+
+
+class BmcUnroller():
+    """
+    Unrolls two copies of an FSM, with the key variables of key groups 1 and 2, from
+    the same initial state and under the same inputs, one frame (clock cycle) at a time.
+    Each frame is an instance of the clause template of the state functions, whose
+    state variables are the output literals of the previous frame, so the frames of
+    all depths share a single encoder (and a single incremental solver)
+    """
+
+    def __init__(self, circuit: CircuitTemplate, state_names: List[str], key_names: List[str],
+                 initial_state: str, encoder: TseitinEncoder) -> None:
+        """
+        Args:
+            circuit (CircuitTemplate): The state functions
+            state_names (List[str]): Name of the variable of each state bit (see
+                FSM.get_gate_pin_display_name)
+            key_names (List[str]): Names of the key variables (without key group suffix)
+            initial_state (str): The initial (reset) state (for example 0000)
+            encoder (TseitinEncoder): The encoder to add the frames to
+        """
+
+        self.circuit = circuit
+        self.encoder = encoder
+        self.state_names = state_names
+
+        excluded_names = set(state_names) | set(key_names)
+        # List[str]: Variables with a fresh value in each frame (inputs, and outputs of
+        # FFs which are not part of the FSM)
+        self.input_names = [name for name in circuit.get_clause_template().var_names
+                            if name not in excluded_names]
+
+        initial_lits = [encoder.const_lit(char == '1') for char in initial_state]
+
+        # Dict[int, List[List[int]]]: State literals of each key group in each frame
+        self.states = {1: [initial_lits], 2: [initial_lits]}
+
+        # List[Dict[str, int]]: Literals of the input variables of each frame
+        self.input_lits = []
+
+        # List[int]: For each frame, a literal which is true if the states of the two
+        # copies differ at the end of the frame
+        self.diff_lits = []
+
+        # int: Activation literal of "the states of key group 1 in all the frames are
+        # distinct" (a path without repeated states, see add_frame)
+        self.simple_path_act = encoder.new_var()
+
+    def add_frame(self):
+        """
+        Unroll one more cycle. The states of key group 1 at the end of the frame are also
+        constrained to differ from all its previous states, under the assumption of
+        simple_path_act
+        """
+
+        frame = len(self.input_lits)
+        inputs = {name: self.encoder.vars_pool.id(name + FRAME_SEPARATOR + str(frame))
+                  for name in self.input_names}
+        self.input_lits.append(inputs)
+        for group_num in (1, 2):
+            lits = dict(zip(self.state_names, self.states[group_num][-1]))
+            lits.update(inputs)
+            self.states[group_num].append(self.circuit.instantiate(self.encoder, group_num, lits=lits))
+        self.diff_lits.append(self.encode_states_diff(self.states[1][-1], self.states[2][-1]))
+        for prev_state in self.states[1][:-1]:
+            self.encoder.clauses.append([-self.simple_path_act,
+                                         self.encode_states_diff(prev_state, self.states[1][-1])])
+
+    def encode_states_diff(self, state1: List[int], state2: List[int]) -> int:
+        """
+        Get a literal which is true if two states (literals of their bits) differ
+        """
+
+        diffs = [self.encoder.encode_xor(lit1, lit2) for lit1, lit2 in zip(state1, state2)]
+        return -self.encoder.encode_and([-lit for lit in diffs])
+
+    def add_free_copy(self) -> List[int]:
+        """
+        Add a copy of a single cycle of both keys from a free state (not necessarily
+        reachable) under free inputs
+
+        Returns:
+            List[int]: Literal which is true if the next states of the two copies differ,
+                for each state bit
+        """
+
+        lits = {name: self.encoder.vars_pool.id(name + FRAME_SEPARATOR + FREE_FRAME)
+                for name in self.state_names + self.input_names}
+        outputs1 = self.circuit.instantiate(self.encoder, 1, lits=lits)
+        outputs2 = self.circuit.instantiate(self.encoder, 2, lits=lits)
+        return [self.encoder.encode_xor(lit1, lit2) for lit1, lit2 in zip(outputs1, outputs2)]
+
+    def get_input_sequence(self, model: List[int]) -> List[Dict[str, bool]]:
+        """
+        Get the values of the input variables of each frame in a solver model
+        """
+
+        true_vars = {lit for lit in model if lit > 0}
+        return [{name: var in true_vars for name, var in inputs.items()} for inputs in self.input_lits]
+
+
+def decrypt_sequential(netlist: hal_py.Netlist, functions: List[hal_py.BooleanFunction],
+                       ff_names: List[str], correct_key: Dict[str, bool], max_depth: int = None,
+                       initial_state: str = None, verbose: bool = True,
+                       solver_name: str = DEFAULT_SOLVER, with_proof: bool = False,
+                       native_xor: bool = False, portfolio: List[str] = None) -> DecryptionResult:
+    """
+    Sequential key recovery by bounded model checking. Instead of treating the state
+    bits as free inputs of a single combinational step, the FSM is unrolled from the
+    initial state (see BmcUnroller), so only reachable states are considered and keys
+    that differ only after several cycles are told apart.
+    For depth k = 1, 2, ...: while the two unrolled copies can differ within k cycles,
+    the input sequence that tells them apart is run on the oracle and the keys are
+    constrained to reproduce its state trace. The depth grows on the same solver, so
+    clauses learned at one depth are reused at the next. Recovery stops when:
+        1. The key is unique (no two different keys satisfy the constraints)
+        2. The remaining keys are equivalent: no two of them give different next states
+           from any state (reachable or not) under any input
+        3. The remaining keys agree from the initial state: no remaining key
+           has a path of depth cycles from the initial state without repeated states.
+           A shortest distinguishing sequence visits distinct states until the keys
+           diverge (a loop could be cut out of it), so it would be at most depth cycles
+           long, and none is left. The remaining keys may still differ on states which are
+           not reachable (the result reports equivalent_from_reset but not equivalent)
+        4. max_depth is reached. The remaining keys may then still differ on longer
+           sequences, which the result reports (unique, equivalent and
+           equivalent_from_reset are False)
+    Key variables are the global inputs in correct_key. Other global inputs are inputs
+    with a value in each cycle
+
+    Args:
+        netlist (hal_py.Netlist): The netlist in which the functions are defined
+        functions (List[hal_py.BooleanFunction]): Logical function of each state bit
+        ff_names (List[str]): Name of the FF of each state function
+        correct_key (Dict[str, bool]): Key values (by key group 1 variable names)
+            used as the oracle
+        max_depth (int): Maximal number of unrolled cycles. Default is no limit (the
+            depth is then bounded by the longest path without repeated states)
+        initial_state (str): The initial (reset) state. Default is the zero state
+        verbose (bool): If True, each depth and the recovered key are printed
+        solver_name (str): Name of the pysat backend
+        with_proof (bool): If True, the solver traces a proof
+        native_xor (bool): If True, XOR gates are given to the solver as XOR
+            constraints. Needs a CryptoMiniSat backend
+        portfolio (List[str]): If given, the attack is raced with each of these pysat
+            backends (see run_portfolio) and solver_name is ignored
+
+    Returns:
+        DecryptionResult: The recovered key (by key group 1 and 2 variable names)
+    """
+
+    if portfolio:
+        return run_portfolio(decrypt_sequential, (netlist, functions, ff_names, correct_key),
+                             {'max_depth': max_depth, 'initial_state': initial_state,
+                              'with_proof': with_proof, 'native_xor': native_xor}, portfolio, verbose)
+    if native_xor:
+        check_native_xor(solver_name)
+
+    if initial_state is None:
+        initial_state = len(functions) * "0"
+
+    circuit = CircuitTemplate(netlist, functions)
+    group_suffix = get_key_group_name('', 1)
+    key_values = {name[:-len(group_suffix)]: value for name, value in correct_key.items()
+                  if name.endswith(group_suffix)}
+    key_names = [name for name in circuit.key_names if name in key_values]
+    state_names = [FSM.get_gate_pin_display_name(ff_name) for ff_name in ff_names]
+    oracle = Oracle(circuit.functions, key_values)
+
+    encoder = TseitinEncoder(native_xor=native_xor)
+    vars_pool = encoder.vars_pool
+    unroller = BmcUnroller(circuit, state_names, key_names, initial_state, encoder)
+
+    # Activation literal of "the two keys differ", used to test whether the key is unique
+    key_diff_act = encoder.new_var()
+    key_diffs = [encoder.encode_xor(vars_pool.id(get_key_group_name(name, 1)),
+                                    vars_pool.id(get_key_group_name(name, 2))) for name in key_names]
+    encoder.clauses.append([-key_diff_act] + key_diffs)
+
+    # Activation literal of "the two keys give different next states from a free state",
+    # used to test whether the remaining keys are equivalent
+    free_diff_act = encoder.new_var()
+    encoder.clauses.append([-free_diff_act] + unroller.add_free_copy())
+
+    # Set[Tuple[str, tuple]]: States and inputs whose oracle transition is already
+    # constrained
+    constrained = set()
+
+    iterations = 0
+    depth = 0
+    unique = equivalent = equivalent_from_reset = False
+    with Solver(name=solver_name, with_proof=with_proof) as s:
+        feed = EncoderFeed(s, encoder)
+        while max_depth is None or depth < max_depth:
+            depth += 1
+            unroller.add_frame()
+            # Activation literal of the miter of this depth
+            miter_act = encoder.new_var()
+            encoder.clauses.append([-miter_act] + unroller.diff_lits)
+            feed.send()
+
+            while s.solve(assumptions=[miter_act]):
+                iterations += 1
+                state = initial_state
+                for inputs in unroller.get_input_sequence(s.get_model()):
+                    args = dict(inputs)
+                    args.update((name, char == '1') for name, char in zip(state_names, state))
+                    next_state = ''.join('1' if value else '0' for value in oracle(args))
+                    transition = (state, tuple(sorted(inputs.items())))
+                    if transition not in constrained:
+                        constrained.add(transition)
+                        # C(S, X, K1) == C(S, X, K2) == oracle next state
+                        for group_num in (1, 2):
+                            outputs = circuit.instantiate(encoder, group_num, args)
+                            for output_lit, char in zip(outputs, next_state):
+                                encoder.clauses.append([output_lit if char == '1' else -output_lit])
+                    state = next_state
+                feed.send()
+
+            # No input sequence of this depth tells the remaining keys apart
+            encoder.clauses.append([-miter_act])
+            feed.send()
+            if verbose:
+                print("Depth {}: {} distinguishing input sequences in total".format(depth, iterations))
+            if not s.solve(assumptions=[key_diff_act]):
+                unique = equivalent = equivalent_from_reset = True
+                break
+            if not s.solve(assumptions=[free_diff_act]):
+                equivalent = equivalent_from_reset = True
+                break
+            feed.send()
+            if not s.solve(assumptions=[unroller.simple_path_act]):
+                equivalent_from_reset = True
+                break
+
+        s.solve()
+        model = {abs(lit): lit > 0 for lit in s.get_model()}
+
+    Kc = {}
+    for group_num in (1, 2):
+        for name in key_names:
+            group_name = get_key_group_name(name, group_num)
+            Kc[group_name] = model.get(vars_pool.id(group_name), False)
+    if verbose:
+        print(Kc)
+        if equivalent and not unique:
+            print("The key is not unique: the remaining keys are equivalent")
+        elif equivalent_from_reset and not equivalent:
+            print("The key is not unique: the remaining keys agree on all the states reachable "
+                  "from the initial state, but may differ on other states")
+        elif not equivalent_from_reset:
+            print("The key is not unique: the remaining keys agree on input sequences of up to "
+                  "{} cycles".format(depth))
+
+    return DecryptionResult(Kc, iterations, len(encoder.clauses), vars_pool.top, depth, solver_name,
+                            unique, equivalent, equivalent_from_reset)
+
+
 def decrypt(netlist: hal_py.Netlist, functions: List[hal_py.BooleanFunction],
-        correct_key: Dict[str, bool]):
+        correct_key: Dict[str, bool], encoding: str = TSEITIN_ENCODING,
+        verbose: bool = True, solver_name: str = DEFAULT_SOLVER, with_proof: bool = False,
+        native_xor: bool = False, portfolio: List[str] = None) -> DecryptionResult:
+    """
+    Recover the key of the state functions (Logic Decryption Algorithm)
+
+    Args:
+        netlist (hal_py.Netlist): The netlist in which the functions are defined
+        functions (List[hal_py.BooleanFunction]): Logical function of each state bit
+        correct_key (Dict[str, bool]): Key values (by key group 1 variable names)
+            used as the oracle
+        encoding (str): TSEITIN_ENCODING or SYMPY_ENCODING
+        verbose (bool): If True, the final formula solution is printed
+        solver_name (str): Name of the pysat backend
+        with_proof (bool): If True, the solver traces a proof (slower, and uses
+            much more memory)
+        native_xor (bool): If True, XOR gates are given to the solver as XOR
+            constraints. Needs a CryptoMiniSat backend and the Tseitin encoding
+        portfolio (List[str]): If given, the attack is raced with each of these pysat
+            backends (for example PORTFOLIO_SOLVERS, see run_portfolio) and
+            solver_name is ignored
+
+    Returns:
+        DecryptionResult: The recovered key
+    """
+
+    if portfolio:
+        return run_portfolio(decrypt, (netlist, functions, correct_key),
+                             {'encoding': encoding, 'with_proof': with_proof, 'native_xor': native_xor},
+                             portfolio, verbose)
+    if encoding == TSEITIN_ENCODING:
+        return decrypt_tseitin(netlist, functions, correct_key, verbose, solver_name, with_proof, native_xor)
+    elif encoding != SYMPY_ENCODING:
+        raise ValueError("Unknown encoding '{}'".format(encoding))
+    elif native_xor:
+        raise ValueError("Native XOR constraints need the '{}' encoding".format(TSEITIN_ENCODING))
 
     # Vectors of sympy boolean expressions, each describing a state
     # (number of elements are the number of flip flops)
@@ -122,12 +889,21 @@ def decrypt(netlist: hal_py.Netlist, functions: List[hal_py.BooleanFunction],
     C2_sym = BooleanTrue()
 
     # Sympy boolean CNF expression which will hold the CNF representation
-    # of y1 ^ y2 (where y1 and y2 are the resiters output vectors)
-    y1_diff_y2_sym = BooleanFalse()
+    # of y1 != y2 (where y1 and y2 are the resiters output vectors): a difference
+    # symbol per state bit (d == y1 ^ y2) and a single clause ORing them, so its size
+    # is linear in the number of flip flops (a CNF of the OR of the XORs is exponential)
+    diff_symbols = []
+    y1_diff_y2_sym = BooleanTrue()
 
-    pin2net_dict = {}
+    # The functions are parsed once. Key group copies are made from the template
+    circuit = CircuitTemplate(netlist, functions)
+    copies1 = circuit.get_copy(1)
+    copies2 = circuit.get_copy(2)
 
-    for FF_ind, function in enumerate(functions):
+    # pin2net_dict will be used to identificate key nets
+    pin2net_dict = circuit.get_pin2net_dict([1, 2])
+
+    for FF_ind in range(len(functions)):
         # String names of the output vecors of all the flip flops for
         # both variable options (1 and 2)
         y1_name = 'y{}_1'.format(FF_ind)
@@ -136,15 +912,11 @@ def decrypt(netlist: hal_py.Netlist, functions: List[hal_py.BooleanFunction],
         y1_symbols.append(symbols(y1_name))
         y2_symbols.append(symbols(y2_name))
 
-        cur_output1_sym, cur_pin2net1 = func2sym(netlist, function, 1)
-        cur_output2_sym, cur_pin2net2 = func2sym(netlist, function, 2)
+        cur_output1_sym = expr2sym(copies1[FF_ind])
+        cur_output2_sym = expr2sym(copies2[FF_ind])
 
         unlocked_cirquit.append(cur_output1_sym.subs(correct_key))
 
-        # pin2net_dict will be used to identificate key nets
-        pin2net_dict.update(cur_pin2net1)
-        pin2net_dict.update(cur_pin2net2)
-
         outputs1_sym.append(cur_output1_sym)
         outputs2_sym.append(cur_output2_sym)
 
@@ -153,12 +925,13 @@ def decrypt(netlist: hal_py.Netlist, functions: List[hal_py.BooleanFunction],
         C1_sym &= to_cnf(~(outputs1_sym[-1] ^ y1_symbols[-1]))
         C2_sym &= to_cnf(~(outputs2_sym[-1] ^ y2_symbols[-1]))
 
-        # At least one bit of the output vector (state vector)
-        # sould be diffetent between assignment options 1 and 2
         # XOR is equivalent to !=
-        y1_diff_y2_sym |= y1_symbols[-1] ^ y2_symbols[-1]
+        diff_symbols.append(symbols('d{}'.format(FF_ind)))
+        y1_diff_y2_sym &= to_cnf(~(diff_symbols[-1] ^ y1_symbols[-1] ^ y2_symbols[-1]))
 
-    y1_diff_y2_sym = to_cnf(y1_diff_y2_sym)
+    # At least one bit of the output vector (state vector)
+    # sould be diffetent between assignment options 1 and 2
+    y1_diff_y2_sym &= Or(*diff_symbols)
 
     # Line 3 of the Logic Decryption Algorithm in the paper 
     F1_sym = C1_sym & C2_sym
@@ -169,11 +942,13 @@ def decrypt(netlist: hal_py.Netlist, functions: List[hal_py.BooleanFunction],
 
     Fi = CNF(from_clauses=F1)
     
-    with Solver(name='g4', with_proof=True) as s:
+    with Solver(name=solver_name, with_proof=with_proof) as s:
         s.append_formula(F1)
         s.append_formula(y1_diff_y2)
 
+        iterations = 0
         while s.solve():
+            iterations += 1
             SOL = s.get_model()
 
             Xd = get_args_dict_sym(SOL, vars_pool, pin2net_dict, is_get_keys=False)
@@ -199,17 +974,20 @@ def decrypt(netlist: hal_py.Netlist, functions: List[hal_py.BooleanFunction],
             s.append_formula(C1_d)
             s.append_formula(C2_d)
 
-    with Solver(name='g4', bootstrap_with=Fi.clauses, with_proof=True) as s:
+    with Solver(name=solver_name, bootstrap_with=Fi.clauses, with_proof=with_proof) as s:
         SAT = s.solve()
         SOL = s.get_model()
         Kc = get_args_dict_sym(SOL, vars_pool, pin2net_dict, is_get_keys=True)
+        add_unused_keys(Kc, pin2net_dict)
 
+        if verbose:
+            print('\n\nFunction test:\n\n\tFunc.:\n\n{}\n\n\tSAT:\t{}\n\tModel:\t{}'
+                .format(F1_sym & y1_diff_y2_sym, SAT, SOL))
+            print('\nid2obj:\t{}'.format(vars_pool.id2obj))
+            print(Kc)
+
+    return DecryptionResult(Kc, iterations, len(Fi.clauses), vars_pool.top, solver_name=solver_name)
 
-        print('\n\nFunction test:\n\n\tFunc.:\n\n{}\n\n\tSAT:\t{}\n\tModel:\t{}'
-            .format(F1_sym & y1_diff_y2_sym, SAT, SOL))
-        print('\nid2obj:\t{}'.format(vars_pool.id2obj))
-        print(Xd)
-    
 
 
 if __name__ == "__main__":
@@ -218,12 +996,14 @@ if __name__ == "__main__":
 
     if IS_FIRST_NETLIST:
         netlist, functions = FSM.analyze_fsm("./project2_cipher_v1.v", 
-            "./NangateOpenCellLibrary_functional.lib")
+            "./NangateOpenCellLibrary_functional.lib",
+            cache_dir=FSM.DEFAULT_CACHE_DIR)
         
         decrypt(netlist, functions, {'START_1': True})
     else:
         netlist, functions = FSM.analyze_fsm("./project2_cipher_v2_obfuscated.v", 
-            "./NangateOpenCellLibrary_functional.lib")
+            "./NangateOpenCellLibrary_functional.lib",
+            cache_dir=FSM.DEFAULT_CACHE_DIR)
 
         decrypt(netlist, functions, {'INPUT0_1': True,
                                      'INPUT1_1': False,
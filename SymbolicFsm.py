@@ -0,0 +1,263 @@
+from typing import Dict, Iterator, List, Tuple
+from BoolExpr import ExprNode, get_node_variables, parse_function
+from Bdd import BddManager, FALSE, TRUE
+
+
+# str: Suffix of the names of the next state variables
+NEXT_SUFFIX = "'"
+
+
+def get_variable_order(roots: List[ExprNode], state_vars: Dict[str, int],
+                       state_bits: int) -> List[Tuple[int, object]]:
+    """
+    Variable ordering heuristic. The functions are visited from the smallest support
+    to the largest, and the variables are ordered by their first appearance in a
+    depth-first traversal of each function, so variables appearing together in small
+    functions end up close together. Each current state bit is followed by its next
+    state bit, as the transition relation relates them
+
+    Args:
+        roots (List[ExprNode]): Expression tree of each state function
+        state_vars (Dict[str, int]): State bit index of each variable which is a state
+            bit (by variable name)
+        state_bits (int): Number of state bits
+
+    Returns:
+        List[Tuple[int, object]]: The order, as (0, state bit index) for current state
+            bits, (1, state bit index) for next state bits and (2, variable name) for
+            inputs
+    """
+
+    order = []
+    placed_bits = set()
+    placed_inputs = set()
+
+    def place_bit(state_bit: int):
+        if state_bit not in placed_bits:
+            placed_bits.add(state_bit)
+            order.extend(((0, state_bit), (1, state_bit)))
+
+    supports = [get_node_variables(root) for root in roots]
+    for state_bit in sorted(range(len(roots)), key=lambda ind: len(set(supports[ind]))):
+        for name in supports[state_bit]:
+            if name in state_vars:
+                place_bit(state_vars[name])
+            elif name not in placed_inputs:
+                placed_inputs.add(name)
+                order.append((2, name))
+        place_bit(state_bit)
+    for state_bit in range(state_bits):
+        place_bit(state_bit)
+    return order
+
+
+class SymbolicFsm():
+    """
+    Symbolic form of an FSM: its state functions as BDDs (see Bdd.BddManager) over
+    current state bits and inputs, and its transition relation over current state bits,
+    inputs and next state bits. Sets of states and input predicates are BDDs as well,
+    so the reachable states, the exact input label of each edge and the number of
+    states are computed without enumerating input vectors
+    """
+
+    def __init__(self, argspool, functions_list: list, ff_names: List[str]) -> None:
+        """
+        Args:
+            argspool (ArgsPool): Arguments of the state functions
+            functions_list (List[hal_py.BooleanFunction]): The state functions
+            ff_names (List[str]): Name of the FF of each state function (state bit)
+        """
+
+        self.state_bits = len(functions_list)
+        roots = [parse_function(function) for function in functions_list]
+
+        # Dict[str, Tuple[int, bool]]: State bit index of each argument determined by the
+        # state, and True if the argument is the opposite of the state bit ('QN' pin)
+        state_args = {}
+
+        # List[str]: Arguments which are not determined by the state (the inputs), in the
+        # order of the transition labels (as ReachabilityExplorer.free_indexes)
+        self.input_args = []
+
+        input_names = {}  # Dict[str, str]: Name of the BDD variable of each input
+        ff_index = {name: ind for ind, name in enumerate(ff_names)}
+        for arg_ind, arg_name in enumerate(argspool.net_ids_str):
+            gate_name = argspool.gate_names[arg_ind]
+            pin_name = argspool.pin_names[arg_ind]
+            if gate_name in ff_index and pin_name in ('Q', 'QN'):
+                state_args[arg_name] = (ff_index[gate_name], pin_name == 'QN')
+            else:
+                self.input_args.append(arg_name)
+                input_names[arg_name] = pin_name if gate_name == 'Global' else "{}.{}".format(gate_name, pin_name)
+
+        self.manager = BddManager()
+        state_vars = {arg_name: state_bit for arg_name, (state_bit, _) in state_args.items()}
+        for kind, item in get_variable_order(roots, state_vars, self.state_bits):
+            if kind == 0:
+                self.manager.add_var(ff_names[item])
+            elif kind == 1:
+                self.manager.add_var(ff_names[item] + NEXT_SUFFIX)
+            else:
+                self.manager.add_var(input_names[item])
+
+        # List[int]: Levels of the current state bits, next state bits and inputs
+        self.state_levels = [self.manager.var_levels[name] for name in ff_names]
+        self.next_levels = [self.manager.var_levels[name + NEXT_SUFFIX] for name in ff_names]
+        self.input_levels = [self.manager.var_levels[input_names[arg_name]] for arg_name in self.input_args]
+
+        leaves = {}
+        for arg_name, (state_bit, is_opposite) in state_args.items():
+            leaves[arg_name] = self.manager.var(ff_names[state_bit])
+            if is_opposite:
+                leaves[arg_name] = self.manager.neg(leaves[arg_name])
+        for arg_name in self.input_args:
+            leaves[arg_name] = self.manager.var(input_names[arg_name])
+
+        # List[int]: BDD of each state function
+        self.next_functions = [self.manager.from_expr(root, leaves) for root in roots]
+
+        self.ff_names = ff_names
+        self.relation = None  # int: The transition relation (see get_transition_relation)
+
+    def get_transition_relation(self) -> int:
+        """
+        Get the BDD of the transition relation: each next state bit equals its state function
+        """
+
+        if self.relation is None:
+            relation = TRUE
+            for name, function in zip(self.ff_names, self.next_functions):
+                next_var = self.manager.var(name + NEXT_SUFFIX)
+                relation = self.manager.conj(relation, self.manager.equiv(next_var, function))
+            self.relation = relation
+        return self.relation
+
+    def get_state_bdd(self, state: str) -> int:
+        """
+        Get the BDD of a single state (for example 0010, a character per state bit)
+        """
+
+        return self.manager.cube({name: value == '1' for name, value in zip(self.ff_names, state)})
+
+    def get_image(self, states: int) -> int:
+        """
+        Get the states reachable in one transition from a set of states
+
+        Args:
+            states (int): BDD of the states (over the current state bits)
+
+        Returns:
+            int: BDD of the next states (over the current state bits)
+        """
+
+        quantified = set(self.state_levels) | set(self.input_levels)
+        next_states = self.manager.and_exists(states, self.get_transition_relation(), quantified)
+        return self.manager.rename(next_states, dict(zip(self.next_levels, self.state_levels)))
+
+    def get_reachable_states(self, initial_state: str) -> int:
+        """
+        Get the states reachable from the initial state (breadth-first image
+        computation of the frontier until no new state is found)
+
+        Args:
+            initial_state (str): The initial (reset) state
+
+        Returns:
+            int: BDD of the reachable states, including the initial state
+        """
+
+        reached = frontier = self.get_state_bdd(initial_state)
+        while frontier != FALSE:
+            image = self.get_image(frontier)
+            frontier = self.manager.conj(image, self.manager.neg(reached))
+            reached = self.manager.disj(reached, frontier)
+        return reached
+
+    def get_states_count(self, states: int) -> int:
+        return self.manager.sat_count(states, self.state_levels)
+
+    def iter_states(self, states: int) -> Iterator[str]:
+        """
+        Iterate over the states of a set of states
+
+        Args:
+            states (int): BDD of the states
+
+        Yields:
+            str: A state (a character per state bit)
+        """
+
+        for cube in self.manager.iter_cubes(states, self.state_levels):
+            free_bits = [pos for pos, char in enumerate(cube) if char == '-']
+            for value in range(1 << len(free_bits)):
+                state = list(cube)
+                for bit, pos in enumerate(free_bits):
+                    state[pos] = '1' if value >> bit & 1 else '0'
+                yield ''.join(state)
+
+    def get_successors(self, state: str) -> List[Tuple[str, int]]:
+        """
+        Get the edges going out of a state. The input space is split by the value of
+        each state function in turn, so only the next states that actually occur are visited
+
+        Args:
+            state (str): The state
+
+        Returns:
+            List[Tuple[str, int]]: Next state and BDD of the input predicate (over the
+                inputs) of each edge, sorted by next state
+        """
+
+        values = {level: char == '1' for level, char in zip(self.state_levels, state)}
+        functions = [self.manager.restrict(function, values) for function in self.next_functions]
+
+        successors = []
+        stack = [("", TRUE)]
+        while stack:
+            next_prefix, predicate = stack.pop()
+            if len(next_prefix) == self.state_bits:
+                successors.append((next_prefix, predicate))
+                continue
+            function = functions[len(next_prefix)]
+            for char, value in (('0', self.manager.neg(function)), ('1', function)):
+                sub_predicate = self.manager.conj(predicate, value)
+                if sub_predicate != FALSE:
+                    stack.append((next_prefix + char, sub_predicate))
+        successors.sort()
+        return successors
+
+    def get_cubes(self, predicate: int) -> List[str]:
+        """
+        Get disjoint input cubes covering an input predicate, in the format of the
+        transition labels ('-' for don't care bits, see CubeCover)
+        """
+
+        return sorted(self.manager.iter_cubes(predicate, self.input_levels))
+
+    def iter_edges(self, states: int) -> Iterator[Tuple[Tuple[str, str], List[str]]]:
+        """
+        Iterate over the edges going out of a set of states (for example the reachable
+        states, see get_reachable_states), each labeled by the exact cover of its inputs
+
+        Args:
+            states (int): BDD of the states
+
+        Yields:
+            Tuple[Tuple[str, str], List[str]]: Current and next state, and input cubes
+                of an edge (as the items of CubeCover.compress_edges)
+        """
+
+        for cur_state in self.iter_states(states):
+            for next_state, predicate in self.get_successors(cur_state):
+                yield (cur_state, next_state), self.get_cubes(predicate)
+
+    def to_dot(self, path: str):
+        """
+        Write the BDDs of the state functions as a Graphviz graph
+
+        Args:
+            path (str): Path of the .dot file
+        """
+
+        with open(path, 'w') as file:
+            file.write(self.manager.to_dot(dict(zip(self.ff_names, self.next_functions))))
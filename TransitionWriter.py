@@ -0,0 +1,231 @@
+from typing import Dict, Iterable, List, Tuple
+from abc import ABC, abstractmethod
+from itertools import islice
+import os
+import shutil
+import tempfile
+try:
+    import numpy
+except ImportError:
+    # Only the NumPy output formats need it
+    numpy = None
+from CubeCover import expand_cube
+
+
+DOT_FORMAT = 'dot'
+KISS2_FORMAT = 'kiss2'
+NPY_FORMAT = 'npy'
+NPZ_FORMAT = 'npz'
+
+# int: Size of the buffer of the output files
+WRITE_BUFFER_SIZE = 1 << 20
+
+# int: Number of transitions formatted and written together
+CHUNK_TRANSITIONS = 1 << 12
+
+# int: Next state of (state, input) pairs without a transition in the NumPy formats
+NO_TRANSITION = -1
+
+
+def iter_chunks(items: Iterable, size: int = CHUNK_TRANSITIONS) -> Iterable[list]:
+    iterator = iter(items)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+class TransitionWriter(ABC):
+    """
+    Output stage of the FSM analysis. Transitions are streamed in chunks, so each
+    chunk is formatted and written at once. Subclasses implement a file format
+    """
+
+    # str: Extension of the output file
+    extension = None
+
+    def __init__(self, path: str, initial_state: str) -> None:
+        """
+        Args:
+            path (str): Path of the output file
+            initial_state (str): The initial (reset) state (for example 0000)
+        """
+
+        self.path = path
+        self.initial_state = initial_state
+
+    @abstractmethod
+    def write_transitions(self, transitions: Iterable[Tuple[str, str, str]]):
+        """
+        Args:
+            transitions (Iterable[Tuple[str, str, str]]): Current state, next state and
+                input strings of each transition. Inputs may be cubes ('-' for don't care)
+        """
+
+    def write_edges(self, edges: Dict[Tuple[str, str], List[str]]):
+        """
+        Args:
+            edges (Dict[Tuple[str, str], List[str]]): Input cubes of each (current, next)
+                state pair (see CubeCover.compress_edges)
+        """
+
+        self.write_transitions((cur_state, next_state, cube)
+                               for (cur_state, next_state), cubes in edges.items() for cube in cubes)
+
+    def close(self):
+        pass
+
+    def __enter__(self) -> 'TransitionWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class DotWriter(TransitionWriter):
+    """
+    Graphviz graph, a node per state and an edge labeled by the input per transition
+    """
+
+    extension = '.dot'
+
+    def __init__(self, path: str, initial_state: str) -> None:
+        super().__init__(path, initial_state)
+        self.file = open(path, 'w', buffering=WRITE_BUFFER_SIZE)
+        self.file.write("strict digraph G {\n\t" + initial_state + "\n")
+
+    def write_transitions(self, transitions: Iterable[Tuple[str, str, str]]):
+        for chunk in iter_chunks(transitions):
+            self.file.write(''.join('\t{} -> {} [label="{}"]\n'.format(*transition) for transition in chunk))
+
+    def write_edges(self, edges: Dict[Tuple[str, str], List[str]]):
+        # A single edge per state pair, labeled by its cubes (one per line)
+        self.write_transitions((cur_state, next_state, "\\n".join(cubes))
+                               for (cur_state, next_state), cubes in edges.items())
+
+    def close(self):
+        self.file.write("}")
+        self.file.close()
+
+
+class Kiss2Writer(TransitionWriter):
+    """
+    KISS2 state table ('input current next' lines, without outputs), as read by
+    SIS and ABC. The header counts the transitions and states, so the lines are
+    streamed to a temporary file, and copied after the header on close
+    """
+
+    extension = '.kiss2'
+
+    def __init__(self, path: str, initial_state: str) -> None:
+        super().__init__(path, initial_state)
+        self.input_bits = 0
+        self.states = {initial_state}
+        self.transitions_num = 0
+
+        # TextIO: The transition lines, in the directory of the output file
+        self.body = tempfile.TemporaryFile('w+', buffering=WRITE_BUFFER_SIZE,
+                                           dir=os.path.dirname(os.path.abspath(path)))
+
+    def write_transitions(self, transitions: Iterable[Tuple[str, str, str]]):
+        for chunk in iter_chunks(transitions):
+            self.input_bits = len(chunk[0][2])
+            self.transitions_num += len(chunk)
+            for cur_state, next_state, _ in chunk:
+                self.states.add(cur_state)
+                self.states.add(next_state)
+            self.body.write(''.join('{2} {0} {1}\n'.format(*transition) for transition in chunk))
+
+    def close(self):
+        header = ".i {}\n.o 0\n.p {}\n.s {}\n.r {}\n".format(
+            self.input_bits, self.transitions_num, len(self.states), self.initial_state)
+        with self.body, open(self.path, 'w', buffering=WRITE_BUFFER_SIZE) as file:
+            file.write(header)
+            self.body.seek(0)
+            shutil.copyfileobj(self.body, file, WRITE_BUFFER_SIZE)
+            file.write(".e\n")
+
+
+class NumpyWriter(TransitionWriter):
+    """
+    Transition matrix: the next state (as an integer) at [state, input], or
+    NO_TRANSITION for pairs that were not explored. States and inputs are indexed by
+    their strings read as binary numbers (first character is the most significant bit).
+    The .npy file can be memory-mapped (numpy.load(path, mmap_mode='r')). The .npz file
+    is compressed and also holds the initial state and the widths
+    """
+
+    extension = '.npy'
+
+    def __init__(self, path: str, initial_state: str) -> None:
+        if numpy is None:
+            raise ImportError("The {} output format needs numpy".format(self.extension[1:]))
+        super().__init__(path, initial_state)
+        self.state_bits = len(initial_state)
+        self.input_bits = None
+        self.matrix = None
+
+    def write_transitions(self, transitions: Iterable[Tuple[str, str, str]]):
+        for chunk in iter_chunks(transitions):
+            if self.matrix is None:
+                self.input_bits = len(chunk[0][2])
+                dtype = numpy.min_scalar_type(-(1 << self.state_bits))
+                self.matrix = numpy.full((1 << self.state_bits, 1 << self.input_bits), NO_TRANSITION, dtype)
+            cur_indexes = []
+            input_indexes = []
+            next_indexes = []
+            for cur_state, next_state, cur_input in chunk:
+                # A cube stands for all its input vectors
+                inputs = expand_cube(cur_input) if '-' in cur_input else (cur_input,)
+                for minterm in inputs:
+                    cur_indexes.append(int(cur_state or '0', 2))
+                    input_indexes.append(int(minterm or '0', 2))
+                    next_indexes.append(int(next_state or '0', 2))
+            self.matrix[cur_indexes, input_indexes] = next_indexes
+
+    def get_matrix(self):
+        if self.matrix is None:
+            return numpy.full((1 << self.state_bits, 1), NO_TRANSITION,
+                              numpy.min_scalar_type(-(1 << self.state_bits)))
+        return self.matrix
+
+    def close(self):
+        with open(self.path, 'wb') as file:
+            numpy.save(file, self.get_matrix())
+
+
+class NpzWriter(NumpyWriter):
+    extension = '.npz'
+
+    def close(self):
+        with open(self.path, 'wb') as file:
+            numpy.savez_compressed(file, next_state=self.get_matrix(), initial_state=self.initial_state,
+                                   state_bits=self.state_bits, input_bits=self.input_bits or 0)
+
+
+# Dict[str, type]: Writer class of each output format
+WRITERS = {
+    DOT_FORMAT: DotWriter,
+    KISS2_FORMAT: Kiss2Writer,
+    NPY_FORMAT: NumpyWriter,
+    NPZ_FORMAT: NpzWriter,
+}
+
+
+def open_writer(result_filename: str, output_format: str, initial_state: str) -> TransitionWriter:
+    """
+    Create the writer of an output format
+
+    Args:
+        result_filename (str): Path of the output file, without extension
+        output_format (str): One of WRITERS (for example DOT_FORMAT)
+        initial_state (str): The initial (reset) state
+
+    Returns:
+        TransitionWriter: The writer, to be closed after the transitions are written
+    """
+
+    if output_format not in WRITERS:
+        raise ValueError("Unknown output format '{}'".format(output_format))
+    writer_class = WRITERS[output_format]
+    return writer_class(result_filename + writer_class.extension, initial_state)
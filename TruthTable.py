@@ -0,0 +1,534 @@
+from typing import Dict, Iterator, List, Tuple
+import multiprocessing
+from BoolExpr import ExprNode, VAR, CONST, NOT, AND, OR, XOR, parse_function, topological_nodes
+from Aig import get_shared_exprs
+
+
+# int: Number of argument vectors evaluated together (log2). Each truth table block
+# is a 2^BLOCK_BITS bit integer
+BLOCK_BITS = 16
+
+# int: Minimal log2 of the block size when blocks are evaluated by several processes
+MIN_SHARD_BITS = 10
+
+# int: Minimal number of blocks per process when blocks are evaluated by several processes
+SHARDS_PER_WORKER = 4
+
+# int: Maximal number of blocks cached per state function by SupportEvaluator (log2)
+MAX_CACHED_COLUMNS_BITS = 12
+
+PY_OPS = {AND: ' & ', OR: ' | ', XOR: ' ^ '}
+
+
+class CompiledFunction():
+    """
+    Bit-parallel evaluator of a boolean function.
+    The function is compiled to straight line python code operating on packed
+    integers, where bit p of each operand is the value of the operand in the
+    p-th argument vector. A single call evaluates the function over a whole
+    block of argument vectors
+    """
+
+    def __init__(self, expr: ExprNode, var_order: List[str]) -> None:
+        """
+        Args:
+            expr (ExprNode): Expression tree of the function
+            var_order (List[str]): Names of all the arguments. The index of a name
+                is the index of its mask when calling the compiled function
+        """
+
+        lines, names = get_kernel_lines([expr], var_order)
+        lines.append("    return " + names[id(expr)])
+
+        # str: Source code of the kernel. Kept so the object can be pickled
+        self.source = "\n".join(lines)
+        self.kernel = None
+        self.build()
+
+    def build(self):
+        namespace = {}
+        exec(compile(self.source, "<compiled boolean function>", "exec"), namespace)
+        self.kernel = namespace["kernel"]
+
+    def __getstate__(self):
+        return {"source": self.source}
+
+    def __setstate__(self, state):
+        self.source = state["source"]
+        self.build()
+
+    def __call__(self, var_masks: List[int], full_mask: int) -> int:
+        """
+        Evaluate the function over a block of argument vectors
+
+        Args:
+            var_masks (List[int]): Packed values of each argument (see get_var_masks)
+            full_mask (int): Integer with all the bits of the block set
+
+        Returns:
+            int: Packed values of the function
+        """
+
+        return self.kernel(var_masks, full_mask)
+
+
+class CompiledFunctions(CompiledFunction):
+    """
+    Bit-parallel evaluator of several boolean functions, compiled to a single kernel.
+    Nodes shared by the expressions (the same ExprNode, see Aig.get_shared_exprs) are
+    computed once per call for all the functions
+    """
+
+    def __init__(self, exprs: List[ExprNode], var_order: List[str]) -> None:
+        """
+        Args:
+            exprs (List[ExprNode]): Expression of each function
+            var_order (List[str]): Names of all the arguments (see CompiledFunction)
+        """
+
+        lines, names = get_kernel_lines(exprs, var_order)
+        lines.append("    return [{}]".format(", ".join(names[id(expr)] for expr in exprs)))
+        self.source = "\n".join(lines)
+        self.kernel = None
+        self.build()
+
+    def __call__(self, var_masks: List[int], full_mask: int) -> List[int]:
+        """
+        Evaluate the functions over a block of argument vectors
+
+        Returns:
+            List[int]: Packed values of each function
+        """
+
+        return self.kernel(var_masks, full_mask)
+
+
+def get_kernel_lines(exprs: List[ExprNode], var_order: List[str]) -> Tuple[List[str], Dict[int, str]]:
+    """
+    Generate the body of a kernel evaluating expressions (see CompiledFunction),
+    a line per distinct operation node
+
+    Args:
+        exprs (List[ExprNode]): The expressions
+        var_order (List[str]): Names of all the arguments
+
+    Returns:
+        Tuple[List[str], Dict[int, str]]:
+            List[str]: The source lines, without the return statement
+            Dict[int, str]: Python operand of each node (by node id)
+    """
+
+    var_index = {name: ind for ind, name in enumerate(var_order)}
+    lines = ["def kernel(v, m):"]
+    names = {}
+    for expr in exprs:
+        for node in topological_nodes(expr):
+            if id(node) in names:
+                continue
+            if node.op == VAR:
+                names[id(node)] = "v[{}]".format(var_index[node.name])
+                continue
+            if node.op == CONST:
+                names[id(node)] = "m" if node.name == '1' else "0"
+                continue
+            if node.op == NOT:
+                value = "m ^ " + names[id(node.args[0])]
+            else:
+                value = PY_OPS[node.op].join(names[id(arg)] for arg in node.args)
+            tmp_name = "t{}".format(len(lines))
+            lines.append("    {} = {}".format(tmp_name, value))
+            names[id(node)] = tmp_name
+    return lines, names
+
+
+def get_pattern_mask(bit: int, block_bits: int) -> int:
+    """
+    Get the packed values of argument vector bit number 'bit' over all the
+    2^block_bits vectors of a block starting at 0.
+    For example, for bit 0 the mask is ...10101010 and for bit 1 it is ...11001100
+
+    Args:
+        bit (int): Index of the argument vector bit (bit < block_bits)
+        block_bits (int): Log2 of the block size
+
+    Returns:
+        int: The mask
+    """
+
+    period = 1 << (bit + 1)
+    mask = ((1 << (1 << bit)) - 1) << (1 << bit)
+    while period < (1 << block_bits):
+        mask |= mask << period
+        period <<= 1
+    return mask
+
+
+def get_var_masks(vars_num: int, start: int, block_bits: int) -> List[int]:
+    """
+    Get the packed values of all the arguments over the argument vectors
+    start, start + 1, ..., start + 2^block_bits - 1
+
+    Args:
+        vars_num (int): Number of arguments
+        start (int): First argument vector of the block (a multiple of 2^block_bits)
+        block_bits (int): Log2 of the block size
+
+    Returns:
+        List[int]: Packed values of each argument
+    """
+
+    full_mask = (1 << (1 << block_bits)) - 1
+    masks = []
+    for bit in range(vars_num):
+        if bit < block_bits:
+            masks.append(get_pattern_mask(bit, block_bits))
+        elif (start >> bit) & 1:
+            masks.append(full_mask)
+        else:
+            masks.append(0)
+    return masks
+
+
+def mask2str(mask: int, size: int) -> str:
+    """
+    Convert a packed block to a string where character p is the value in vector p
+    """
+
+    return format(mask, "0{}b".format(size))[::-1]
+
+
+def masks2rows(masks: List[int], size: int) -> List[str]:
+    """
+    Convert packed blocks to a string per vector, where character b of string p is the
+    value of block b in vector p
+    """
+
+    if not masks:
+        return [''] * size
+    return list(map(''.join, zip(*(mask2str(mask, size) for mask in masks))))
+
+
+def format_block_transitions(columns: Tuple[List[int], List[int], List[int], int],
+                             block_bits: int) -> List[Tuple[str, str, str]]:
+    """
+    Convert the packed columns of a block (see BatchEvaluator.get_block_columns) to
+    transition strings
+
+    Returns:
+        List[Tuple[str, str, str]]: Current state, next state and input strings of the
+            transitions of the vectors of the block that are in the enumerated range
+    """
+
+    state_masks, next_masks, input_masks, valid = columns
+    size = 1 << block_bits
+    transitions = list(zip(masks2rows(state_masks, size), masks2rows(next_masks, size),
+                           masks2rows(input_masks, size)))
+    if valid != (1 << size) - 1:
+        transitions = [transition for pos, transition in enumerate(transitions) if valid >> pos & 1]
+    return transitions
+
+
+class BatchEvaluator():
+    """
+    Evaluates the state functions of an FSM over all the argument vectors of
+    an ArgsPool, a block of vectors at a time, instead of calling
+    hal_py.BooleanFunction.evaluate() once per state bit per vector
+    """
+
+    def __init__(self, argspool, functions_list: list, block_bits: int = BLOCK_BITS) -> None:
+        """
+        Args:
+            argspool (ArgsPool): Arguments of the functions (determines the order of the
+                argument vectors and which of them are valid)
+            functions_list (List[hal_py.BooleanFunction]): The state functions
+            block_bits (int): Log2 of the number of argument vectors evaluated together
+        """
+
+        self.vars_num = len(argspool.net_ids_str)
+
+        # List[int]: Indexes of the arguments that are enumerated (see ArgsPool.free_indexes)
+        self.free_indexes = argspool.free_indexes
+
+        # Dict[int, int]: Arguments which are the opposites of other arguments
+        # (see ArgsPool.opposite_of)
+        self.opposite_of = argspool.opposite_of
+
+        self.block_bits = min(block_bits, len(self.free_indexes))
+
+        # List[ExprNode]: The state functions, normalized through a shared AIG so the logic
+        # they share is evaluated once
+        self.exprs = get_shared_exprs([parse_function(function) for function in functions_list])
+        self.compile(functions_list, argspool.net_ids_str)
+
+        net_index = {name: ind for ind, name in enumerate(argspool.net_ids_str)}
+        self.state_indexes = [net_index[str(net.get_id())] for net in argspool.state_nets]
+        self.state_opposite = argspool.state_opposite  # List[bool]: See ArgsPool.state_opposite
+        self.input_indexes = [net_index[str(net.get_id())] for net in argspool.input_nets]
+
+        # int: Valid argument vectors start..end-1 are enumerated (same range as ArgsPool,
+        # indexes are among the valid vectors only)
+        self.start = argspool.valid_ind
+        self.end = argspool.get_valid_args_num()
+
+    def compile(self, functions_list: list, var_order: List[str]):
+        """
+        Compile the state functions (self.exprs) to the bit-parallel form evaluated on
+        each block
+        """
+
+        # CompiledFunctions: Bit-parallel form of all the state functions
+        self.compiled = CompiledFunctions(self.exprs, var_order)
+
+    def evaluate_block(self, start: int, block_bits: int = None) -> Tuple[List[int], List[int], int]:
+        """
+        Evaluate all the state functions over a single block of valid argument vectors
+
+        Args:
+            start (int): Index of the first valid argument vector of the block
+            block_bits (int): Log2 of the block size. Default is self.block_bits
+
+        Returns:
+            Tuple[List[int], List[int], int]:
+                List[int]: Packed values of each argument
+                List[int]: Packed values of each state function
+                int: Packed flags of the vectors of the block that are in the
+                    enumerated range
+        """
+
+        if block_bits is None:
+            block_bits = self.block_bits
+        full_mask = (1 << (1 << block_bits)) - 1
+        var_masks, valid = self.get_block_args(start, block_bits)
+        return var_masks, self.get_block_tables(var_masks, full_mask, start, block_bits), valid
+
+    def get_block_args(self, start: int, block_bits: int) -> Tuple[List[int], int]:
+        """
+        Get the packed values of the arguments of a block (see evaluate_block)
+
+        Returns:
+            Tuple[List[int], int]: Packed values of each argument and packed flags of
+                the vectors of the block that are in the enumerated range
+        """
+
+        size = 1 << block_bits
+        full_mask = (1 << size) - 1
+        free_masks = get_var_masks(len(self.free_indexes), start, block_bits)
+        var_masks = [0] * self.vars_num
+        for bit, var_ind in enumerate(self.free_indexes):
+            var_masks[var_ind] = free_masks[bit]
+        for var_ind, opposite_ind in self.opposite_of.items():
+            var_masks[var_ind] = full_mask ^ var_masks[opposite_ind]
+        valid = full_mask
+        if start < self.start:
+            valid &= full_mask ^ ((1 << (self.start - start)) - 1)
+        if start + size > self.end:
+            valid &= (1 << max(self.end - start, 0)) - 1
+        return var_masks, valid
+
+    def get_block_tables(self, var_masks: List[int], full_mask: int, start: int,
+                         block_bits: int) -> List[int]:
+        """
+        Get the packed values of each state function over a block (see evaluate_block)
+        """
+
+        return self.compiled(var_masks, full_mask)
+
+    def get_block_columns(self, start: int, block_bits: int = None) -> Tuple[List[int], List[int], List[int], int]:
+        """
+        Get the transitions of the FSM of a single block, packed. The packed form is a
+        few integers per block, so it is cheap to pass between processes, and it is
+        formatted to strings only by the consumer (see format_block_transitions)
+
+        Args:
+            start (int): Index of the first valid argument vector of the block
+            block_bits (int): Log2 of the block size. Default is self.block_bits
+
+        Returns:
+            Tuple[List[int], List[int], List[int], int]: Packed values of each current
+                state bit, each next state bit and each input, and packed flags of the
+                vectors of the block that are in the enumerated range
+        """
+
+        if block_bits is None:
+            block_bits = self.block_bits
+        var_masks, tables, valid = self.evaluate_block(start, block_bits)
+        full_mask = (1 << (1 << block_bits)) - 1
+        state_masks = [var_masks[ind] ^ full_mask if is_opposite else var_masks[ind]
+                       for ind, is_opposite in zip(self.state_indexes, self.state_opposite)]
+        input_masks = [var_masks[ind] for ind in self.input_indexes]
+        return state_masks, tables, input_masks, valid
+
+    def get_block_transitions(self, start: int, block_bits: int = None) -> List[Tuple[str, str, str]]:
+        """
+        Get the transitions of the FSM of a single block
+
+        Args:
+            start (int): Index of the first valid argument vector of the block
+            block_bits (int): Log2 of the block size. Default is self.block_bits
+
+        Returns:
+            List[Tuple[str, str, str]]: Current state, next state and input strings
+                of each transition
+        """
+
+        if block_bits is None:
+            block_bits = self.block_bits
+        return format_block_transitions(self.get_block_columns(start, block_bits), block_bits)
+
+    def iter_transitions(self, workers: int = 1) -> Iterator[Tuple[str, str, str]]:
+        """
+        Iterate over the transitions of the FSM in the order ArgsPool enumerates them
+
+        Args:
+            workers (int): Number of processes evaluating blocks in parallel. The
+                transitions are yielded in the same order for any number of workers
+
+        Yields:
+            Tuple[str, str, str]: Current state, next state and input strings
+        """
+
+        for transitions in self.iter_blocks(workers):
+            yield from transitions
+
+    def iter_blocks(self, workers: int = 1) -> Iterator[List[Tuple[str, str, str]]]:
+        """
+        Iterate over the transitions of the FSM a block at a time (see iter_transitions).
+        Blocks are evaluated lazily, so a single block is held in memory when workers is 1.
+        Worker processes return the packed columns of their blocks (see
+        get_block_columns), which are formatted as the consumer reaches them
+
+        Yields:
+            List[Tuple[str, str, str]]: Current state, next state and input strings of
+                the transitions of a block
+        """
+
+        block_bits = self.block_bits
+        if workers > 1:
+            # Use smaller blocks, so each worker gets several shards
+            block_bits = min(block_bits, max(
+                MIN_SHARD_BITS, (self.end - 1).bit_length() - (SHARDS_PER_WORKER * workers).bit_length()))
+        size = 1 << block_bits
+        block_starts = range(self.start - self.start % size, self.end, size)
+        if workers > 1 and len(block_starts) > 1:
+            with multiprocessing.Pool(workers, initializer=init_worker, initargs=(self,)) as pool:
+                for columns in pool.imap(get_worker_block_columns, [(start, block_bits) for start in block_starts]):
+                    if columns[-1]:
+                        yield format_block_transitions(columns, block_bits)
+        else:
+            for start in block_starts:
+                transitions = self.get_block_transitions(start, block_bits)
+                if transitions:
+                    yield transitions
+
+
+class SupportEvaluator(BatchEvaluator):
+    """
+    BatchEvaluator which evaluates each state function only over its own support,
+    instead of over every block of the union of all the supports.
+    The packed values of a function in a block depend only on its support arguments:
+    the ones enumerated inside the block (low bits of the vector index) and the ones
+    fixed by the block (high bits). So the values are computed once for each value of
+    the high support arguments, by the function compiled over its support, and
+    looked up in every other block. Each function is evaluated at most
+    2^|support| / block size times, which suits FSMs whose state functions each
+    depend on a few of the arguments. The cache is bounded (see set_columns_bits)
+    """
+
+    def __init__(self, argspool, functions_list: list, block_bits: int = BLOCK_BITS) -> None:
+        super().__init__(argspool, functions_list, block_bits)
+
+        # List[Dict[int, int]]: Packed values of each function in a block, by the values
+        # of the vector index bits of its support fixed by the block. None for the
+        # functions whose values are not cached (see set_columns_bits)
+        self.columns = []
+        self.columns_bits = None  # int: block_bits of the cached columns
+
+    def compile(self, functions_list: list, var_order: List[str]):
+        """
+        Compile each state function over its own support, instead of all of them over
+        all the arguments
+        """
+
+        net_index = {name: ind for ind, name in enumerate(var_order)}
+        free_bit = {var_ind: bit for bit, var_ind in enumerate(self.free_indexes)}
+
+        # List[CompiledFunction]: Each function compiled over its support arguments
+        self.support_compiled = []
+
+        # List[List[int]]: Argument index of each support argument of each function
+        self.support_indexes = []
+
+        # List[List[int]]: Free argument (vector index bit) of each support argument of
+        # each function. Dependent ('Q'/'QN' opposite) arguments use the bit of their
+        # opposite, which determines them
+        self.support_bits = []
+
+        for function, expr in zip(functions_list, self.exprs):
+            support = list(function.get_variables())
+            self.support_compiled.append(CompiledFunction(expr, support))
+            indexes = [net_index[name] for name in support]
+            self.support_indexes.append(indexes)
+            self.support_bits.append([free_bit[var_ind] if var_ind in free_bit else
+                                      free_bit[self.opposite_of[var_ind]] for var_ind in indexes])
+
+    def set_columns_bits(self, block_bits: int):
+        """
+        Reset the cache for blocks of 2^block_bits vectors. The values of a function are
+        cached only if they repeat: its support misses some of the vector index bits
+        fixed by the blocks (otherwise each value is used by a single block). The cache
+        is bounded: functions with more than 2^MAX_CACHED_COLUMNS_BITS values are
+        evaluated in every block
+        """
+
+        high_bits = len(self.free_indexes) - block_bits
+        self.columns = []
+        for bits in self.support_bits:
+            support_high_bits = len({bit for bit in bits if bit >= block_bits})
+            is_cached = support_high_bits < high_bits and support_high_bits <= MAX_CACHED_COLUMNS_BITS
+            self.columns.append({} if is_cached else None)
+        self.columns_bits = block_bits
+
+    def get_block_tables(self, var_masks: List[int], full_mask: int, start: int,
+                         block_bits: int) -> List[int]:
+        if self.columns_bits != block_bits:
+            self.set_columns_bits(block_bits)
+        tables = []
+        for function_ind, bits in enumerate(self.support_bits):
+            columns = self.columns[function_ind]
+            if columns is None:
+                tables.append(self.evaluate_support(function_ind, var_masks, full_mask))
+                continue
+            high_key = 0
+            for bit in bits:
+                if bit >= block_bits:
+                    high_key |= start & (1 << bit)
+            if high_key not in columns:
+                columns[high_key] = self.evaluate_support(function_ind, var_masks, full_mask)
+            tables.append(columns[high_key])
+        return tables
+
+    def evaluate_support(self, function_ind: int, var_masks: List[int], full_mask: int) -> int:
+        """
+        Evaluate a function over a block by its compiled support form
+        """
+
+        support_masks = [var_masks[var_ind] for var_ind in self.support_indexes[function_ind]]
+        return self.support_compiled[function_ind](support_masks, full_mask)
+
+
+# BatchEvaluator: The evaluator of the current worker process
+worker_evaluator = None
+
+
+def init_worker(evaluator: BatchEvaluator):
+    global worker_evaluator
+    worker_evaluator = evaluator
+
+
+def get_worker_block_columns(block: Tuple[int, int]) -> Tuple[List[int], List[int], List[int], int]:
+    """
+    Get the packed columns of a block, given its start and block_bits (see
+    BatchEvaluator.get_block_columns)
+    """
+
+    return worker_evaluator.get_block_columns(*block)
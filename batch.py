@@ -0,0 +1,173 @@
+"""
+Batch analysis of a family of netlists. Each netlist is analyzed (FSM.analyze_fsm)
+and, if its correct key is known, decrypted (SLOD.decrypt), by a pool of worker
+processes sharing a single parsed Liberty library. A JSON summary record is written
+per netlist (one per line), in the order of the netlists.
+
+The netlists are given as a directory of .v files, each with an optional
+<name>.key.json file holding its correct key, or as a JSON manifest:
+
+    [{"netlist": "variant1.v", "key": {"START_1": true}}, {"netlist": "variant2.v"}]
+
+(keys by SLOD key group 1 variable names, paths relative to the manifest)
+
+    python batch.py ./variants --output summary.jsonl --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from typing import Dict, List
+
+import FSM
+import SLOD
+from ArgsPool import ArgsPool
+from NativeNetlist import CellType, load_liberty
+from TransitionWriter import DOT_FORMAT
+
+
+LIB_PATH = "./NangateOpenCellLibrary_functional.lib"
+
+KEY_FILE_SUFFIX = ".key.json"
+
+
+def get_jobs(path: str) -> List[Dict[str, object]]:
+    """
+    Get the netlists of a directory or a manifest
+
+    Args:
+        path (str): Directory of .v files, or path to a JSON manifest
+
+    Returns:
+        List[Dict[str, object]]: The path ('netlist') and the correct key ('key', None
+            if unknown) of each netlist
+    """
+
+    if os.path.isdir(path):
+        jobs = []
+        for file_name in sorted(os.listdir(path)):
+            if not file_name.endswith(".v"):
+                continue
+            netlist_path = os.path.join(path, file_name)
+            key_path = netlist_path[:-len(".v")] + KEY_FILE_SUFFIX
+            key = None
+            if os.path.isfile(key_path):
+                with open(key_path) as key_file:
+                    key = json.load(key_file)
+            jobs.append({"netlist": netlist_path, "key": key})
+        return jobs
+
+    with open(path) as manifest_file:
+        manifest = json.load(manifest_file)
+    base_dir = os.path.dirname(path)
+    return [{"netlist": os.path.join(base_dir, entry["netlist"]), "key": entry.get("key")}
+            for entry in manifest]
+
+
+def init_worker(lib_cells: Dict[str, CellType], options: Dict[str, object]):
+    global worker_lib_cells, worker_options
+    worker_lib_cells = lib_cells
+    worker_options = options
+
+
+def analyze_netlist(job: Dict[str, object]) -> Dict[str, object]:
+    """
+    Analyze and decrypt a netlist (in a worker process, see init_worker)
+
+    Args:
+        job (Dict[str, object]): The netlist (see get_jobs)
+
+    Returns:
+        Dict[str, object]: Summary record of the netlist
+    """
+
+    options = worker_options
+    record = {"netlist": job["netlist"]}
+    try:
+        result_filename = None
+        if options["output_dir"] is not None:
+            result_filename = os.path.join(options["output_dir"],
+                                           os.path.splitext(os.path.basename(job["netlist"]))[0])
+        start_time = time.perf_counter()
+        netlist, functions, ff_names = FSM.analyze_fsm(
+            job["netlist"], options["lib_path"], result_filename=result_filename,
+            cache_dir=options["cache_dir"], native=options["native"], return_ff_names=True,
+            output_format=options["output_format"], lib_cells=worker_lib_cells)
+        record["state_bits"] = len(functions)
+        record["ffs"] = ff_names
+        # Each valid argument vector is a transition of the full table
+        record["transitions"] = ArgsPool(netlist, functions).get_valid_args_num()
+        record["analyze_time_s"] = time.perf_counter() - start_time
+
+        if job["key"] is not None:
+            start_time = time.perf_counter()
+            result = SLOD.decrypt(netlist, functions, job["key"], verbose=False,
+                                  solver_name=options["solver_name"])
+            record["decrypt_time_s"] = time.perf_counter() - start_time
+            record["key"] = result.key
+            record["sat_iterations"] = result.iterations
+    except Exception as error:
+        record["error"] = "{}: {}".format(type(error).__name__, error)
+    return record
+
+
+def run_batch(jobs: List[Dict[str, object]], output_path: str, lib_path: str = LIB_PATH,
+              workers: int = None, native: bool = True, cache_dir: str = None,
+              output_dir: str = None, output_format: str = DOT_FORMAT,
+              solver_name: str = SLOD.DEFAULT_SOLVER) -> List[Dict[str, object]]:
+    """
+    Analyze and decrypt netlists in parallel
+
+    Args:
+        jobs (List[Dict[str, object]]): The netlists (see get_jobs)
+        output_path (str): Path of the summary file (a JSON record per line)
+        lib_path (str): Path to the Liberty library of all the netlists
+        workers (int): Number of worker processes. Default is the number of CPUs
+        native (bool): If True, the netlists are loaded by the native loader and the
+            library is parsed once for all the workers. Otherwise by hal
+        cache_dir (str): Directory of the analysis cache (see AnalysisCache)
+        output_dir (str): If given, the transitions of each netlist are written there
+            (see FSM.analyze_fsm result_filename)
+        output_format (str): Format of the transitions files (see TransitionWriter)
+        solver_name (str): Name of the pysat backend of the decryption
+
+    Returns:
+        List[Dict[str, object]]: Summary record of each netlist
+    """
+
+    lib_cells = load_liberty(lib_path, cache_dir) if native else None
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    options = {"lib_path": lib_path, "native": native, "cache_dir": cache_dir,
+               "output_dir": output_dir, "output_format": output_format, "solver_name": solver_name}
+
+    records = []
+    with open(output_path, "w") as output_file, \
+            multiprocessing.Pool(workers, initializer=init_worker, initargs=(lib_cells, options)) as pool:
+        for record in pool.imap(analyze_netlist, jobs):
+            output_file.write(json.dumps(record) + "\n")
+            output_file.flush()
+            records.append(record)
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze and decrypt a family of netlists")
+    parser.add_argument("netlists", help="Directory of .v netlists or JSON manifest")
+    parser.add_argument("--output", default="batch_summary.jsonl", help="Path of the summary file")
+    parser.add_argument("--lib", default=LIB_PATH, help="Path of the Liberty library")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--hal", action="store_true", help="Load the netlists with hal")
+    parser.add_argument("--cache-dir", default=None, help="Directory of the analysis cache")
+    parser.add_argument("--output-dir", default=None, help="Directory of the transitions files")
+    parser.add_argument("--format", default=DOT_FORMAT, help="Format of the transitions files")
+    parser.add_argument("--solver", default=SLOD.DEFAULT_SOLVER, help="pysat backend of the decryption")
+    args = parser.parse_args()
+
+    summary = run_batch(get_jobs(args.netlists), args.output, args.lib, args.workers, not args.hal,
+                        args.cache_dir, args.output_dir, args.format, args.solver)
+    for record in summary:
+        print("{:<40} {:>5} {:>10} {}".format(record["netlist"], record.get("state_bits", "-"),
+                                            record.get("transitions", "-"),
+                                            record.get("error", record.get("key", ""))))
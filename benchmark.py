@@ -0,0 +1,371 @@
+"""
+Benchmark of the FSM extraction and SAT decryption pipeline.
+Each stage runs on the bundled netlists and on synthetic locked FSMs of growing
+state, input and key width. The synthetic FSMs are generated as gate level Verilog
+netlists, so their FSM extraction is benchmarked as well. Wall time, peak memory
+(of python allocations) and stage specific counters are written to a JSON file, so
+runs can be compared.
+
+    python benchmark.py --output bench_output.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import FSM
+import SLOD
+from ArgsPool import ArgsPool
+from TruthTable import BatchEvaluator, SupportEvaluator
+
+
+LIB_PATH = "./NangateOpenCellLibrary_functional.lib"
+
+# List[Tuple[str, Dict[str, bool]]]: Bundled netlists and their correct keys
+BUNDLED_NETLISTS = [
+    ("./project2_cipher_v1.v", {'START_1': True}),
+    ("./project2_cipher_v2_obfuscated.v", {'INPUT0_1': True, 'INPUT1_1': False, 'INPUT2_1': False,
+                                           'INPUT3_1': False, 'INPUT4_1': False, 'INPUT5_1': True,
+                                           'START_1': True}),
+]
+
+# List[Tuple[int, int, int]]: State, input and key widths of the synthetic FSMs
+SYNTHETIC_SIZES = [(3, 1, 1), (4, 2, 2), (5, 3, 3), (6, 4, 4), (8, 4, 4)]
+
+# int: The per-vector ArgsPool enumeration is skipped above this number of vectors. It
+# is the slow baseline, so it runs only on the bundled and the smaller synthetic FSMs
+LEGACY_MAX_VECTORS = 2 ** 12
+
+# int: Number in the name of the first cell of the synthetic netlists
+FIRST_CELL_NUM = 1000
+
+# Dict[str, Tuple[str, Tuple[str, str], str]]: Cell, input pins and output pin of each
+# two input operator of the synthetic netlists (Nangate cells)
+OPERATOR_CELLS = {
+    '&': ('AND2_X1', ('A1', 'A2'), 'ZN'),
+    '|': ('OR2_X1', ('A1', 'A2'), 'ZN'),
+    '^': ('XOR2_X1', ('A', 'B'), 'Z'),
+    '~^': ('XNOR2_X1', ('A', 'B'), 'ZN'),
+}
+
+
+class VerilogBuilder():
+    """
+    Gate level Verilog netlist of Nangate cells, in the style of the Yosys netlists
+    (wires and cells named _<number>_)
+    """
+
+    def __init__(self) -> None:
+        self.wires = []  # List[str]: Names of the internal wires
+        self.cells = []  # List[str]: Instantiation of each cell
+
+    def add_wire(self) -> str:
+        name = "_{:03d}_".format(len(self.wires))
+        self.wires.append(name)
+        return name
+
+    def add_cell(self, cell_type: str, pins: Dict[str, str]) -> str:
+        """
+        Instantiate a cell
+
+        Args:
+            cell_type (str): Name of the cell in the library
+            pins (Dict[str, str]): Net connected to each pin
+
+        Returns:
+            str: Name of the instance
+        """
+
+        name = "_{:03d}_".format(len(self.cells) + FIRST_CELL_NUM)
+        connections = ",\n".join("    .{}({})".format(pin, net) for pin, net in pins.items())
+        self.cells.append("  {} {} (\n{}\n  );\n".format(cell_type, name, connections))
+        return name
+
+    def add_operator(self, operator: str, operand1: str, operand2: str) -> str:
+        """
+        Add a two input gate (see OPERATOR_CELLS)
+
+        Returns:
+            str: The output net of the gate
+        """
+
+        cell_type, input_pins, output_pin = OPERATOR_CELLS[operator]
+        output = self.add_wire()
+        self.add_cell(cell_type, {input_pins[0]: operand1, input_pins[1]: operand2, output_pin: output})
+        return output
+
+    def add_inverter(self, operand: str) -> str:
+        output = self.add_wire()
+        self.add_cell('INV_X1', {'A': operand, 'ZN': output})
+        return output
+
+    def to_verilog(self, module_name: str, ports: List[Tuple[str, str, int]]) -> str:
+        """
+        Args:
+            module_name (str): Name of the module
+            ports (List[Tuple[str, str, int]]): Direction ('input' or 'output'), name and
+                width of each port (None for a single bit port)
+
+        Returns:
+            str: The netlist
+        """
+
+        lines = ["module {}({});\n".format(module_name, ", ".join(name for _, name, _ in ports))]
+        lines += ["  wire {};\n".format(wire) for wire in self.wires]
+        for direction, name, width in ports:
+            width_str = "" if width is None else "[{}:0] ".format(width - 1)
+            lines.append("  {} {}{};\n".format(direction, width_str, name))
+        lines += self.cells
+        lines.append("endmodule\n")
+        return "".join(lines)
+
+
+def add_random_logic(builder: VerilogBuilder, operands: List[str], depth: int,
+                     rand: random.Random) -> str:
+    """
+    Add random combinational logic over the given operand nets
+
+    Returns:
+        str: The output net of the logic
+    """
+
+    if depth == 0 or len(operands) == 1 or rand.random() < 0.2:
+        operand = rand.choice(operands)
+        return builder.add_inverter(operand) if rand.random() < 0.3 else operand
+    operator = rand.choice(['&', '|', '^'])
+    args = [add_random_logic(builder, operands, depth - 1, rand) for _ in range(rand.randint(2, 3))]
+    output = args[0]
+    for arg in args[1:]:
+        output = builder.add_operator(operator, output, arg)
+    return output
+
+
+def make_locked_netlist(state_bits: int, input_bits: int, key_bits: int, seed: int = 0) \
+        -> Tuple[str, Dict[str, bool]]:
+    """
+    Generate the Verilog netlist of a random FSM whose next state functions are locked
+    by key XOR gates. Each FF also depends on the previous one (in a ring), so all the
+    FFs form a single control path FSM candidate (see FsmCandidates)
+
+    Args:
+        state_bits (int): Number of FFs (each with 'Q' and 'QN' outputs)
+        input_bits (int): Number of global inputs (bits of the INPUT port)
+        key_bits (int): Number of key inputs (bits of the KEY port)
+        seed (int): Random seed
+
+    Returns:
+        Tuple[str, Dict[str, bool]]: The netlist and the correct key (by SLOD key group 1
+            variable names, including the values used for the global inputs)
+    """
+
+    rand = random.Random(seed)
+    builder = VerilogBuilder()
+    q_nets = ["STATE[{}]".format(ff_ind) for ff_ind in range(state_bits)]
+    qn_nets = [builder.add_wire() for _ in range(state_bits)]
+    input_nets = ["INPUT[{}]".format(input_ind) for input_ind in range(input_bits)]
+    correct_key = {"INPUT{}_1".format(input_ind): rand.random() < 0.5 for input_ind in range(input_bits)}
+    correct_key.update({"KEY{}_1".format(key_ind): rand.random() < 0.5 for key_ind in range(key_bits)})
+
+    for ff_ind in range(state_bits):
+        state_operands = [rand.choice((q_net, qn_net)) for q_net, qn_net in zip(q_nets, qn_nets)]
+        operands = rand.sample(state_operands, min(3, state_bits)) + \
+            rand.sample(input_nets, min(2, input_bits))
+        next_net = add_random_logic(builder, operands, 3, rand)
+        next_net = builder.add_operator('^', next_net, state_operands[ff_ind - 1])
+        if key_bits:
+            key_ind = ff_ind % key_bits
+            # With the correct key value the gate passes the logic unchanged
+            operator = '~^' if correct_key["KEY{}_1".format(key_ind)] else '^'
+            next_net = builder.add_operator(operator, next_net, "KEY[{}]".format(key_ind))
+        builder.add_cell('DFF_X1', {'CK': 'CLK', 'D': next_net, 'Q': q_nets[ff_ind], 'QN': qn_nets[ff_ind]})
+
+    ports = [('input', 'CLK', None), ('input', 'INPUT', input_bits), ('input', 'KEY', key_bits),
+             ('output', 'STATE', state_bits)]
+    return builder.to_verilog('LOCKED_FSM', [port for port in ports if port[2] != 0]), correct_key
+
+
+def measure(stage: str, func: Callable[[], Dict[str, object]]) -> Dict[str, object]:
+    """
+    Run a stage and measure its wall time and peak memory. The stage is run twice,
+    since tracing the memory allocations slows it down: once timed and once traced
+
+    Args:
+        stage (str): Name of the stage
+        func (Callable[[], Dict[str, object]]): The stage. Returns stage specific counters
+
+    Returns:
+        Dict[str, object]: Record of the stage
+    """
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start_time = time.perf_counter()
+        counters = func()
+        wall_time = time.perf_counter() - start_time
+
+        tracemalloc.start()
+        func()
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    record = {"stage": stage, "wall_time_s": wall_time, "peak_memory_bytes": peak_memory}
+    record.update(counters or {})
+    return record
+
+
+def run_stages(netlist, functions: list, ff_names: List[str], correct_key: Dict[str, bool],
+               with_sympy: bool = False) -> List[Dict[str, object]]:
+    """
+    Benchmark the stages that follow the FSM extraction
+
+    Args:
+        netlist (hal_py.Netlist): The netlist of the functions
+        functions (List[hal_py.BooleanFunction]): The state functions
+        ff_names (List[str]): Name of the FF of each state function
+        correct_key (Dict[str, bool]): Correct key (by SLOD key group 1 variable names)
+        with_sympy (bool): If True, decryption with the SymPy encoding is benchmarked too
+
+    Returns:
+        List[Dict[str, object]]: A record per stage
+    """
+
+    records = []
+
+    def function_strs():
+        for function in functions:
+            FSM.get_function_str(netlist, function)
+        return {"functions": len(functions)}
+    records.append(measure("get_function_str", function_strs))
+
+    vectors = ArgsPool(netlist, functions, ff_names=ff_names).get_valid_args_num()
+
+    def legacy_enumeration():
+        transitions = FSM.iter_argspool_transitions(ArgsPool(netlist, functions, ff_names=ff_names), functions)
+        return {"vectors": vectors, "transitions": sum(1 for _ in transitions)}
+    if vectors <= LEGACY_MAX_VECTORS:
+        records.append(measure("argspool_enumeration", legacy_enumeration))
+
+    def batched_enumeration():
+        evaluator = BatchEvaluator(ArgsPool(netlist, functions, ff_names=ff_names), functions)
+        return {"vectors": vectors, "transitions": sum(1 for _ in evaluator.iter_transitions())}
+    records.append(measure("batched_enumeration", batched_enumeration))
+
+    def decomposed_enumeration():
+        evaluator = SupportEvaluator(ArgsPool(netlist, functions, ff_names=ff_names), functions)
+        return {"vectors": vectors, "transitions": sum(1 for _ in evaluator.iter_transitions())}
+    records.append(measure("decomposed_enumeration", decomposed_enumeration))
+
+    encodings = [SLOD.TSEITIN_ENCODING] + ([SLOD.SYMPY_ENCODING] if with_sympy else [])
+    for encoding in encodings:
+        def decryption():
+            result = SLOD.decrypt(netlist, functions, correct_key, encoding=encoding, verbose=False)
+            return {"sat_iterations": result.iterations, "clauses": result.clauses_num,
+                    "variables": result.vars_num}
+        records.append(measure("decrypt_" + encoding, decryption))
+
+    return records
+
+
+def run_netlist(netlist_path: str, correct_key: Dict[str, bool],
+                with_sympy: bool = False) -> List[Dict[str, object]]:
+    """
+    Benchmark the FSM extraction of a netlist file and the stages that follow it
+
+    Args:
+        netlist_path (str): Path to the netlist .v file
+        correct_key (Dict[str, bool]): Correct key (by SLOD key group 1 variable names)
+        with_sympy (bool): If True, decryption with the SymPy encoding is benchmarked too
+
+    Returns:
+        List[Dict[str, object]]: A record per stage
+    """
+
+    analysis = {}
+
+    def analysis_stage(native: bool = False):
+        analysis["netlist"], analysis["functions"], analysis["ff_names"] = FSM.analyze_fsm(
+            netlist_path, LIB_PATH, native=native, return_ff_names=True)
+        return {"state_bits": len(analysis["functions"])}
+    # The later stages run on the hal analysis if hal is installed
+    records = [measure("analyze_fsm_native", lambda: analysis_stage(native=True))]
+    if FSM.hal_py is not None:
+        records.append(measure("analyze_fsm", analysis_stage))
+    return records + run_stages(analysis["netlist"], analysis["functions"], analysis["ff_names"],
+                                correct_key, with_sympy)
+
+
+def get_git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(with_bundled: bool = True, sizes: List[Tuple[int, int, int]] = None,
+                  with_sympy: bool = False, seed: int = 0) -> Dict[str, object]:
+    """
+    Run all the benchmarks
+
+    Returns:
+        Dict[str, object]: Run metadata and a record per netlist and stage
+    """
+
+    if sizes is None:
+        sizes = SYNTHETIC_SIZES
+    results = []
+
+    if with_bundled:
+        for netlist_path, correct_key in BUNDLED_NETLISTS:
+            for record in run_netlist(netlist_path, correct_key, with_sympy):
+                record["netlist"] = netlist_path
+                results.append(record)
+
+    with tempfile.TemporaryDirectory() as netlists_dir:
+        for state_bits, input_bits, key_bits in sizes:
+            netlist, correct_key = make_locked_netlist(state_bits, input_bits, key_bits, seed)
+            netlist_path = os.path.join(netlists_dir, "locked_{}_{}_{}.v".format(state_bits, input_bits, key_bits))
+            with open(netlist_path, "w") as netlist_file:
+                netlist_file.write(netlist)
+            for record in run_netlist(netlist_path, correct_key, with_sympy):
+                record.update({"netlist": "synthetic", "state_bits": state_bits,
+                               "input_bits": input_bits, "key_bits": key_bits})
+                results.append(record)
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": get_git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the FSM extraction and decryption stages")
+    parser.add_argument("--output", default="bench_output.json", help="Path of the JSON results file")
+    parser.add_argument("--no-bundled", action="store_true", help="Skip the bundled netlists")
+    parser.add_argument("--sympy", action="store_true", help="Benchmark the SymPy decryption too")
+    parser.add_argument("--size", action="append", metavar="STATE,INPUT,KEY",
+                        help="Synthetic FSM widths (can be repeated)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic FSMs")
+    args = parser.parse_args()
+
+    sizes = None
+    if args.size:
+        sizes = [tuple(int(width) for width in size.split(",")) for size in args.size]
+    run = run_benchmark(not args.no_bundled, sizes, args.sympy, args.seed)
+    with open(args.output, "w") as output_file:
+        json.dump(run, output_file, indent=2)
+    for record in run["results"]:
+        print("{:<40} {:<22} {:>10.4f}s {:>12}B".format(
+            record["netlist"] if record["netlist"] != "synthetic" else
+            "synthetic {state_bits}/{input_bits}/{key_bits}".format(**record),
+            record["stage"], record["wall_time_s"], record["peak_memory_bytes"]))
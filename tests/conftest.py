@@ -0,0 +1,128 @@
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import FSM  # noqa: E402
+import SLOD  # noqa: E402
+from benchmark import BUNDLED_NETLISTS  # noqa: E402
+
+LIB_PATH = os.path.join(REPO_DIR, "NangateOpenCellLibrary_functional.lib")
+
+# Dict[str, Tuple[str, str]]: Netlist and hal reference .dot file of each bundled FSM
+BUNDLED_FSMS = {
+    "fsm1": (os.path.join(REPO_DIR, "project2_cipher_v1.v"), os.path.join(REPO_DIR, "fsm1.dot")),
+    "fsm2": (os.path.join(REPO_DIR, "project2_cipher_v2_obfuscated.v"), os.path.join(REPO_DIR, "fsm2.dot")),
+}
+
+# Dict[str, Dict[str, bool]]: Correct key of each bundled FSM (by SLOD key group 1 variable names)
+BUNDLED_KEYS = {name: dict(key) for name, (netlist_path, _) in BUNDLED_FSMS.items()
+                for bundled_path, key in BUNDLED_NETLISTS
+                if os.path.basename(bundled_path) == os.path.basename(netlist_path)}
+
+
+def read_dot_transitions(path: str) -> list:
+    """
+    Read the (current state, next state, label) triples of a .dot file written by analyze_fsm
+    """
+
+    transitions = []
+    with open(path) as dot_file:
+        for line in dot_file:
+            if " -> " not in line:
+                continue
+            edge, label = line.strip().split(" [label=")
+            cur_state, next_state = edge.split(" -> ")
+            transitions.append((cur_state, next_state, label[1:-2]))
+    return transitions
+
+
+@pytest.fixture(scope="session", params=sorted(BUNDLED_FSMS))
+def bundled_fsm(request):
+    """
+    A bundled netlist analyzed by the native loader: its name, netlist, state
+    functions and FF names
+    """
+
+    netlist_path, _ = BUNDLED_FSMS[request.param]
+    netlist, functions, ff_names = FSM.analyze_fsm(netlist_path, LIB_PATH, native=True, return_ff_names=True)
+    return request.param, netlist, functions, ff_names
+
+
+def strip_key_group(key: dict) -> dict:
+    """
+    Get the key group 1 values of a key, by variable names without the group suffix
+    """
+
+    suffix = SLOD.get_key_group_name('', 1)
+    return {name[:-len(suffix)]: value for name, value in key.items() if name.endswith(suffix)}
+
+
+def iter_input_args(oracle, state_names: list, key_names: set, state: str):
+    """
+    Iterate over the arguments of an oracle in a state, for every value of the non key inputs
+    """
+
+    input_names = [name for name in oracle.var_names if name not in key_names and name not in state_names]
+    for value in range(2 ** len(input_names)):
+        args = {name: bool(value >> bit & 1) for bit, name in enumerate(input_names)}
+        args.update((name, char == '1') for name, char in zip(state_names, state))
+        yield args
+
+
+def get_key_mismatches(netlist, functions, ff_names, key: dict, correct_key: dict,
+                       states: set = None) -> set:
+    """
+    Compare the state functions unlocked by a key with the ones unlocked by the correct
+    key (see SLOD.Oracle), on every state and every value of the non key inputs
+
+    Args:
+        key (Dict[str, bool]): The key to check (by key group variable names)
+        correct_key (Dict[str, bool]): The correct key (by key group 1 variable names)
+        states (Set[str]): If given, only these states are compared. Otherwise all of them
+
+    Returns:
+        Set[str]: The states from which the keys give different next states (a character
+            per state bit, in the order of ff_names)
+    """
+
+    circuit = SLOD.CircuitTemplate(netlist, functions)
+    correct_values = strip_key_group(correct_key)
+    key_values = strip_key_group(key)
+    key_values = {name: key_values.get(name, False) for name in correct_values}
+    correct_oracle = SLOD.Oracle(circuit.functions, correct_values)
+    key_oracle = SLOD.Oracle(circuit.functions, key_values)
+    state_names = [FSM.get_gate_pin_display_name(ff_name) for ff_name in ff_names]
+    if states is None:
+        states = {format(value, "0{}b".format(len(ff_names))) for value in range(2 ** len(ff_names))}
+
+    mismatches = set()
+    for state in states:
+        for args in iter_input_args(correct_oracle, state_names, set(correct_values), state):
+            if correct_oracle(args) != key_oracle(args):
+                mismatches.add(state)
+                break
+    return mismatches
+
+
+def get_reachable_states(netlist, functions, ff_names, correct_key: dict, initial_state: str) -> set:
+    """
+    Get the states reachable from the initial state with the correct key
+    """
+
+    circuit = SLOD.CircuitTemplate(netlist, functions)
+    correct_values = strip_key_group(correct_key)
+    oracle = SLOD.Oracle(circuit.functions, correct_values)
+    state_names = [FSM.get_gate_pin_display_name(ff_name) for ff_name in ff_names]
+    reached = {initial_state}
+    frontier = [initial_state]
+    while frontier:
+        for args in iter_input_args(oracle, state_names, set(correct_values), frontier.pop()):
+            next_state = ''.join('1' if value else '0' for value in oracle(args))
+            if next_state not in reached:
+                reached.add(next_state)
+                frontier.append(next_state)
+    return reached
@@ -0,0 +1,38 @@
+import json
+import os
+
+import FSM
+import batch
+from conftest import BUNDLED_FSMS, BUNDLED_KEYS, LIB_PATH, get_key_mismatches, read_dot_transitions
+
+
+def test_batch_matches_single_analysis(tmp_path):
+    """
+    Each record of a batch run over the bundled netlists agrees with the analysis of the
+    netlist alone, and its key is equivalent to the correct key
+    """
+
+    names = sorted(BUNDLED_FSMS)
+    manifest_path = str(tmp_path / "manifest.json")
+    with open(manifest_path, "w") as manifest_file:
+        json.dump([{"netlist": BUNDLED_FSMS[name][0], "key": BUNDLED_KEYS[name]} for name in names], manifest_file)
+    output_path = str(tmp_path / "summary.jsonl")
+    output_dir = str(tmp_path / "batch")
+    records = batch.run_batch(batch.get_jobs(manifest_path), output_path, LIB_PATH, workers=2,
+                              output_dir=output_dir)
+
+    with open(output_path) as output_file:
+        assert [json.loads(line) for line in output_file] == records
+    assert [record["netlist"] for record in records] == [BUNDLED_FSMS[name][0] for name in names]
+    for name, record in zip(names, records):
+        netlist_path, _ = BUNDLED_FSMS[name]
+        result_filename = str(tmp_path / name)
+        netlist, functions, ff_names = FSM.analyze_fsm(netlist_path, LIB_PATH, native=True,
+                                                       result_filename=result_filename, return_ff_names=True)
+        assert "error" not in record
+        assert record["state_bits"] == len(functions)
+        assert record["ffs"] == ff_names
+        assert record["transitions"] == len(read_dot_transitions(result_filename + ".dot"))
+        batch_dot_path = os.path.join(output_dir, os.path.splitext(os.path.basename(netlist_path))[0] + ".dot")
+        assert read_dot_transitions(batch_dot_path) == read_dot_transitions(result_filename + ".dot")
+        assert get_key_mismatches(netlist, functions, ff_names, record["key"], BUNDLED_KEYS[name]) == set()
@@ -0,0 +1,30 @@
+import pytest
+
+import FSM
+import SLOD
+import benchmark
+from ArgsPool import ArgsPool
+from conftest import LIB_PATH, get_key_mismatches
+
+
+@pytest.mark.parametrize("size", [(3, 1, 1), (4, 2, 2), (5, 3, 0)])
+def test_locked_netlist_loads(tmp_path, size):
+    """
+    A synthetic netlist loads through the native loader as an FSM of its state width,
+    whose valid argument vectors span the state, input and key bits, and its correct
+    key is recovered
+    """
+
+    state_bits, input_bits, key_bits = size
+    verilog, correct_key = benchmark.make_locked_netlist(state_bits, input_bits, key_bits, seed=1)
+    netlist_path = str(tmp_path / "locked.v")
+    with open(netlist_path, "w") as netlist_file:
+        netlist_file.write(verilog)
+    netlist, functions, ff_names = FSM.analyze_fsm(netlist_path, LIB_PATH, native=True, return_ff_names=True)
+    assert len(functions) == state_bits
+    assert len(ff_names) == state_bits
+    assert ArgsPool(netlist, functions, ff_names=ff_names).get_valid_args_num() == \
+        2 ** (state_bits + input_bits + key_bits)
+
+    result = SLOD.decrypt(netlist, functions, correct_key, verbose=False)
+    assert get_key_mismatches(netlist, functions, ff_names, result.key, correct_key) == set()
@@ -0,0 +1,95 @@
+import os
+import shutil
+
+import pytest
+
+import AnalysisCache
+import FSM
+import NativeNetlist
+from conftest import BUNDLED_FSMS, LIB_PATH, read_dot_transitions
+
+
+def analyze_cached(netlist_path: str, cache_dir: str, result_filename: str, **kwargs):
+    return FSM.analyze_fsm(netlist_path, LIB_PATH, native=True, cache_dir=cache_dir,
+                           result_filename=result_filename, **kwargs)
+
+
+def forbid_analysis(monkeypatch):
+    """
+    Make loading a netlist or enumerating transitions fail, so only a cache hit succeeds
+    """
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Not loaded from the cache")
+
+    monkeypatch.setattr(FSM, "load_native_netlist", fail)
+    monkeypatch.setattr(FSM, "ArgsPool", fail)
+
+
+def test_cache_hit(bundled_fsm, tmp_path, monkeypatch):
+    name, _, _, _ = bundled_fsm
+    netlist_path, _ = BUNDLED_FSMS[name]
+    cache_dir = str(tmp_path / "cache")
+    first = os.path.join(str(tmp_path), "first")
+    second = os.path.join(str(tmp_path), "second")
+    _, functions, ff_names = analyze_cached(netlist_path, cache_dir, first, return_ff_names=True)
+
+    forbid_analysis(monkeypatch)
+    _, cached_functions, cached_ff_names = analyze_cached(netlist_path, cache_dir, second, return_ff_names=True)
+    assert cached_ff_names == ff_names
+    assert [str(function) for function in cached_functions] == [str(function) for function in functions]
+    assert read_dot_transitions(second + ".dot") == read_dot_transitions(first + ".dot")
+
+
+def get_modified_lib_cells() -> dict:
+    lib_cells = NativeNetlist.load_liberty(LIB_PATH)
+    del lib_cells[sorted(lib_cells)[0]]
+    return lib_cells
+
+
+@pytest.mark.parametrize("get_options", [lambda: {"mode": FSM.DECOMPOSED_MODE},
+                                         lambda: {"fsm_index": 1},
+                                         lambda: {"lib_cells": get_modified_lib_cells()}],
+                         ids=["mode", "fsm_index", "lib_cells"])
+def test_cache_miss_on_options(tmp_path, monkeypatch, get_options):
+    netlist_path, _ = BUNDLED_FSMS["fsm2"]
+    cache_dir = str(tmp_path / "cache")
+    analyze_cached(netlist_path, cache_dir, os.path.join(str(tmp_path), "first"))
+
+    options = get_options()
+    forbid_analysis(monkeypatch)
+    with pytest.raises(AssertionError, match="Not loaded from the cache"):
+        analyze_cached(netlist_path, cache_dir, os.path.join(str(tmp_path), "second"), **options)
+
+
+def test_cache_miss_on_netlist_change(tmp_path, monkeypatch):
+    netlist_path = str(tmp_path / "netlist.v")
+    shutil.copy(BUNDLED_FSMS["fsm1"][0], netlist_path)
+    cache_dir = str(tmp_path / "cache")
+    analyze_cached(netlist_path, cache_dir, os.path.join(str(tmp_path), "first"))
+
+    with open(netlist_path, "a") as netlist_file:
+        netlist_file.write("\n// modified\n")
+    forbid_analysis(monkeypatch)
+    with pytest.raises(AssertionError, match="Not loaded from the cache"):
+        analyze_cached(netlist_path, cache_dir, os.path.join(str(tmp_path), "second"))
+
+
+def test_save_transitions_stopped_early(tmp_path):
+    cache_dir = str(tmp_path)
+    transitions = [("00", "01", "1"), ("01", "10", "0"), ("10", "00", "1")]
+    stream = AnalysisCache.save_transitions(cache_dir, "key", "full", iter(transitions))
+    assert next(stream) == transitions[0]
+    stream.close()
+    assert os.listdir(cache_dir) == []
+    assert AnalysisCache.load_transitions(cache_dir, "key", "full") is None
+
+
+def test_load_transitions_returns_saved(bundled_fsm, tmp_path):
+    _, netlist, functions, ff_names = bundled_fsm
+    cache_dir = str(tmp_path)
+    transitions = list(FSM.iter_transitions(netlist, functions, ff_names))
+    saved = list(AnalysisCache.save_transitions(cache_dir, "key", "full", iter(transitions)))
+    assert saved == transitions
+    assert list(AnalysisCache.load_transitions(cache_dir, "key", "full")) == \
+        [tuple(transition) for transition in transitions]
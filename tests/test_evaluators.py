@@ -0,0 +1,144 @@
+import FSM
+from Aig import get_shared_exprs
+from ArgsPool import ArgsPool
+from BoolExpr import parse_function
+from CubeCover import compress_edges, expand_cube
+from Reachability import ReachabilityExplorer
+from SymbolicFsm import SymbolicFsm
+from TruthTable import BatchEvaluator, CompiledFunction, CompiledFunctions, SupportEvaluator, get_var_masks
+
+# int: Block size (log2) of the batched evaluators, small so the bundled FSMs span several blocks
+TEST_BLOCK_BITS = 3
+
+
+def get_sweep_transitions(netlist, functions, ff_names) -> list:
+    """
+    The reference: per vector evaluation of the state functions over all the argument vectors
+    """
+
+    return list(FSM.iter_argspool_transitions(ArgsPool(netlist, functions, ff_names=ff_names), functions))
+
+
+def get_reachable_transitions(transitions: list, initial_state: str) -> set:
+    """
+    The transitions of the states reachable from the initial state, by a search over a
+    transition table
+    """
+
+    successors = {}
+    for transition in transitions:
+        successors.setdefault(transition[0], []).append(transition)
+    reached = {initial_state}
+    frontier = [initial_state]
+    found = set()
+    while frontier:
+        state = frontier.pop()
+        for transition in successors.get(state, []):
+            found.add(transition)
+            if transition[1] not in reached:
+                reached.add(transition[1])
+                frontier.append(transition[1])
+    return found
+
+
+def test_valid_subspace_matches_validation(bundled_fsm):
+    """
+    The vectors ArgsPool enumerates are exactly the ones increment-and-validate accepts
+    """
+
+    _, netlist, functions, ff_names = bundled_fsm
+    argspool = ArgsPool(netlist, functions, ff_names=ff_names)
+    valid = set()
+    for args_bin in range(2 ** len(argspool.net_ids_str)):
+        argspool.args_bin = args_bin
+        argspool.update_state()
+        if argspool.is_state_valid():
+            valid.add(args_bin)
+    enumerated = [argspool.valid_ind2args_bin(valid_ind) for valid_ind in range(argspool.get_valid_args_num())]
+    assert len(enumerated) == len(set(enumerated))
+    assert set(enumerated) == valid
+
+
+def test_batch_evaluator_matches_sweep(bundled_fsm):
+    _, netlist, functions, ff_names = bundled_fsm
+    evaluator = BatchEvaluator(ArgsPool(netlist, functions, ff_names=ff_names), functions, TEST_BLOCK_BITS)
+    assert list(evaluator.iter_transitions()) == get_sweep_transitions(netlist, functions, ff_names)
+
+
+def test_batch_evaluator_workers_keep_order(bundled_fsm):
+    _, netlist, functions, ff_names = bundled_fsm
+    evaluator = BatchEvaluator(ArgsPool(netlist, functions, ff_names=ff_names), functions, TEST_BLOCK_BITS)
+    assert list(evaluator.iter_transitions(workers=2)) == list(evaluator.iter_transitions())
+
+
+def test_support_evaluator_matches_sweep(bundled_fsm):
+    _, netlist, functions, ff_names = bundled_fsm
+    evaluator = SupportEvaluator(ArgsPool(netlist, functions, ff_names=ff_names), functions, TEST_BLOCK_BITS)
+    assert list(evaluator.iter_transitions()) == get_sweep_transitions(netlist, functions, ff_names)
+
+
+def test_iter_transitions_matches_sweep(bundled_fsm):
+    _, netlist, functions, ff_names = bundled_fsm
+    transitions = list(FSM.iter_transitions(netlist, functions, ff_names))
+    assert [tuple(transition) for transition in transitions] == get_sweep_transitions(netlist, functions, ff_names)
+    assert all(isinstance(transition, FSM.Transition) for transition in transitions)
+
+
+def test_gray_code_matches_sweep(bundled_fsm):
+    _, netlist, functions, ff_names = bundled_fsm
+    argspool = ArgsPool(netlist, functions, gray_code=True, ff_names=ff_names)
+    transitions = list(FSM.iter_incremental_transitions(argspool, functions))
+    sweep = get_sweep_transitions(netlist, functions, ff_names)
+    assert len(transitions) == len(sweep)
+    assert set(transitions) == set(sweep)
+
+
+def test_reachability_matches_sweep(bundled_fsm):
+    _, netlist, functions, ff_names = bundled_fsm
+    zero_state = "0" * len(functions)
+    explorer = ReachabilityExplorer(ArgsPool(netlist, functions, ff_names=ff_names), functions, ff_names)
+    transitions = list(explorer.iter_transitions(zero_state))
+    assert len(transitions) == len(set(transitions))
+    assert set(transitions) == get_reachable_transitions(get_sweep_transitions(netlist, functions, ff_names),
+                                                         zero_state)
+
+
+def test_symbolic_matches_sweep(bundled_fsm):
+    _, netlist, functions, ff_names = bundled_fsm
+    zero_state = "0" * len(functions)
+    symbolic_fsm = SymbolicFsm(ArgsPool(netlist, functions, ff_names=ff_names), functions, ff_names)
+    reachable_states = symbolic_fsm.get_reachable_states(zero_state)
+    transitions = {(cur_state, next_state, cur_input)
+                   for (cur_state, next_state), cubes in symbolic_fsm.iter_edges(reachable_states)
+                   for cube in cubes for cur_input in expand_cube(cube)}
+    want = get_reachable_transitions(get_sweep_transitions(netlist, functions, ff_names), zero_state)
+    assert transitions == want
+    assert symbolic_fsm.get_states_count(reachable_states) == len({transition[0] for transition in want})
+
+
+def test_compressed_edges_match_sweep(bundled_fsm):
+    """
+    The cubes of each edge cover exactly its input vectors (they may overlap)
+    """
+
+    _, netlist, functions, ff_names = bundled_fsm
+    sweep = get_sweep_transitions(netlist, functions, ff_names)
+    transitions = {(cur_state, next_state, cur_input)
+                   for (cur_state, next_state), cubes in compress_edges(sweep).items()
+                   for cube in cubes for cur_input in expand_cube(cube)}
+    assert transitions == set(sweep)
+
+
+def test_shared_aig_matches_functions(bundled_fsm):
+    """
+    The state functions normalized through a shared AIG have the truth tables of the
+    original functions
+    """
+
+    _, netlist, functions, ff_names = bundled_fsm
+    var_order = ArgsPool(netlist, functions, ff_names=ff_names).net_ids_str
+    var_masks = get_var_masks(len(var_order), 0, len(var_order))
+    full_mask = (1 << (1 << len(var_order))) - 1
+    exprs = [parse_function(function) for function in functions]
+    shared = CompiledFunctions(get_shared_exprs(exprs), var_order)(var_masks, full_mask)
+    assert shared == [CompiledFunction(expr, var_order)(var_masks, full_mask) for expr in exprs]
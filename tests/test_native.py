@@ -0,0 +1,94 @@
+import os
+
+import pytest
+
+import FSM
+import NativeNetlist
+from ArgsPool import ArgsPool
+from FsmCandidates import rank_fsm_candidates
+from conftest import BUNDLED_FSMS, LIB_PATH, read_dot_transitions
+
+
+@pytest.mark.parametrize("mode", [FSM.BATCHED_MODE, FSM.PER_VECTOR_MODE, FSM.GRAY_CODE_MODE, FSM.DECOMPOSED_MODE])
+def test_full_sweep_matches_hal(bundled_fsm, tmp_path, mode):
+    """
+    The transitions found with the native loader are the ones hal found (bundled .dot files)
+    """
+
+    name, _, _, _ = bundled_fsm
+    netlist_path, dot_path = BUNDLED_FSMS[name]
+    result_filename = os.path.join(str(tmp_path), name)
+    result = FSM.analyze_fsm(netlist_path, LIB_PATH, native=True, result_filename=result_filename, mode=mode)
+    assert len(result) == 2
+    got = read_dot_transitions(result_filename + ".dot")
+    want = read_dot_transitions(dot_path)
+    assert len(got) == len(want)
+    assert set(got) == set(want)
+
+
+def test_state_bits_follow_ff_order(bundled_fsm):
+    """
+    Current and next states use the same bit order, so the reset sequence of fsm1
+    (a counter) is found by both the full sweep and the reachable exploration
+    """
+
+    name, netlist, functions, ff_names = bundled_fsm
+    zero_state = "0" * len(functions)
+    full = set(FSM.iter_transitions(netlist, functions, ff_names))
+    reachable = set(FSM.iter_transitions(netlist, functions, ff_names, zero_state))
+    assert reachable <= full
+    if name == "fsm1":
+        assert {(t.state, t.next_state) for t in full if t.input == "1" and t.state == "000"} == {("000", "100")}
+
+
+def test_liberty_cache_matches_parse(tmp_path):
+    """
+    The cells loaded from the library cache (when it is written and when it is read)
+    have the pins, truth tables and functions of a fresh parse
+    """
+
+    cache_dir = str(tmp_path)
+    parsed = NativeNetlist.parse_liberty(LIB_PATH)
+    for cells in (NativeNetlist.load_liberty(LIB_PATH, cache_dir), NativeNetlist.load_liberty(LIB_PATH, cache_dir)):
+        assert os.path.isfile(NativeNetlist.get_library_cache_path(cache_dir, LIB_PATH))
+        assert cells.keys() == parsed.keys()
+        for name, cell in cells.items():
+            assert cell.input_pins == parsed[name].input_pins
+            assert cell.output_pins == parsed[name].output_pins
+            assert cell.is_sequential == parsed[name].is_sequential
+            assert cell.tables == parsed[name].tables
+            assert {pin: str(function) for pin, function in cell.functions.items()} == \
+                {pin: str(function) for pin, function in parsed[name].functions.items()}
+
+
+def test_argspool_state_bit_order(bundled_fsm):
+    """
+    With ff_names the state has a bit per FF in the order of the FFs. Without, it is made
+    of the 'Q' arguments in order of appearance (the order of the hal full sweep)
+    """
+
+    _, netlist, functions, ff_names = bundled_fsm
+    argspool = ArgsPool(netlist, functions, ff_names=ff_names)
+    assert [net.get_sources()[0].get_gate().get_name() for net in argspool.state_nets] == ff_names
+    assert len(argspool.get_state_str()) == len(functions)
+
+    argspool = ArgsPool(netlist, functions)
+    q_nets = [net_id for net_id, pin_name in zip(argspool.net_ids_str, argspool.pin_names) if pin_name == "Q"]
+    assert [str(net.get_id()) for net in argspool.state_nets] == q_nets
+
+
+def get_smallest_scc_ffs(netlist) -> set:
+    """
+    The reference: the original FSM selection, the strongly connected component of the
+    gate graph (of more than one gate) with the fewest FFs. Returns the names of its FFs
+    """
+
+    candidates = [component for component in netlist.get_strongly_connected_components() if len(component) > 1]
+    selected = min(candidates, key=lambda component: sum("FF" in gate.get_type().get_name() for gate in component))
+    return {gate.get_name() for gate in selected if "FF" in gate.get_type().get_name()}
+
+
+def test_top_fsm_candidate_matches_smallest_scc(bundled_fsm):
+    _, netlist, _, _ = bundled_fsm
+    top_candidate = rank_fsm_candidates(netlist)[0]
+    assert {flipflop.get_name() for flipflop in top_candidate.ffs} == get_smallest_scc_ffs(netlist)
@@ -0,0 +1,132 @@
+import pytest
+from pysat.solvers import Solver
+
+import SLOD
+from CnfEncoder import TseitinEncoder
+from conftest import BUNDLED_KEYS, get_key_mismatches, get_reachable_states, strip_key_group
+
+
+def decrypt_fresh_encoding(netlist, functions, correct_key) -> dict:
+    """
+    The reference of decrypt_tseitin: the same loop, with the constraints of each
+    distinguishing input encoded from the expressions instead of instantiated from
+    the clause template
+    """
+
+    circuit = SLOD.CircuitTemplate(netlist, functions)
+    copies = {group_num: circuit.get_copy(group_num) for group_num in (1, 2)}
+    pin2net_dict = circuit.get_pin2net_dict([1, 2])
+    encoder = TseitinEncoder()
+    outputs = {group_num: [encoder.encode(function) for function in copies[group_num]] for group_num in (1, 2)}
+    diff = [encoder.encode_xor(lit1, lit2) for lit1, lit2 in zip(outputs[1], outputs[2])]
+    oracle = SLOD.Oracle(copies[1], correct_key)
+    with Solver(name=SLOD.DEFAULT_SOLVER) as solver:
+        feed = SLOD.EncoderFeed(solver, encoder)
+        feed.send()
+        solver.add_clause(diff)
+        while solver.solve():
+            inputs = SLOD.get_args_dict_sym(solver.get_model(), encoder.vars_pool, pin2net_dict, is_get_keys=False)
+            for group_num in (1, 2):
+                for function, value in zip(copies[group_num], oracle(inputs)):
+                    lit = encoder.encode(function, inputs)
+                    encoder.clauses.append([lit if value else -lit])
+            feed.send()
+    with Solver(name=SLOD.DEFAULT_SOLVER) as solver:
+        SLOD.EncoderFeed(solver, encoder).send()
+        assert solver.solve()
+        key = SLOD.get_args_dict_sym(solver.get_model(), encoder.vars_pool, pin2net_dict, is_get_keys=True)
+    SLOD.add_unused_keys(key, pin2net_dict)
+    return key
+
+
+def test_sequential_key_equivalence(bundled_fsm):
+    """
+    The equivalence a sequential recovery reports holds for its key: on all the states
+    if equivalent, on the reachable states if equivalent_from_reset
+    """
+
+    name, netlist, functions, ff_names = bundled_fsm
+    correct_key = BUNDLED_KEYS[name]
+    zero_state = "0" * len(functions)
+    result = SLOD.decrypt_sequential(netlist, functions, ff_names, correct_key, verbose=False)
+    assert result.equivalent_from_reset or not result.equivalent
+    if result.equivalent:
+        assert get_key_mismatches(netlist, functions, ff_names, result.key, correct_key) == set()
+    if result.equivalent_from_reset:
+        reachable = get_reachable_states(netlist, functions, ff_names, correct_key, zero_state)
+        assert get_key_mismatches(netlist, functions, ff_names, result.key, correct_key, reachable) == set()
+
+
+@pytest.mark.parametrize("encoding", [SLOD.TSEITIN_ENCODING, SLOD.SYMPY_ENCODING])
+def test_decrypt_key_is_equivalent(bundled_fsm, encoding):
+    name, netlist, functions, ff_names = bundled_fsm
+    correct_key = BUNDLED_KEYS[name]
+    result = SLOD.decrypt(netlist, functions, correct_key, encoding=encoding, verbose=False)
+    assert get_key_mismatches(netlist, functions, ff_names, result.key, correct_key) == set()
+
+
+def test_clause_template_key_matches_fresh_encoding(bundled_fsm):
+    name, netlist, functions, _ = bundled_fsm
+    correct_key = BUNDLED_KEYS[name]
+    result = SLOD.decrypt_tseitin(netlist, functions, correct_key, verbose=False)
+    assert result.key == decrypt_fresh_encoding(netlist, functions, correct_key)
+
+
+def test_portfolio_key_is_equivalent(bundled_fsm):
+    name, netlist, functions, ff_names = bundled_fsm
+    correct_key = BUNDLED_KEYS[name]
+    result = SLOD.decrypt(netlist, functions, correct_key, verbose=False, portfolio=SLOD.PORTFOLIO_SOLVERS)
+    assert result.solver_name in SLOD.PORTFOLIO_SOLVERS
+    assert get_key_mismatches(netlist, functions, ff_names, result.key, correct_key) == set()
+
+
+def test_native_xor_key_is_equivalent(bundled_fsm):
+    pytest.importorskip("pycryptosat")
+    name, netlist, functions, ff_names = bundled_fsm
+    correct_key = BUNDLED_KEYS[name]
+    result = SLOD.decrypt(netlist, functions, correct_key, verbose=False, solver_name="cms", native_xor=True)
+    assert get_key_mismatches(netlist, functions, ff_names, result.key, correct_key) == set()
+
+
+@pytest.mark.skipif(SLOD.pycryptosat is not None, reason="pycryptosat is installed")
+def test_native_xor_without_pycryptosat(bundled_fsm):
+    name, netlist, functions, _ = bundled_fsm
+    with pytest.raises(ImportError, match="pycryptosat"):
+        SLOD.decrypt(netlist, functions, BUNDLED_KEYS[name], verbose=False, solver_name="cms", native_xor=True)
+
+
+@pytest.mark.parametrize("native_xor", [False, True])
+def test_circuit_template_key_is_equivalent(bundled_fsm, native_xor):
+    """
+    A key solving the instances of the circuit template for every value of the non key
+    variables (with the outputs of the correct key) is equivalent to the correct key,
+    and no two such keys are distinguished by the miter
+    """
+
+    if native_xor:
+        pytest.importorskip("pycryptosat")
+    solver_name = "cms" if native_xor else SLOD.DEFAULT_SOLVER
+    name, netlist, functions, ff_names = bundled_fsm
+    correct_key = BUNDLED_KEYS[name]
+    circuit = SLOD.CircuitTemplate(netlist, functions)
+    oracle = SLOD.Oracle(circuit.functions, strip_key_group(correct_key))
+    pin2net_dict = circuit.get_pin2net_dict([1, 2])
+    input_names = [var_name for var_name in oracle.var_names if var_name not in circuit.key_names]
+    encoder = TseitinEncoder(native_xor=native_xor)
+    outputs1 = circuit.instantiate(encoder, 1)
+    outputs2 = circuit.instantiate(encoder, 2)
+    miter = [encoder.encode_xor(lit1, lit2) for lit1, lit2 in zip(outputs1, outputs2)]
+    for value in range(2 ** len(input_names)):
+        inputs = {var_name: bool(value >> bit & 1) for bit, var_name in enumerate(input_names)}
+        for group_num in (1, 2):
+            for output_lit, output_value in zip(circuit.instantiate(encoder, group_num, inputs), oracle(inputs)):
+                encoder.clauses.append([output_lit if output_value else -output_lit])
+
+    with Solver(name=solver_name) as solver:
+        SLOD.EncoderFeed(solver, encoder).send()
+        assert solver.solve()
+        key = SLOD.get_args_dict_sym(solver.get_model(), encoder.vars_pool, pin2net_dict, is_get_keys=True)
+        SLOD.add_unused_keys(key, pin2net_dict)
+        assert get_key_mismatches(netlist, functions, ff_names, key, correct_key) == set()
+        solver.add_clause(miter)
+        assert not solver.solve()
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import FSM
+from TransitionWriter import DOT_FORMAT, KISS2_FORMAT, NPY_FORMAT, NPZ_FORMAT, NO_TRANSITION, WRITERS
+from conftest import BUNDLED_FSMS, LIB_PATH, read_dot_transitions
+
+
+def read_kiss2_transitions(path: str) -> list:
+    transitions = []
+    with open(path) as kiss2_file:
+        lines = kiss2_file.read().split("\n")
+    header = dict(line.split(" ", 1) for line in lines if line.startswith(".") and " " in line)
+    for line in lines:
+        if line and not line.startswith("."):
+            cur_input, cur_state, next_state = line.split(" ")
+            transitions.append((cur_state, next_state, cur_input))
+    assert int(header[".p"]) == len(transitions)
+    assert int(header[".s"]) == len({state for transition in transitions for state in transition[:2]} |
+                                    {header[".r"]})
+    return transitions
+
+
+def read_matrix_transitions(matrix, state_bits: int, input_bits: int) -> list:
+    return [(format(cur_state, "0{}b".format(state_bits)), format(int(next_state), "0{}b".format(state_bits)),
+             format(cur_input, "0{}b".format(input_bits)))
+            for (cur_state, cur_input), next_state in numpy.ndenumerate(matrix) if next_state != NO_TRANSITION]
+
+
+def read_transitions(path: str, output_format: str, state_bits: int, input_bits: int) -> list:
+    if output_format == DOT_FORMAT:
+        return read_dot_transitions(path)
+    if output_format == KISS2_FORMAT:
+        return read_kiss2_transitions(path)
+    if output_format == NPY_FORMAT:
+        return read_matrix_transitions(numpy.load(path), state_bits, input_bits)
+    with numpy.load(path) as arrays:
+        assert int(arrays["state_bits"]) == state_bits
+        assert int(arrays["input_bits"]) == input_bits
+        assert str(arrays["initial_state"]) == "0" * state_bits
+        return read_matrix_transitions(arrays["next_state"], state_bits, input_bits)
+
+
+@pytest.mark.parametrize("output_format", [DOT_FORMAT, KISS2_FORMAT, NPY_FORMAT, NPZ_FORMAT])
+def test_writer_round_trip(bundled_fsm, tmp_path, output_format):
+    """
+    The transitions read back from each output format are the ones of the bundled .dot file
+    """
+
+    if output_format in (NPY_FORMAT, NPZ_FORMAT) and numpy is None:
+        pytest.skip("The NumPy formats need numpy")
+    name, _, _, _ = bundled_fsm
+    netlist_path, dot_path = BUNDLED_FSMS[name]
+    want = read_dot_transitions(dot_path)
+    state_bits = len(want[0][0])
+    input_bits = len(want[0][2])
+    result_filename = os.path.join(str(tmp_path), name)
+    FSM.analyze_fsm(netlist_path, LIB_PATH, native=True, result_filename=result_filename,
+                    output_format=output_format)
+    got = read_transitions(result_filename + WRITERS[output_format].extension, output_format,
+                           state_bits, input_bits)
+    assert len(got) == len(want)
+    assert set(got) == set(want)